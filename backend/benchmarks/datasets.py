@@ -0,0 +1,326 @@
+import hashlib
+import json
+import math
+import random
+from datetime import datetime, timedelta
+
+STATUSES = ['Design', 'Imported', 'Ready', 'Repair']
+TEST_TYPES = ['MANUAL', 'QUICKTEST_TEST', 'BUSINESS-PROCESS']
+WORDS = [
+    'verify', 'login', 'payment', 'report', 'account', 'transfer', 'session', 'invoice', 'customer',
+    'validate', 'export', 'search', 'filter', 'upload', 'approval', 'workflow', 'timeout', 'balance',
+    'résumé', 'naïve', 'Straße', 'über', 'café', 'façade', '—', '“quoted”',
+]
+
+# Design step IDs are derived from the test ID and the step order
+MAX_STEPS = 999
+
+class Distribution:
+    """
+    Integer distribution of a dataset property, parsed from a short spec:
+
+    - "N": always N
+    - "uniform:LOW:HIGH": uniformly between LOW and HIGH inclusive
+    - "lognormal:MEDIAN:SIGMA[:MAX]": long-tailed around MEDIAN, capped at MAX
+    """
+
+    def __init__(self, spec):
+        self.spec = str(spec)
+        kind, *args = self.spec.split(':')
+        try:
+            if not args:
+                self.kind, self.args = 'fixed', [int(kind)]
+            elif kind == 'uniform' and len(args) == 2:
+                self.kind, self.args = kind, [int(args[0]), int(args[1])]
+            elif kind == 'lognormal' and len(args) in (2, 3):
+                self.kind, self.args = kind, [float(args[0]), float(args[1]), int(args[2]) if len(args) == 3 else None]
+            else:
+                raise ValueError
+        except ValueError:
+            raise ValueError(
+                f"Invalid distribution {self.spec!r}, expected N, uniform:LOW:HIGH or lognormal:MEDIAN:SIGMA[:MAX]"
+            )
+
+    def __str__(self):
+        return self.spec
+
+    def sample(self, rng):
+        if self.kind == 'fixed':
+            return self.args[0]
+        if self.kind == 'uniform':
+            return rng.randint(*self.args)
+        median, sigma, maximum = self.args
+        value = int(round(rng.lognormvariate(math.log(max(median, 1)), sigma)))
+        return value if maximum is None else min(value, maximum)
+
+class ALMDataset:
+    """
+    Seeded synthetic ALM project: a folder tree with tests, design steps,
+    audit history and attachments.
+
+    Every entity is generated on demand from the seed and its ID, so a 100k
+    test project takes no memory up front, any part of it can be served in
+    any order, and the same spec always produces the same data.
+
+    The folder tree has folder_depth levels below "Subject", each folder
+    having folder_fanout subfolders; tests are spread evenly over the leaf
+    folders. Per-test sizes (design steps, description paragraphs, audit
+    entries, attachments and their size) follow Distribution specs.
+    """
+
+    DEFAULTS = {
+        'tests': 100,
+        'folder_depth': 1,
+        'folder_fanout': 1,
+        'steps': '5',
+        'step_attachments': '0',
+        'description_paragraphs': '1',
+        'audits': '2',
+        'attachments': '1',
+        'attachment_size': '4096',
+        'user_fields': 10,
+        'seed': 0,
+    }
+
+    def __init__(self, **spec):
+        """
+        Args:
+            tests (int): Number of tests
+            folder_depth (int): Levels of folders below "Subject"
+            folder_fanout (int): Subfolders of each folder
+            steps (str): Distribution of the design steps per test
+            step_attachments (str): Distribution of the attachments per step
+            description_paragraphs (str): Distribution of the HTML paragraphs
+                                          of test and step descriptions
+            audits (str): Distribution of the audit entries per test
+            attachments (str): Distribution of the attachments per test
+            attachment_size (str): Distribution of attachment sizes in bytes
+            user_fields (int): Number of user-defined test fields
+            seed (int): Seed of the generated content
+        """
+        unknown = set(spec) - set(self.DEFAULTS)
+        if unknown:
+            raise ValueError(f"Unknown dataset options: {', '.join(sorted(unknown))}")
+        self.spec = {**self.DEFAULTS, **spec}
+
+        self.test_count = int(self.spec['tests'])
+        self.seed = self.spec['seed']
+        self.user_fields = int(self.spec['user_fields'])
+        self.distributions = {
+            name: Distribution(self.spec[name])
+            for name in ['steps', 'step_attachments', 'description_paragraphs', 'audits', 'attachments', 'attachment_size']
+        }
+
+        self.folders = {}
+        self.leaf_folder_ids = self._build_folders(int(self.spec['folder_depth']), int(self.spec['folder_fanout']))
+        self.first_test_id = 1000 + len(self.folders)
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path) as spec_file:
+            return cls(**json.load(spec_file))
+
+    def to_file(self, path):
+        with open(path, 'w') as spec_file:
+            json.dump(self.spec, spec_file, indent=2, sort_keys=True)
+
+    def _build_folders(self, depth, fanout):
+        """
+        Create the folder tree breadth first and return the leaf folder IDs.
+        """
+        self.folders['1'] = {'name': 'Subject', 'parent-id': '0'}
+        level = ['1']
+        for depth_index in range(1, depth + 1):
+            next_level = []
+            for parent_id in level:
+                for child_index in range(1, fanout + 1):
+                    folder_id = str(len(self.folders) + 1)
+                    self.folders[folder_id] = {'name': f"Level {depth_index} Folder {child_index}", 'parent-id': parent_id}
+                    next_level.append(folder_id)
+            level = next_level
+        return level
+
+    def folder_path(self, folder_id):
+        names = []
+        while folder_id != '0':
+            folder = self.folders[folder_id]
+            names.append(folder['name'])
+            folder_id = folder['parent-id']
+        return '/'.join(reversed(names))
+
+    @property
+    def folder_id(self):
+        """
+        ID of the first leaf folder, the one benchmarks extract.
+        """
+        return self.leaf_folder_ids[0]
+
+    def rng(self, *key):
+        return random.Random(f"{self.seed}:{':'.join(map(str, key))}")
+
+    # Tests
+
+    def test_ids(self, folder_id=None):
+        """
+        Return the IDs of the tests of a leaf folder, or of all tests.
+        """
+        if folder_id is None:
+            return [str(self.first_test_id + index) for index in range(self.test_count)]
+        if folder_id not in self.leaf_folder_ids:
+            return []
+        leaf_count = len(self.leaf_folder_ids)
+        offset = self.leaf_folder_ids.index(folder_id)
+        return [str(self.first_test_id + index) for index in range(offset, self.test_count, leaf_count)]
+
+    def has_test(self, test_id):
+        return str(test_id).isdigit() and self.first_test_id <= int(test_id) < self.first_test_id + self.test_count
+
+    def test(self, test_id):
+        rng = self.rng('test', test_id)
+        index = int(test_id) - self.first_test_id
+        created = datetime(2015, 1, 1) + timedelta(minutes=rng.randint(0, 5_000_000))
+        fields = {
+            'id': test_id,
+            'name': f"{self.words(rng, 3).capitalize()} {test_id}",
+            'description': self.html(rng),
+            'status': rng.choice(STATUSES),
+            'owner': f"user{rng.randint(1, 500)}",
+            'creation-time': created.strftime('%Y-%m-%d'),
+            'last-modified': (created + timedelta(days=rng.randint(0, 900))).strftime('%Y-%m-%d %H:%M:%S'),
+            'subtype-id': rng.choice(TEST_TYPES),
+            'parent-id': self.leaf_folder_ids[index % len(self.leaf_folder_ids)],
+        }
+        for number in range(1, self.user_fields + 1):
+            fields[f"user-{number:02d}"] = self.words(rng, rng.randint(1, 4))
+        return fields
+
+    def test_fields(self):
+        """
+        Return the test field definitions, as name and label.
+        """
+        labels = {
+            'id': 'Test ID',
+            'name': 'Test Name',
+            'description': 'Description',
+            'status': 'Status',
+            'owner': 'Designer',
+            'creation-time': 'Creation Date',
+            'last-modified': 'Modified',
+            'subtype-id': 'Type',
+            'parent-id': 'Subject',
+        }
+        labels.update({f"user-{number:02d}": f"Custom Field {number}" for number in range(1, self.user_fields + 1)})
+        return labels
+
+    def steps(self, test_id):
+        rng = self.rng('steps', test_id)
+        count = min(self.distributions['steps'].sample(rng), MAX_STEPS)
+        return [
+            {
+                'id': str(int(test_id) * 1000 + order),
+                'parent-id': test_id,
+                'step-order': str(order),
+                'name': f"Step {order}",
+                'description': self.html(rng),
+                'expected': f"<p>{self.words(rng, 6).capitalize()} is displayed</p>",
+            }
+            for order in range(1, count + 1)
+        ]
+
+    def audits(self, test_id):
+        rng = self.rng('audits', test_id)
+        time = datetime(2020, 1, 1) + timedelta(minutes=rng.randint(0, 1_000_000))
+        entries = []
+        for _ in range(self.distributions['audits'].sample(rng)):
+            time += timedelta(minutes=rng.randint(1, 10_000))
+            entries.append({
+                'User': f"user{rng.randint(1, 500)}",
+                'Time': time.strftime('%Y-%m-%d %H:%M:%S'),
+                'Properties': {'Property': [
+                    {'Label': 'Status', 'OldValue': rng.choice(STATUSES), 'NewValue': rng.choice(STATUSES)}
+                    for _ in range(rng.randint(1, 3))
+                ]},
+            })
+        return entries
+
+    # Attachments
+
+    def attachments(self, entity_type, entity_id):
+        if entity_type == 'tests':
+            rng = self.rng('attachments', entity_id)
+            count = self.distributions['attachments'].sample(rng)
+        else:
+            rng = self.rng('step-attachments', entity_id)
+            count = self.distributions['step_attachments'].sample(rng)
+        return [
+            {
+                'id': f"{entity_id}-{index}",
+                'name': f"evidence {index}.{rng.choice(['txt', 'png', 'log', 'xlsx'])}",
+                'file-size': str(self.attachment_size(f"{entity_id}-{index}")),
+            }
+            for index in range(1, count + 1)
+        ]
+
+    def attachment_size(self, attachment_id):
+        return self.distributions['attachment_size'].sample(self.rng('attachment', attachment_id))
+
+    def attachment_content(self, attachment_id):
+        size = self.attachment_size(attachment_id)
+        block = hashlib.sha256(f"{self.seed}:{attachment_id}".encode()).digest() * 128
+        return (block * (size // len(block) + 1))[:size]
+
+    # Content
+
+    def words(self, rng, count):
+        return ' '.join(rng.choice(WORDS) for _ in range(count))
+
+    def html(self, rng):
+        """
+        Generate a description made of HTML paragraphs, lists and tables, as
+        pasted from rich text editors.
+        """
+        parts = ['<html><body>']
+        for _ in range(self.distributions['description_paragraphs'].sample(rng)):
+            kind = rng.random()
+            if kind < 0.6:
+                parts.append(f"<p>{self.words(rng, 12)} <b>{self.words(rng, 2)}</b> &amp; {self.words(rng, 8)}.</p>")
+            elif kind < 0.85:
+                items = ''.join(f"<li>{self.words(rng, 5)}</li>" for _ in range(rng.randint(2, 6)))
+                parts.append(f"<ul>{items}</ul>")
+            else:
+                rows = ''.join(
+                    f"<tr><td>{self.words(rng, 2)}</td><td>{rng.randint(0, 10_000)}</td></tr>"
+                    for _ in range(rng.randint(2, 8))
+                )
+                parts.append(f"<table border=\"1\">{rows}</table>")
+        parts.append('</body></html>')
+        return ''.join(parts)
+
+    def summary(self, sample_size=1000):
+        """
+        Estimate the size of the dataset from a sample of its tests.
+
+        Returns:
+            dict: Folder and test counts, and estimated totals of design
+                  steps, audit entries, attachments and attachment bytes
+        """
+        test_ids = self.test_ids()
+        sample = test_ids[::max(len(test_ids) // sample_size, 1)][:sample_size]
+        totals = {'steps': 0, 'audits': 0, 'attachments': 0, 'attachment_bytes': 0}
+        for test_id in sample:
+            steps = self.steps(test_id)
+            attachments = self.attachments('tests', test_id)
+            for step in steps:
+                attachments += self.attachments('design-steps', step['id'])
+            totals['steps'] += len(steps)
+            totals['audits'] += len(self.audits(test_id))
+            totals['attachments'] += len(attachments)
+            totals['attachment_bytes'] += sum(int(attachment['file-size']) for attachment in attachments)
+
+        scale = len(test_ids) / len(sample) if sample else 0
+        return {
+            'folders': len(self.folders),
+            'leaf_folders': len(self.leaf_folder_ids),
+            'tests': len(test_ids),
+            **{f"estimated_{name}": int(total * scale) for name, total in totals.items()},
+        }
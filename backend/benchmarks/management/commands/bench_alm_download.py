@@ -0,0 +1,113 @@
+import functools
+import resource
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks.datasets import ALMDataset
+from benchmarks.mock_alm import MockALMServer
+from sources.adapters import alm_download
+
+# Methods of ALMClient and functions of the ALM module whose time is reported
+MEASURED_METHODS = ['process_test', 'get_folder_path', 'process_design_steps', 'download_attachment']
+MEASURED_FUNCTIONS = ['clean_html', 'generate_html_table', 'write_consolidated_test_data_to_csv']
+
+@contextmanager
+def measure_calls(owners_and_names):
+    """
+    Wrap functions to count their calls and add up their time across threads.
+
+    cProfile only sees the thread it is enabled in, while the ALM client does
+    most of its work in a thread pool. Recursive calls, like get_folder_path
+    walking up the folder tree, are timed once at the outermost call.
+
+    Args:
+        owners_and_names (list): (class or module, function name) pairs
+
+    Yields:
+        dict: Function name to [calls, seconds], filled in while running
+    """
+    results = defaultdict(lambda: [0, 0.0])
+    lock = threading.Lock()
+    local = threading.local()
+    originals = []
+
+    def wrap(name, function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            depth = getattr(local, name, 0)
+            setattr(local, name, depth + 1)
+            started = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                setattr(local, name, depth)
+                elapsed = time.perf_counter() - started
+                with lock:
+                    results[name][0] += 1
+                    if not depth:
+                        results[name][1] += elapsed
+        return wrapper
+
+    for owner, name in owners_and_names:
+        original = getattr(owner, name)
+        originals.append((owner, name, original))
+        setattr(owner, name, wrap(name, original))
+    try:
+        yield results
+    finally:
+        for owner, name, original in originals:
+            setattr(owner, name, original)
+
+class Command(BaseCommand):
+    help = (
+        "Run the ALM client's folder download against the mock ALM server serving "
+        "a generated dataset, and profile its processing steps."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', help='Dataset spec written by generate_alm_dataset')
+        parser.add_argument('--folder-id', help='Leaf folder to download, the first one by default')
+        parser.add_argument('--latency', type=float, default=0, help='Milliseconds added to every mock response')
+
+    def handle(self, *args, **options):
+        dataset = ALMDataset.from_file(options['dataset'])
+        folder_id = options['folder_id'] or dataset.folder_id
+        if folder_id not in dataset.leaf_folder_ids:
+            raise CommandError(f"Folder {folder_id} is not a leaf folder of the dataset")
+        folder_path = dataset.folder_path(folder_id)
+
+        with MockALMServer(dataset, latency=options['latency'] / 1000) as alm, \
+                tempfile.TemporaryDirectory(prefix='bench-alm-') as download_dir:
+            client = alm_download.ALMClient(alm.base_url, 'bench', 'bench', 'BENCH', 'Benchmark', download_dir=download_dir)
+            if not client.cookies:
+                raise CommandError("Could not log in to the mock ALM server")
+            fields_data = client.retrieve_test_fields()
+            field_mapping = {field['name']: field['label'] for field in fields_data['Fields']['Field']}
+
+            measured = [(alm_download.ALMClient, name) for name in MEASURED_METHODS]
+            measured += [(alm_download, name) for name in MEASURED_FUNCTIONS]
+            with measure_calls(measured) as calls:
+                started = time.perf_counter()
+                client.download_tests_by_folder(folder_path, field_mapping)
+                elapsed = time.perf_counter() - started
+
+        tests = len(dataset.test_ids(folder_id))
+        self.stdout.write(
+            f"{tests} tests of {folder_path} in {elapsed:.2f}s: {tests / elapsed if elapsed else 0:,.1f} tests/s, "
+            f"peak RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f} MB"
+        )
+
+        # Time spent in the thread pool is summed over its workers
+        self.stdout.write(f"{'function':<40}{'calls':>10}{'seconds':>12}")
+        for name in MEASURED_METHODS + MEASURED_FUNCTIONS:
+            count, seconds = calls.get(name, (0, 0.0))
+            self.stdout.write(f"{name:<40}{count:>10}{seconds:>12.2f}")
+
+        self.stdout.write(f"{'requests':<40}{'count':>10}")
+        for endpoint, count in sorted(alm.request_counts.items()):
+            self.stdout.write(f"{endpoint:<40}{count:>10}")
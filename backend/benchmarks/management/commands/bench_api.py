@@ -0,0 +1,374 @@
+import json
+import os
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from benchmarks.datasets import ALMDataset
+from benchmarks.management.commands.bench_pipeline import BASELINES_DIR
+from benchmarks.mock_alm import MockALMServer
+from benchmarks.mock_jira import MockJiraServer
+from common.caching import touch_collections
+from jobs.models import Job
+from pipelines.models import Pipeline
+
+BENCHMARK_PREFIX = '__bench_api__'
+
+# Requests made by the UI, with their share of the load
+SCENARIOS = {
+    'pipeline-list': 15,
+    'pipeline-detail': 15,
+    'pipeline-jobs': 10,
+    'job-list': 15,
+    'job-detail': 15,
+    'job-status': 15,
+    'execute': 5,
+    'test-source-connection': 5,
+    'test-destination-connection': 5,
+}
+
+LOG_MESSAGES = [
+    "Starting pipeline execution",
+    "Authenticated with the source system",
+    "Fetched batch of {count} records from the source",
+    "Uploaded batch of {count} records to the destination",
+    "Saved checkpoint after {count} records",
+    "Retrying request after a timeout, attempt {count}",
+]
+
+def percentile(values, fraction):
+    """
+    Nearest-rank percentile of sorted values.
+    """
+    if not values:
+        return 0
+    return values[min(int(fraction * len(values)), len(values) - 1)]
+
+class Command(BaseCommand):
+    help = (
+        "Seed pipelines and jobs with realistic histories, drive the pipeline and job "
+        "endpoints with concurrent clients and report latency percentiles, query counts "
+        "and throughput, compared with a stored baseline."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pipelines', type=int, default=50, help='Pipelines to seed')
+        parser.add_argument('--jobs', type=int, default=5000, help='Jobs to seed, spread over the pipelines')
+        parser.add_argument('--log-entries', type=int, default=200, help='Median number of log entries per job')
+        parser.add_argument('--requests', type=int, default=2000, help='Requests to make, after the warmup')
+        parser.add_argument('--warmup', type=int, default=50, help='Requests made before measuring')
+        parser.add_argument('--concurrency', type=int, default=10, help='Concurrent clients')
+        parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                            help="Comma-separated scenarios to run, e.g. without 'execute' when no broker is running")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--baseline', default='api', help='Name of the baseline to compare with')
+        parser.add_argument('--save-baseline', action='store_true', help='Store the results as the baseline')
+        parser.add_argument('--tolerance', type=float, default=0.2,
+                            help='Relative latency or throughput change tolerated before reporting a regression')
+        parser.add_argument('--keep', action='store_true', help='Keep the seeded pipelines and jobs afterwards')
+
+    def handle(self, *args, **options):
+        scenarios = [name.strip() for name in options['scenarios'].split(',') if name.strip()]
+        unknown = set(scenarios) - set(SCENARIOS)
+        if unknown:
+            raise CommandError(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+        params = {
+            name: options[name]
+            for name in ['pipelines', 'jobs', 'log_entries', 'requests', 'warmup', 'concurrency', 'seed']
+        }
+        params['scenarios'] = scenarios
+
+        # Leftovers of an interrupted run would skew the list endpoints
+        self.cleanup()
+
+        with MockALMServer(ALMDataset(tests=1)) as alm, MockJiraServer() as jira:
+            user = User.objects.create_user(f"{BENCHMARK_PREFIX}user", password=None)
+            try:
+                pipelines, jobs = self.seed(alm, jira, options)
+                bodies = {
+                    'test-source-connection': {'source_type': 'alm', 'source_config': self.source_config(alm)},
+                    'test-destination-connection': {'destination_type': 'jira', 'destination_config': self.destination_config(jira)},
+                }
+                rng = random.Random(options['seed'])
+                plan = self.plan(rng, scenarios, pipelines, jobs, bodies, options['warmup'] + options['requests'])
+                token = str(AccessToken.for_user(user))
+                self.drive(plan[:options['warmup']], token, options['concurrency'])
+                results = self.drive(plan[options['warmup']:], token, options['concurrency'])
+            finally:
+                if not options['keep']:
+                    self.cleanup()
+
+        self.report(results)
+
+        baseline_path = os.path.join(BASELINES_DIR, f"{options['baseline']}.json")
+        if options['save_baseline']:
+            os.makedirs(BASELINES_DIR, exist_ok=True)
+            with open(baseline_path, 'w') as baseline_file:
+                json.dump({'params': params, **results}, baseline_file, indent=2, sort_keys=True)
+            self.stdout.write(f"Saved baseline {baseline_path}")
+        elif os.path.exists(baseline_path):
+            with open(baseline_path) as baseline_file:
+                baseline = json.load(baseline_file)
+            self.compare(params, results, baseline, options['tolerance'])
+        else:
+            self.stdout.write(f"No baseline {baseline_path} to compare with, run with --save-baseline to create it")
+
+    def cleanup(self):
+        Pipeline.objects.filter(name__startswith=BENCHMARK_PREFIX).delete()
+        User.objects.filter(username=f"{BENCHMARK_PREFIX}user").delete()
+
+    def seed(self, alm, jira, options):
+        """
+        Create the pipelines and a finished job history for them.
+
+        Returns:
+            tuple: IDs of the pipelines and of the jobs
+        """
+        rng = random.Random(options['seed'])
+        pipelines = Pipeline.objects.bulk_create([
+            Pipeline(
+                name=f"{BENCHMARK_PREFIX} {index}",
+                description=f"Load test pipeline {index}",
+                source_type='alm',
+                source_config=self.source_config(alm),
+                destination_type='jira',
+                destination_config=self.destination_config(jira),
+                status='active',
+                execution_config={'mode': 'single', 'batch_size': 100},
+            )
+            for index in range(options['pipelines'])
+        ])
+
+        now = timezone.now()
+        job_ids = []
+        batch = []
+        for index in range(options['jobs']):
+            completed_at = now - timedelta(minutes=rng.randint(1, 60 * 24 * 90))
+            records = rng.randint(10, 5000)
+            status = rng.choices(['completed', 'failed', 'cancelled'], weights=[85, 12, 3])[0]
+            errors = self.errors(rng, completed_at) if status == 'failed' else []
+            batch.append(Job(
+                pipeline=pipelines[index % len(pipelines)],
+                status=status,
+                started_at=completed_at - timedelta(seconds=rng.randint(5, 3600)),
+                completed_at=completed_at,
+                task_id=f"{BENCHMARK_PREFIX}{index}",
+                source_record_count=records,
+                destination_record_count=records - sum(error['count'] for error in errors),
+                error_count=sum(error['count'] for error in errors),
+                logs=self.logs(rng, completed_at, options['log_entries']),
+                errors=errors,
+            ))
+            if len(batch) == 500:
+                job_ids += [job.id for job in Job.objects.bulk_create(batch)]
+                batch = []
+        if batch:
+            job_ids += [job.id for job in Job.objects.bulk_create(batch)]
+
+        # Bulk inserts bypass Job.save()
+        touch_collections('pipelines', 'jobs', *(f"pipeline-jobs:{pipeline.id}" for pipeline in pipelines))
+        self.stdout.write(f"Seeded {len(pipelines)} pipelines and {len(job_ids)} jobs")
+        return [pipeline.id for pipeline in pipelines], job_ids
+
+    def source_config(self, alm):
+        return {
+            'base_url': alm.base_url,
+            'client_id': 'bench',
+            'client_secret': 'bench',
+            'domain': 'BENCH',
+            'project': 'Benchmark',
+            'folder_path': alm.dataset.folder_path(alm.dataset.folder_id),
+        }
+
+    def destination_config(self, jira):
+        return {
+            'base_url': jira.base_url,
+            'auth_method': 'token',
+            'api_token': 'bench',
+            'project_key': jira.project_key,
+            'issue_type': 'Task',
+            'field_mapping': {'summary': 'Test Name', 'description': 'Description'},
+        }
+
+    def logs(self, rng, completed_at, median):
+        count = int(rng.lognormvariate(0, 0.7) * median)
+        started_at = completed_at - timedelta(seconds=count)
+        return [
+            {
+                'timestamp': (started_at + timedelta(seconds=index)).isoformat(),
+                'level': 'warning' if rng.random() < 0.05 else 'info',
+                'message': rng.choice(LOG_MESSAGES).format(count=rng.randint(1, 1000)),
+            }
+            for index in range(count)
+        ]
+
+    def errors(self, rng, completed_at):
+        return [
+            {
+                'timestamp': completed_at.isoformat(),
+                'message': f"Failed to create issue: field {index} is invalid",
+                'details': {'status_code': 400, 'response': '{"errors": {"customfield": "invalid value"}}'},
+                'signature': f"{BENCHMARK_PREFIX}{index}",
+                'count': rng.randint(1, 50),
+                'item_ids': [str(rng.randint(1000, 9999)) for _ in range(5)],
+                'last_seen': completed_at.isoformat(),
+            }
+            for index in range(rng.randint(1, 5))
+        ]
+
+    def plan(self, rng, scenarios, pipelines, jobs, bodies, count):
+        """
+        Draw the sequence of requests, the same for every run with the same seed.
+
+        Returns:
+            list: (scenario, method, path, body) tuples
+        """
+        weights = [SCENARIOS[name] for name in scenarios]
+        requests = []
+        for scenario in rng.choices(scenarios, weights=weights, k=count):
+            pipeline_id = rng.choice(pipelines)
+            job_id = rng.choice(jobs) if jobs else None
+            method, body = 'get', None
+            if scenario == 'pipeline-list':
+                path = reverse('pipeline-list')
+            elif scenario == 'pipeline-detail':
+                path = reverse('pipeline-detail', args=[pipeline_id])
+            elif scenario == 'pipeline-jobs':
+                path = reverse('pipeline-jobs', args=[pipeline_id])
+            elif scenario == 'job-list':
+                path = reverse('job-list')
+            elif scenario == 'job-detail':
+                path = reverse('job-detail', args=[job_id])
+            elif scenario == 'job-status':
+                path = reverse('job-status', args=[job_id])
+            elif scenario == 'execute':
+                method, path = 'post', reverse('pipeline-execute', args=[pipeline_id])
+            else:
+                method, path, body = 'post', reverse(f"pipeline-{scenario}"), bodies[scenario]
+            requests.append((scenario, method, path, body))
+        return requests
+
+    def drive(self, plan, token, concurrency):
+        """
+        Make the planned requests from concurrent clients.
+
+        Every client runs in its own thread with its own database connection,
+        so the queries of each request are counted separately.
+
+        Returns:
+            dict: Throughput and per-scenario latencies, query counts and statuses
+        """
+        samples = defaultdict(list)
+        statuses = defaultdict(Counter)
+        lock = threading.Lock()
+        pending = iter(plan)
+        host = next((host for host in settings.ALLOWED_HOSTS if host != '*'), 'localhost')
+
+        def client_loop():
+            client = APIClient(SERVER_NAME=host)
+            client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+            try:
+                while True:
+                    with lock:
+                        request = next(pending, None)
+                    if request is None:
+                        return
+                    scenario, method, path, body = request
+                    with CaptureQueriesContext(connection) as queries:
+                        started = time.perf_counter()
+                        response = getattr(client, method)(path, body, format='json')
+                        elapsed = time.perf_counter() - started
+                    with lock:
+                        samples[scenario].append((elapsed, len(queries)))
+                        statuses[scenario][str(response.status_code)] += 1
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=client_loop, name=f"bench-client-{index}") for index in range(concurrency)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        scenarios = {}
+        for scenario, values in sorted(samples.items()):
+            latencies = sorted(latency for latency, _ in values)
+            query_counts = [count for _, count in values]
+            scenarios[scenario] = {
+                'requests': len(values),
+                'p50_ms': round(percentile(latencies, 0.5) * 1000, 2),
+                'p90_ms': round(percentile(latencies, 0.9) * 1000, 2),
+                'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+                'max_ms': round(latencies[-1] * 1000, 2),
+                'mean_queries': round(sum(query_counts) / len(query_counts), 2),
+                'max_queries': max(query_counts),
+                'statuses': dict(statuses[scenario]),
+            }
+        return {
+            'requests': len(plan),
+            'seconds': round(elapsed, 3),
+            'requests_per_second': round(len(plan) / elapsed, 1) if elapsed else 0,
+            'scenarios': scenarios,
+        }
+
+    def report(self, results):
+        self.stdout.write(
+            f"{results['requests']} requests in {results['seconds']:.2f}s: "
+            f"{results['requests_per_second']:,.1f} requests/s"
+        )
+        self.stdout.write(
+            f"{'scenario':<30}{'requests':>9}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'max ms':>9}"
+            f"{'queries':>9}{'max q':>7}  statuses"
+        )
+        for scenario, stats in results['scenarios'].items():
+            statuses = ' '.join(f"{code}x{count}" for code, count in sorted(stats['statuses'].items()))
+            self.stdout.write(
+                f"{scenario:<30}{stats['requests']:>9}{stats['p50_ms']:>9.1f}{stats['p90_ms']:>9.1f}"
+                f"{stats['p99_ms']:>9.1f}{stats['max_ms']:>9.1f}{stats['mean_queries']:>9.1f}{stats['max_queries']:>7}  {statuses}"
+            )
+
+    def compare(self, params, results, baseline, tolerance):
+        """
+        Report the differences with a baseline and fail on regressions.
+        """
+        if baseline.get('params') != params:
+            self.stdout.write("Baseline was recorded with other parameters, skipping the comparison")
+            return
+
+        regressions = []
+        throughput = results['requests_per_second'] / baseline['requests_per_second'] if baseline['requests_per_second'] else 1
+        self.stdout.write(f"Throughput {throughput:.2f}x of the baseline")
+        if throughput < 1 - tolerance:
+            regressions.append(f"throughput dropped to {throughput:.2f}x of the baseline")
+
+        for scenario, stats in results['scenarios'].items():
+            expected = baseline['scenarios'].get(scenario)
+            if not expected:
+                continue
+            for percentile_name in ['p50_ms', 'p99_ms']:
+                ratio = stats[percentile_name] / expected[percentile_name] if expected[percentile_name] else 1
+                if ratio > 1 + tolerance:
+                    regressions.append(f"{scenario} {percentile_name[:3]} grew to {ratio:.2f}x of the baseline")
+            # Query counts do not depend on timing, so any increase is a regression
+            if stats['max_queries'] > expected['max_queries']:
+                regressions.append(
+                    f"{scenario}: up to {stats['max_queries']} queries per request instead of {expected['max_queries']}"
+                )
+
+        if regressions:
+            raise CommandError("Performance regressions:\n" + '\n'.join(f"- {regression}" for regression in regressions))
+        self.stdout.write(self.style.SUCCESS("No regression against the baseline"))
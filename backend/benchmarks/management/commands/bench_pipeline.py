@@ -0,0 +1,218 @@
+import json
+import os
+import resource
+import shutil
+import time
+import uuid
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks.datasets import ALMDataset
+from benchmarks.mock_alm import MockALMServer
+from benchmarks.mock_jira import MockJiraServer
+from common.sessions import session_pool
+from jobs.artifacts import get_job_artifact_dir
+from jobs.models import Job
+from jobs.tasks import execute_pipeline
+from pipelines.models import Pipeline
+
+BENCHMARK_PIPELINE_NAME = '__bench_pipeline__'
+BASELINES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'baselines')
+
+class Command(BaseCommand):
+    help = (
+        "Run an ALM to Jira pipeline end to end against in-process mock servers "
+        "and compare its throughput with a stored baseline."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dataset', help='Dataset spec written by generate_alm_dataset, instead of the options below')
+        parser.add_argument('--tests', type=int, default=500, help='Number of ALM tests in the mock dataset')
+        parser.add_argument('--steps', default='5', help='Design steps per test, as a distribution')
+        parser.add_argument('--attachments', default='1', help='Attachments per test, as a distribution')
+        parser.add_argument('--attachment-size', default='4096', help='Attachment size in bytes, as a distribution')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--latency', type=float, default=0, help='Milliseconds added to every mock response')
+        parser.add_argument('--alm-rate-limit', type=float, help='Maximum ALM requests per second')
+        parser.add_argument('--jira-rate-limit', type=float, help='Maximum Jira requests per second')
+        parser.add_argument('--destination', choices=['jira', 'file'], default='jira',
+                            help='Upload to the mock Jira server, or write files with the file destination')
+        parser.add_argument('--file-format', choices=['jsonl', 'csv', 'parquet'], default='jsonl')
+        parser.add_argument('--compression', help='Compression of the written files')
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--max-workers', type=int, default=5, help='Concurrent ALM requests')
+        parser.add_argument('--baseline', default='default', help='Name of the baseline to compare with')
+        parser.add_argument('--save-baseline', action='store_true', help='Store the results as the baseline')
+        parser.add_argument('--tolerance', type=float, default=0.2,
+                            help='Relative slowdown or memory growth tolerated before reporting a regression')
+        parser.add_argument('--keep', action='store_true', help='Keep the benchmark pipeline and job afterwards')
+
+    def handle(self, *args, **options):
+        if options['dataset']:
+            dataset = ALMDataset.from_file(options['dataset'])
+        else:
+            dataset = ALMDataset(
+                tests=options['tests'],
+                steps=options['steps'],
+                attachments=options['attachments'],
+                attachment_size=options['attachment_size'],
+                seed=options['seed']
+            )
+        params = {
+            'dataset': dataset.spec,
+            **{
+                name: options[name]
+                for name in ['latency', 'alm_rate_limit', 'jira_rate_limit', 'destination', 'file_format', 'compression',
+                             'batch_size', 'max_workers']
+            },
+        }
+        latency = options['latency'] / 1000
+
+        with MockALMServer(dataset, latency=latency, rate_limit=options['alm_rate_limit']) as alm, \
+                MockJiraServer(latency=latency, rate_limit=options['jira_rate_limit']) as jira:
+            # Log in again, so that authentication is part of the measurement
+            session_pool.clear()
+            pipeline, job = self.create_pipeline(alm, jira, dataset, options)
+            try:
+                results = self.run(pipeline, job, alm, jira)
+            finally:
+                if not options['keep']:
+                    shutil.rmtree(get_job_artifact_dir(job, create=False), ignore_errors=True)
+                    if pipeline.destination_type == 'file':
+                        output_dir = os.path.join(settings.FILE_DESTINATION_ROOT, pipeline.destination_config['directory'])
+                        shutil.rmtree(output_dir, ignore_errors=True)
+                    pipeline.delete()
+
+        self.report(results)
+
+        baseline_path = os.path.join(BASELINES_DIR, f"{options['baseline']}.json")
+        if options['save_baseline']:
+            os.makedirs(BASELINES_DIR, exist_ok=True)
+            with open(baseline_path, 'w') as baseline_file:
+                json.dump({'params': params, **results}, baseline_file, indent=2, sort_keys=True)
+            self.stdout.write(f"Saved baseline {baseline_path}")
+        elif os.path.exists(baseline_path):
+            with open(baseline_path) as baseline_file:
+                baseline = json.load(baseline_file)
+            self.compare(params, results, baseline, options['tolerance'])
+        else:
+            self.stdout.write(f"No baseline {baseline_path} to compare with, run with --save-baseline to create it")
+
+    def create_pipeline(self, alm, jira, dataset, options):
+        pipeline = Pipeline.objects.create(
+            name=BENCHMARK_PIPELINE_NAME,
+            source_type='alm',
+            source_config={
+                'base_url': alm.base_url,
+                'client_id': 'bench',
+                'client_secret': 'bench',
+                'domain': 'BENCH',
+                'project': 'Benchmark',
+                'folder_path': dataset.folder_path(dataset.folder_id),
+                'max_workers': options['max_workers'],
+            },
+            destination_type=options['destination'],
+            destination_config=self.destination_config(jira, options),
+            # Run extraction and upload in this process, without the broker
+            execution_config={
+                'mode': 'single',
+                'staging': False,
+                'change_detection': False,
+                'batch_size': options['batch_size'],
+            }
+        )
+        job = Job.objects.create(pipeline=pipeline, status='pending')
+        return pipeline, job
+
+    def destination_config(self, jira, options):
+        if options['destination'] == 'file':
+            return {
+                'directory': f"{BENCHMARK_PIPELINE_NAME}/{uuid.uuid4().hex}",
+                'format': options['file_format'],
+                'compression': options['compression'],
+            }
+        return {
+            'base_url': jira.base_url,
+            'auth_method': 'token',
+            'api_token': 'bench',
+            'project_key': jira.project_key,
+            'issue_type': 'Task',
+            'field_mapping': {'summary': 'Test Name', 'description': 'Description'},
+        }
+
+    def run(self, pipeline, job, alm, jira):
+        """
+        Execute the pipeline and collect the measurements.
+        """
+        started = time.perf_counter()
+        outcome = execute_pipeline.apply(args=(str(pipeline.id), str(job.id))).get()
+        elapsed = time.perf_counter() - started
+
+        job.refresh_from_db()
+        if job.status != 'completed':
+            raise CommandError(f"Benchmark job ended as {job.status}: {outcome.get('error', '')}")
+
+        records = job.destination_record_count or 0
+        return {
+            'records': records,
+            'errors': job.error_count,
+            'seconds': round(elapsed, 3),
+            'records_per_second': round(records / elapsed, 1) if elapsed else 0,
+            # Includes the mock servers, which run in the same process
+            'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+            'requests': {
+                'alm': dict(alm.request_counts),
+                'jira': dict(jira.request_counts),
+            },
+            'throttled_seconds': {
+                'alm': round(alm.throttled_seconds, 3),
+                'jira': round(jira.throttled_seconds, 3),
+            },
+            'timings': outcome.get('timings', {}),
+        }
+
+    def report(self, results):
+        self.stdout.write(
+            f"{results['records']} records in {results['seconds']:.2f}s: "
+            f"{results['records_per_second']:,.1f} records/s, peak RSS {results['peak_rss_mb']:.1f} MB, "
+            f"{results['errors']} errors"
+        )
+        self.stdout.write(f"{'stage':<20}{'seconds':>10}")
+        for stage, seconds in results['timings'].items():
+            self.stdout.write(f"{stage:<20}{seconds:>10.2f}")
+        self.stdout.write(f"{'requests':<32}{'count':>10}{'per record':>12}")
+        for server, counts in results['requests'].items():
+            for endpoint, count in sorted(counts.items()):
+                per_record = count / results['records'] if results['records'] else 0
+                self.stdout.write(f"{server + ' ' + endpoint:<32}{count:>10}{per_record:>12.2f}")
+
+    def compare(self, params, results, baseline, tolerance):
+        """
+        Report the differences with a baseline and fail on regressions.
+        """
+        if baseline.get('params') != params:
+            self.stdout.write("Baseline was recorded with other parameters, skipping the comparison")
+            return
+
+        regressions = []
+        throughput = results['records_per_second'] / baseline['records_per_second'] if baseline['records_per_second'] else 1
+        memory = results['peak_rss_mb'] / baseline['peak_rss_mb'] if baseline['peak_rss_mb'] else 1
+        self.stdout.write(f"Throughput {throughput:.2f}x and peak RSS {memory:.2f}x of the baseline")
+        if throughput < 1 - tolerance:
+            regressions.append(f"throughput dropped to {throughput:.2f}x of the baseline")
+        if memory > 1 + tolerance:
+            regressions.append(f"peak RSS grew to {memory:.2f}x of the baseline")
+        if results['records'] != baseline['records']:
+            regressions.append(f"{results['records']} records uploaded instead of {baseline['records']}")
+
+        # Request counts are deterministic, so any increase is a regression
+        for server, counts in results['requests'].items():
+            for endpoint, count in counts.items():
+                expected = baseline['requests'].get(server, {}).get(endpoint, 0)
+                if count > expected:
+                    regressions.append(f"{server} {endpoint}: {count} requests instead of {expected}")
+
+        if regressions:
+            raise CommandError("Performance regressions:\n" + '\n'.join(f"- {regression}" for regression in regressions))
+        self.stdout.write(self.style.SUCCESS("No regression against the baseline"))
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks.datasets import ALMDataset
+
+class Command(BaseCommand):
+    help = (
+        "Write the spec of a seeded synthetic ALM project, to be served by the mock "
+        "ALM server of the benchmarks. Sizes are given as distributions: N, "
+        "uniform:LOW:HIGH or lognormal:MEDIAN:SIGMA[:MAX]."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help='Path of the spec file to write')
+        parser.add_argument('--tests', type=int, default=100_000)
+        parser.add_argument('--folder-depth', type=int, default=3, help='Levels of folders below Subject')
+        parser.add_argument('--folder-fanout', type=int, default=4, help='Subfolders of each folder')
+        parser.add_argument('--steps', default='lognormal:12:0.9:200', help='Design steps per test')
+        parser.add_argument('--step-attachments', default='0', help='Attachments per design step')
+        parser.add_argument('--description-paragraphs', default='lognormal:3:0.8:60',
+                            help='HTML paragraphs, lists and tables per description')
+        parser.add_argument('--audits', default='lognormal:8:1.2:3000', help='Audit entries per test')
+        parser.add_argument('--attachments', default='uniform:0:3', help='Attachments per test')
+        parser.add_argument('--attachment-size', default='lognormal:16384:1.5:52428800',
+                            help='Attachment size in bytes')
+        parser.add_argument('--user-fields', type=int, default=20, help='User-defined test fields')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--sample', type=int, default=1000, help='Tests sampled to estimate the dataset size')
+
+    def handle(self, *args, **options):
+        try:
+            dataset = ALMDataset(**{
+                name: options[name]
+                for name in ALMDataset.DEFAULTS
+            })
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        dataset.to_file(options['output'])
+        self.stdout.write(f"Wrote dataset spec {options['output']}")
+        for name, value in dataset.summary(options['sample']).items():
+            self.stdout.write(f"{name.replace('_', ' '):<28}{value:>16,}")
@@ -0,0 +1,140 @@
+import re
+
+from .datasets import ALMDataset
+from .mock_server import MockResponse, MockServer, json_body
+
+def alm_entity(entity_type, fields):
+    """
+    Format an entity the way the ALM REST API returns it in JSON.
+    """
+    return {
+        'Type': entity_type,
+        'Fields': [
+            {'Name': name, 'values': [{'value': value}] if value is not None else []}
+            for name, value in fields.items()
+        ],
+    }
+
+class MockALMServer(MockServer):
+    """
+    Stand-in for the ALM REST endpoints used by the ALM source adapter,
+    serving the project of an ALMDataset.
+    """
+
+    name = 'alm'
+
+    def __init__(self, dataset=None, client_id='bench', client_secret='bench', **options):
+        super().__init__(**options)
+        self.dataset = dataset or ALMDataset()
+        self.credentials = (client_id, client_secret)
+
+        project = r'/qcbin/rest/domains/[^/]+/projects/[^/]+'
+        self.route('POST', r'/qcbin/rest/oauth2/login', self.login, 'login')
+        self.route('GET', project + r'/customization/entities/test/fields', self.test_fields, 'test fields')
+        self.route('GET', project + r'/test-folders', self.find_folders, 'folder search')
+        self.route('GET', project + r'/test-folders/(?P<folder_id>\d+)', self.get_folder, 'folder')
+        self.route('GET', project + r'/tests', self.find_tests, 'test search')
+        self.route('GET', project + r'/tests/(?P<test_id>\d+)', self.get_test, 'test')
+        self.route('GET', project + r'/tests/(?P<test_id>\d+)/audits', self.get_audits, 'audits')
+        self.route('GET', project + r'/design-steps', self.find_steps, 'design steps')
+        self.route(
+            'GET', project + r'/(?P<entity_type>tests|design-steps)/(?P<entity_id>\d+)/attachments',
+            self.list_attachments, 'attachment list'
+        )
+        self.route('GET', project + r'/attachments/(?P<attachment_id>[\w-]+)', self.download_attachment, 'attachment download')
+
+    @property
+    def base_url(self):
+        return f"{self.url}/qcbin"
+
+    def authorized(self, request):
+        return 'LWSSO_COOKIE_KEY=' in (request['headers'].get('Cookie') or '')
+
+    def login(self, request):
+        body = json_body(request) or {}
+        if (body.get('clientId'), body.get('secret')) != self.credentials:
+            return MockResponse(401, {'error': 'Invalid API key'})
+        return MockResponse(200, {}, headers={'Set-Cookie': [
+            'LWSSO_COOKIE_KEY=bench-sso; Path=/',
+            'QCSession=bench-session; Path=/',
+            'XSRF-TOKEN=bench-xsrf; Path=/',
+        ]})
+
+    def test_fields(self, request):
+        return MockResponse(200, {'Fields': {'Field': [
+            {'name': name, 'label': label} for name, label in self.dataset.test_fields().items()
+        ]}})
+
+    def query(self, request):
+        """
+        Parse the parent-id and name conditions of an ALM query.
+        """
+        text = request['query'].get('query', '')
+        parent = re.search(r'parent-id\[(\w+)\]', text)
+        name = re.search(r"name\['([^']*)'\]", text)
+        return parent.group(1) if parent else None, name.group(1) if name else None
+
+    def find_folders(self, request):
+        if not self.authorized(request):
+            return MockResponse(401)
+        parent_id, name = self.query(request)
+        entities = [
+            alm_entity('test-folder', {'id': folder_id, **folder})
+            for folder_id, folder in self.dataset.folders.items()
+            if folder['parent-id'] == parent_id and (name is None or folder['name'] == name)
+        ]
+        return MockResponse(200, {'entities': entities, 'TotalResults': len(entities)})
+
+    def get_folder(self, request, folder_id):
+        if not self.authorized(request):
+            return MockResponse(401)
+        folder = self.dataset.folders.get(folder_id)
+        if folder is None:
+            return MockResponse(404)
+        return MockResponse(200, alm_entity('test-folder', {'id': folder_id, **folder}))
+
+    def find_tests(self, request):
+        if not self.authorized(request):
+            return MockResponse(401)
+        parent_id, _ = self.query(request)
+        test_ids = self.dataset.test_ids(parent_id) if parent_id else []
+        entities = [alm_entity('test', {'id': test_id}) for test_id in test_ids]
+        return MockResponse(200, {'entities': entities, 'TotalResults': len(entities)})
+
+    def get_test(self, request, test_id):
+        if not self.authorized(request):
+            return MockResponse(401)
+        if not self.dataset.has_test(test_id):
+            return MockResponse(404)
+        return MockResponse(200, alm_entity('test', self.dataset.test(test_id)))
+
+    def get_audits(self, request, test_id):
+        if not self.authorized(request):
+            return MockResponse(401)
+        return MockResponse(200, {'Audits': {'Audit': self.dataset.audits(test_id)}})
+
+    def find_steps(self, request):
+        if not self.authorized(request):
+            return MockResponse(401)
+        parent_id, _ = self.query(request)
+        steps = self.dataset.steps(parent_id) if parent_id and self.dataset.has_test(parent_id) else []
+        entities = [alm_entity('design-step', step) for step in steps]
+        return MockResponse(200, {'entities': entities, 'TotalResults': len(entities)})
+
+    def list_attachments(self, request, entity_type, entity_id):
+        if not self.authorized(request):
+            return MockResponse(401)
+        entities = [
+            alm_entity('attachment', attachment)
+            for attachment in self.dataset.attachments(entity_type, entity_id)
+        ]
+        return MockResponse(200, {'entities': entities, 'TotalResults': len(entities)})
+
+    def download_attachment(self, request, attachment_id):
+        if not self.authorized(request):
+            return MockResponse(401)
+        return MockResponse(
+            200,
+            self.dataset.attachment_content(attachment_id),
+            content_type='application/octet-stream'
+        )
@@ -0,0 +1,100 @@
+import itertools
+import threading
+
+from .mock_server import MockResponse, MockServer, json_body
+
+ISSUE_TYPES = [{'id': '10001', 'name': 'Task'}, {'id': '10002', 'name': 'Bug'}]
+
+# Create screen of every issue type, in the format of the createmeta endpoints
+CREATE_FIELDS = [
+    {'fieldId': 'project', 'name': 'Project', 'required': True, 'schema': {'type': 'project', 'system': 'project'}},
+    {'fieldId': 'issuetype', 'name': 'Issue Type', 'required': True, 'schema': {'type': 'issuetype', 'system': 'issuetype'}},
+    {'fieldId': 'summary', 'name': 'Summary', 'required': True, 'schema': {'type': 'string', 'system': 'summary'}},
+    {'fieldId': 'description', 'name': 'Description', 'required': False, 'schema': {'type': 'string', 'system': 'description'}},
+    {'fieldId': 'labels', 'name': 'Labels', 'required': False, 'schema': {'type': 'array', 'items': 'string', 'system': 'labels'}},
+    {
+        'fieldId': 'priority', 'name': 'Priority', 'required': False, 'hasDefaultValue': True,
+        'schema': {'type': 'priority', 'system': 'priority'},
+        'allowedValues': [{'id': str(index), 'name': name} for index, name in enumerate(['Highest', 'High', 'Medium', 'Low', 'Lowest'], 1)],
+    },
+]
+
+class MockJiraServer(MockServer):
+    """
+    Stand-in for the Jira REST endpoints used by the Jira destination adapter.
+
+    Created issues are kept in memory, and requests without credentials or
+    without a summary are rejected like Jira does.
+    """
+
+    name = 'jira'
+
+    def __init__(self, project_key='BENCH', **options):
+        super().__init__(**options)
+        self.project_key = project_key
+        self.issues = {}
+        self._ids = itertools.count(10000)
+        self._issues_lock = threading.Lock()
+
+        self.route('GET', r'/rest/api/2/myself', self.myself, 'myself')
+        self.route('GET', r'/rest/api/2/project/(?P<key>[^/]+)', self.get_project, 'project')
+        self.route('GET', r'/rest/api/2/issue/createmeta/(?P<key>[^/]+)/issuetypes', self.issue_types, 'createmeta issue types')
+        self.route(
+            'GET', r'/rest/api/2/issue/createmeta/(?P<key>[^/]+)/issuetypes/(?P<issue_type_id>\d+)',
+            self.create_fields, 'createmeta fields'
+        )
+        self.route('POST', r'/rest/api/2/issue', self.create_issue, 'create issue')
+
+    @property
+    def base_url(self):
+        return self.url
+
+    def authorized(self, request):
+        return bool(request['headers'].get('Authorization'))
+
+    def myself(self, request):
+        if not self.authorized(request):
+            return MockResponse(401, {'errorMessages': ['You are not authenticated']})
+        return MockResponse(200, {'name': 'bench', 'displayName': 'Benchmark User'})
+
+    def get_project(self, request, key):
+        if not self.authorized(request):
+            return MockResponse(401)
+        if key != self.project_key:
+            return MockResponse(404, {'errorMessages': [f"No project could be found with key '{key}'."]})
+        return MockResponse(200, {'id': '10000', 'key': key, 'name': 'Benchmark'})
+
+    def issue_types(self, request, key):
+        if not self.authorized(request):
+            return MockResponse(401)
+        if key != self.project_key:
+            return MockResponse(404)
+        return MockResponse(200, {'values': ISSUE_TYPES, 'isLast': True})
+
+    def create_fields(self, request, key, issue_type_id):
+        if not self.authorized(request):
+            return MockResponse(401)
+        start_at = int(request['query'].get('startAt', 0))
+        max_results = int(request['query'].get('maxResults', 50))
+        page = CREATE_FIELDS[start_at:start_at + max_results]
+        return MockResponse(200, {
+            'values': page,
+            'startAt': start_at,
+            'total': len(CREATE_FIELDS),
+            'isLast': start_at + len(page) >= len(CREATE_FIELDS),
+        })
+
+    def create_issue(self, request):
+        if not self.authorized(request):
+            return MockResponse(401)
+        fields = (json_body(request) or {}).get('fields', {})
+        if fields.get('project', {}).get('key') != self.project_key:
+            return MockResponse(400, {'errors': {'project': 'valid project is required'}})
+        if not fields.get('summary'):
+            return MockResponse(400, {'errors': {'summary': 'You must specify a summary of the issue.'}})
+
+        with self._issues_lock:
+            issue_id = str(next(self._ids))
+            key = f"{self.project_key}-{len(self.issues) + 1}"
+            self.issues[key] = fields
+        return MockResponse(201, {'id': issue_id, 'key': key, 'self': f"{self.url}/rest/api/2/issue/{issue_id}"})
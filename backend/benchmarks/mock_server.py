@@ -0,0 +1,189 @@
+import json
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+class MockResponse:
+    """
+    Response of a mock endpoint.
+    """
+
+    def __init__(self, status=200, body=None, headers=None, content_type='application/json'):
+        self.status = status
+        self.headers = dict(headers or {})
+        if isinstance(body, bytes):
+            self.body = body
+        else:
+            self.body = b'' if body is None else json.dumps(body).encode('utf-8')
+        self.headers.setdefault('Content-Type', content_type)
+
+class RateLimiter:
+    """
+    Token bucket spacing out requests to a maximum rate.
+
+    Requests over the rate wait for their turn instead of being rejected, as
+    behind a throttling proxy, so clients without retry logic still finish.
+    """
+
+    def __init__(self, rate):
+        self.interval = 1 / rate
+        self._next_slot = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next_slot, now)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+        return slot - now
+
+class MockServer:
+    """
+    Local HTTP server standing in for a remote system in benchmarks.
+
+    Subclasses register their endpoints with route(). The server runs in a
+    background thread on an ephemeral port and counts the requests made to
+    each endpoint. Every request can be slowed down by a fixed latency, and
+    the request rate capped to emulate a throttled system.
+    """
+
+    name = 'mock'
+
+    def __init__(self, latency=0.0, rate_limit=None, host='127.0.0.1', port=0):
+        """
+        Args:
+            latency (float): Seconds added to every response
+            rate_limit (float, optional): Maximum requests per second
+            host (str): Interface to listen on
+            port (int): Port to listen on, 0 for any free port
+        """
+        self.latency = latency
+        self.rate_limiter = RateLimiter(rate_limit) if rate_limit else None
+        self.address = (host, port)
+        self.routes = []
+        self.request_counts = Counter()
+        self.throttled_seconds = 0.0
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    def route(self, method, pattern, handler, name=None):
+        """
+        Register an endpoint.
+
+        Args:
+            method (str): HTTP method
+            pattern (str): Regular expression matched against the whole path;
+                           named groups are passed to the handler
+            handler (callable): Called with the request and the groups,
+                                returns a MockResponse
+            name (str, optional): Name under which requests are counted
+        """
+        self.routes.append((method, re.compile(pattern), handler, name or pattern))
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def request_count(self):
+        return sum(self.request_counts.values())
+
+    def start(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                server.handle(self)
+
+            do_POST = do_PUT = do_DELETE = do_GET
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(self.address, Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name=f"{self.name}-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._thread.join()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def reset_counts(self):
+        with self._lock:
+            self.request_counts.clear()
+            self.throttled_seconds = 0.0
+
+    def handle(self, http):
+        """
+        Dispatch a request to its endpoint and write the response.
+        """
+        parsed = urlparse(http.path)
+        length = int(http.headers.get('Content-Length') or 0)
+        body = http.rfile.read(length) if length else b''
+        request = {
+            'method': http.command,
+            'path': parsed.path,
+            'query': {name: values[-1] for name, values in parse_qs(parsed.query).items()},
+            'headers': http.headers,
+            'body': body,
+        }
+
+        if self.rate_limiter:
+            waited = self.rate_limiter.wait()
+            with self._lock:
+                self.throttled_seconds += waited
+        if self.latency:
+            time.sleep(self.latency)
+
+        response = None
+        for method, pattern, handler, name in self.routes:
+            match = pattern.fullmatch(parsed.path)
+            if method == http.command and match:
+                with self._lock:
+                    self.request_counts[name] += 1
+                try:
+                    response = handler(request, **match.groupdict())
+                except Exception as e:
+                    response = MockResponse(500, {'errorMessages': [str(e)]})
+                break
+        if response is None:
+            with self._lock:
+                self.request_counts['<unmatched>'] += 1
+            response = MockResponse(404, {'errorMessages': [f"No mock endpoint for {http.command} {parsed.path}"]})
+
+        http.send_response(response.status)
+        for name, value in response.headers.items():
+            if isinstance(value, (list, tuple)):
+                for item in value:
+                    http.send_header(name, item)
+            else:
+                http.send_header(name, value)
+        http.send_header('Content-Length', str(len(response.body)))
+        http.end_headers()
+        http.wfile.write(response.body)
+
+def json_body(request):
+    """
+    Decode the JSON body of a mock request.
+    """
+    return json.loads(request['body'] or b'null')
@@ -1,6 +1,111 @@
 # common/adapter_loader.py
 import importlib
-import inspect
+import logging
+import pkgutil
+import threading
+
+logger = logging.getLogger(__name__)
+
+class AdapterRegistry:
+    """
+    Discovers adapter classes by module naming convention and caches them.
+    
+    An adapter of type "alm" lives in the module "{package}.alm{module_suffix}"
+    and is the class whose name ends with class_suffix. Modules are imported
+    on first use only, and each lookup is cached for the lifetime of the
+    process, so loading an adapter for a job or a connection test no longer
+    imports and scans its module.
+    """
+    
+    def __init__(self, package, module_suffix, class_suffix, base_class_name):
+        """
+        Args:
+            package (str): Package containing the adapter modules
+            module_suffix (str): Suffix of the adapter module names
+            class_suffix (str): Suffix of the adapter class names
+            base_class_name (str): Name of the base class to ignore
+        """
+        self.package = package
+        self.module_suffix = module_suffix
+        self.class_suffix = class_suffix
+        self.base_class_name = base_class_name
+        self._classes = {}
+        self._discovered = False
+        self._lock = threading.Lock()
+    
+    def get_module_path(self, adapter_type):
+        return f"{self.package}.{adapter_type}{self.module_suffix}"
+    
+    def get_class(self, adapter_type):
+        """
+        Return the adapter class of a type, importing its module on first use.
+        
+        Raises:
+            ImportError: If the adapter module cannot be imported
+            ValueError: If the adapter class cannot be found in the module
+        """
+        adapter_class = self._classes.get(adapter_type)
+        if adapter_class is not None:
+            return adapter_class
+        if not str(adapter_type).isidentifier():
+            raise ImportError(f"Invalid adapter type: {adapter_type!r}")
+        
+        with self._lock:
+            if adapter_type not in self._classes:
+                self._classes[adapter_type] = self._find_class(adapter_type)
+            return self._classes[adapter_type]
+    
+    def _find_class(self, adapter_type):
+        module_path = self.get_module_path(adapter_type)
+        module = importlib.import_module(module_path)
+        
+        for name, obj in sorted(vars(module).items()):
+            if (
+                isinstance(obj, type)
+                and name.endswith(self.class_suffix)
+                and name != self.base_class_name
+            ):
+                return obj
+        
+        raise ValueError(f"Could not find adapter class in module {module_path}")
+    
+    def discover(self):
+        """
+        Load every adapter module of the package once.
+        
+        Modules that fail to import are logged and left out.
+        
+        Returns:
+            dict: Adapter classes keyed by adapter type
+        """
+        if not self._discovered:
+            package = importlib.import_module(self.package)
+            for module_info in pkgutil.iter_modules(package.__path__):
+                if not module_info.name.endswith(self.module_suffix):
+                    continue
+                adapter_type = module_info.name[:-len(self.module_suffix)]
+                try:
+                    self.get_class(adapter_type)
+                except (ImportError, ValueError) as e:
+                    logger.warning("Skipping adapter '%s': %s", adapter_type, e)
+            self._discovered = True
+        
+        return dict(self._classes)
+    
+    def describe(self):
+        """
+        Return the metadata of every available adapter.
+        
+        Returns:
+            list: One dict per adapter, as returned by its describe() method
+        """
+        return [
+            adapter_class.describe(adapter_type)
+            for adapter_type, adapter_class in sorted(self.discover().items())
+        ]
+
+source_adapters = AdapterRegistry('sources.adapters', '_download', 'SourceAdapter', 'SourceAdapterBase')
+destination_adapters = AdapterRegistry('destinations.adapters', '_upload', 'DestinationAdapter', 'DestinationAdapterBase')
 
 def load_source_adapter(adapter_type, config, job=None):
     """
@@ -10,31 +115,23 @@ def load_source_adapter(adapter_type, config, job=None):
         adapter_type (str): The type of adapter to load (e.g., 'alm')
         config (dict): Configuration for the adapter
         job (Job, optional): Job instance for logging
-        
+    
     Returns:
         SourceAdapterBase: An instance of the requested adapter
-        
+    
     Raises:
         ImportError: If the adapter module cannot be imported
         ValueError: If the adapter class cannot be found in the module
     """
     try:
-        # Import the module dynamically
-        module_path = f"sources.adapters.{adapter_type}_download"
-        module = importlib.import_module(module_path)
-        
-        # Find the adapter class in the module
-        for name, obj in inspect.getmembers(module, inspect.isclass):
-            if name.endswith('SourceAdapter') and name != 'SourceAdapterBase':
-                adapter_class = obj
-                return adapter_class(config, job)
-                
-        raise ValueError(f"Could not find adapter class in module {module_path}")
-        
+        adapter_class = source_adapters.get_class(adapter_type)
     except ImportError as e:
+        module_path = source_adapters.get_module_path(adapter_type)
         if job:
             job.add_error(f"Could not import adapter module: {module_path}", {"exception": str(e)})
         raise ImportError(f"Source adapter '{adapter_type}' not found. Error: {str(e)}")
+    
+    return adapter_class(config, job)
 
 def load_destination_adapter(adapter_type, config, job=None):
     """
@@ -44,28 +141,20 @@ def load_destination_adapter(adapter_type, config, job=None):
         adapter_type (str): The type of adapter to load (e.g., 'jira')
         config (dict): Configuration for the adapter
         job (Job, optional): Job instance for logging
-        
+    
     Returns:
         DestinationAdapterBase: An instance of the requested adapter
-        
+    
     Raises:
         ImportError: If the adapter module cannot be imported
         ValueError: If the adapter class cannot be found in the module
     """
     try:
-        # Import the module dynamically
-        module_path = f"destinations.adapters.{adapter_type}_upload"
-        module = importlib.import_module(module_path)
-        
-        # Find the adapter class in the module
-        for name, obj in inspect.getmembers(module, inspect.isclass):
-            if name.endswith('DestinationAdapter') and name != 'DestinationAdapterBase':
-                adapter_class = obj
-                return adapter_class(config, job)
-                
-        raise ValueError(f"Could not find adapter class in module {module_path}")
-        
+        adapter_class = destination_adapters.get_class(adapter_type)
     except ImportError as e:
+        module_path = destination_adapters.get_module_path(adapter_type)
         if job:
             job.add_error(f"Could not import adapter module: {module_path}", {"exception": str(e)})
         raise ImportError(f"Destination adapter '{adapter_type}' not found. Error: {str(e)}")
+    
+    return adapter_class(config, job)
@@ -0,0 +1,90 @@
+import hashlib
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework.response import Response
+
+def touch_collections(*names):
+    """
+    Mark collections of resources as changed.
+    
+    Each collection has a version token in the cache that is replaced on every
+    change, which invalidates the ETags and cached responses derived from it.
+    
+    Args:
+        *names (str): Names of the changed collections, e.g. 'jobs'
+    """
+    now = time.time()
+    cache.set_many({
+        f"collection-version:{name}": (uuid.uuid4().hex, now)
+        for name in names
+    }, None)
+
+def get_collections_version(*names):
+    """
+    Return the combined version of collections of resources.
+    
+    Collections without a version in the cache (e.g. after a cache flush) get
+    a fresh one, so stale ETags are never matched.
+    
+    Args:
+        *names (str): Names of the collections
+    
+    Returns:
+        tuple: Version token and time of the last change of the collections
+    """
+    keys = [f"collection-version:{name}" for name in names]
+    versions = cache.get_many(keys)
+    missing = {key: (uuid.uuid4().hex, time.time()) for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, None)
+        versions.update(missing)
+    
+    token = ':'.join(versions[key][0] for key in keys)
+    return token, max(versions[key][1] for key in keys)
+
+def conditional_response(request, key, version, last_modified, build):
+    """
+    Serve a read endpoint with conditional GET support and a cached body.
+    
+    The ETag is derived from the resource key and version. When it matches
+    the request's If-None-Match (or, lacking that, Last-Modified is not newer
+    than If-Modified-Since), a 304 is returned without building the body.
+    Otherwise the serialized body is taken from the cache, or built and
+    cached for API_RESPONSE_CACHE_TIMEOUT seconds.
+    
+    Args:
+        request (Request): The incoming GET request
+        key (str): Identifies the resource, including any query parameters
+        version (str): Changes whenever the resource representation changes
+        last_modified (float): Unix timestamp of the last change, or None
+        build (callable): Returns the serialized body
+    
+    Returns:
+        HttpResponse: A 304 response or a Response with ETag headers
+    """
+    digest = hashlib.sha1(f"{key}|{version}".encode()).hexdigest()
+    etag = quote_etag(digest)
+    last_modified = int(last_modified) if last_modified else None
+    
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        return not_modified
+    
+    cache_key = f"response:{digest}"
+    data = cache.get(cache_key)
+    if data is None:
+        data = build()
+        cache.set(cache_key, data, settings.API_RESPONSE_CACHE_TIMEOUT)
+    
+    response = Response(data)
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified)
+    # Let clients store the response, but always revalidate it
+    response['Cache-Control'] = 'private, no-cache'
+    return response
@@ -0,0 +1,29 @@
+import uuid
+from contextlib import contextmanager
+
+from django.core.cache import cache
+
+@contextmanager
+def cache_lock(key, timeout=60):
+    """
+    Hold a distributed lock on the shared cache for the enclosed block.
+    
+    The lock is not blocking: the context yields whether it was acquired, so
+    callers decide what to do when another process holds it. The timeout
+    bounds how long a crashed holder can keep the lock.
+    
+    Args:
+        key (str): Name of the lock
+        timeout (int): Expiry of the lock in seconds
+        
+    Yields:
+        bool: True if the lock was acquired
+    """
+    key = f"lock:{key}"
+    token = uuid.uuid4().hex
+    acquired = cache.add(key, token, timeout)
+    try:
+        yield acquired
+    finally:
+        if acquired and cache.get(key) == token:
+            cache.delete(key)
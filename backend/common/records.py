@@ -0,0 +1,235 @@
+from collections.abc import Mapping
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+class _Missing:
+    """
+    Marks a field that a record does not have, as opposed to a None value.
+    """
+    
+    def __repr__(self):
+        return '<missing>'
+    
+    def __reduce__(self):
+        return 'MISSING'
+
+MISSING = _Missing()
+
+class RecordView(Mapping):
+    """
+    Read-only dict view of one record of a RecordBatch.
+    
+    Views let code written for lists of dicts (record.get(...), record[...],
+    iteration over fields) consume a batch without materialising the records.
+    """
+    __slots__ = ('_batch', '_row')
+    
+    def __init__(self, batch, row):
+        self._batch = batch
+        self._row = row
+    
+    def __getitem__(self, name):
+        value = self._batch._columns[self._batch._positions[name]][self._row]
+        if value is MISSING:
+            raise KeyError(name)
+        return value
+    
+    def get(self, name, default=None):
+        position = self._batch._positions.get(name)
+        if position is None:
+            return default
+        value = self._batch._columns[position][self._row]
+        return default if value is MISSING else value
+    
+    def __contains__(self, name):
+        return self.get(name, MISSING) is not MISSING
+    
+    def __iter__(self):
+        row = self._row
+        for name, column in zip(self._batch.schema, self._batch._columns):
+            if column[row] is not MISSING:
+                yield name
+    
+    def __len__(self):
+        row = self._row
+        return sum(1 for column in self._batch._columns if column[row] is not MISSING)
+    
+    def to_dict(self):
+        row = self._row
+        return {
+            name: column[row]
+            for name, column in zip(self._batch.schema, self._batch._columns)
+            if column[row] is not MISSING
+        }
+    
+    def __repr__(self):
+        return f"RecordView({self.to_dict()!r})"
+
+class RecordBatch:
+    """
+    Columnar batch of records: one shared schema and one list per field.
+    
+    This is the format in which records move between the source adapter,
+    the transformations and the destination adapter. Compared to a list of
+    dicts, field names are stored once per batch instead of once per record,
+    and whole columns can be handed to NumPy or Arrow when they are installed.
+    Iterating a batch yields RecordView objects, so adapters that expect dicts
+    keep working unchanged.
+    
+    Columns are plain Python lists, so values are still one Python object
+    each; only the per-record dicts and their keys are saved. The saving
+    also only starts once a batch is built: the ALM source assembles each
+    test as a dict (design steps are merged into it afterwards) and
+    from_records() converts the batch, so a batch briefly exists in both
+    forms during extraction.
+    """
+    
+    def __init__(self, schema, columns, length=None):
+        """
+        Args:
+            schema (iterable): Field names, in column order
+            columns (list): One list of values per field; MISSING marks
+                            fields a record does not have
+            length (int, optional): Number of records, required when the
+                                    batch has no columns
+        """
+        self.schema = tuple(schema)
+        self._columns = list(columns)
+        self._positions = {name: position for position, name in enumerate(self.schema)}
+        if len(self._positions) != len(self._columns):
+            raise ValueError("A record batch needs exactly one column per field")
+        
+        self._length = len(self._columns[0]) if self._columns else (length or 0)
+        if any(len(column) != self._length for column in self._columns):
+            raise ValueError("All columns of a record batch must have the same length")
+    
+    @classmethod
+    def from_records(cls, records):
+        """
+        Build a batch from dict-like records, in a single pass.
+        
+        Args:
+            records (iterable): Dicts, RecordViews or a RecordBatch
+        
+        Returns:
+            RecordBatch: The batch; a RecordBatch is returned as is
+        """
+        if isinstance(records, RecordBatch):
+            return records
+        
+        positions = {}
+        columns = []
+        length = 0
+        for row, record in enumerate(records):
+            for name, value in record.items():
+                position = positions.get(name)
+                if position is None:
+                    position = positions[name] = len(columns)
+                    columns.append([MISSING] * row)
+                columns[position].append(value)
+            if len(record) < len(columns):
+                for column in columns:
+                    if len(column) == row:
+                        column.append(MISSING)
+            length = row + 1
+        
+        return cls(positions, columns, length)
+    
+    @classmethod
+    def from_arrow(cls, table):
+        """
+        Build a batch from a pyarrow Table; nulls become None.
+        """
+        return cls(table.column_names, [column.to_pylist() for column in table.columns], table.num_rows)
+    
+    def __len__(self):
+        return self._length
+    
+    def __iter__(self):
+        for row in range(self._length):
+            yield RecordView(self, row)
+    
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return RecordBatch(self.schema, [column[index] for column in self._columns], len(range(self._length)[index]))
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("record batch index out of range")
+        return RecordView(self, index)
+    
+    def __repr__(self):
+        return f"RecordBatch({self._length} records, {len(self.schema)} fields)"
+    
+    def column(self, name, default=None):
+        """
+        Return the values of a field, with default for records without it.
+        """
+        position = self._positions.get(name)
+        if position is None:
+            return [default] * self._length
+        return [default if value is MISSING else value for value in self._columns[position]]
+    
+    def take(self, rows):
+        """
+        Return a batch of the records at the given row indices.
+        """
+        rows = list(rows)
+        return RecordBatch(self.schema, [[column[row] for row in rows] for column in self._columns], len(rows))
+    
+    def rename(self, mapping):
+        """
+        Return a batch with renamed fields, sharing the column data.
+        """
+        schema = [mapping.get(name, name) for name in self.schema]
+        if len(set(schema)) != len(schema):
+            raise ValueError("Renaming would give two fields the same name")
+        return RecordBatch(schema, self._columns, self._length)
+    
+    def drop(self, names):
+        """
+        Return a batch without the given fields, sharing the column data.
+        """
+        names = set(names)
+        kept = [position for position, name in enumerate(self.schema) if name not in names]
+        return RecordBatch([self.schema[position] for position in kept], [self._columns[position] for position in kept], self._length)
+    
+    def to_records(self):
+        """
+        Return the records as a list of plain dicts.
+        """
+        return [view.to_dict() for view in self]
+    
+    def to_numpy(self, name):
+        """
+        Return a field as a NumPy array; missing values become None.
+        
+        Raises:
+            ImportError: If NumPy is not installed
+        """
+        if numpy is None:
+            raise ImportError("NumPy is required to convert record batch columns to arrays")
+        values = self.column(name)
+        try:
+            return numpy.array(values)
+        except (TypeError, ValueError):
+            return numpy.array(values, dtype=object)
+    
+    def to_arrow(self):
+        """
+        Return the batch as a pyarrow Table; missing values become nulls.
+        
+        Raises:
+            ImportError: If pyarrow is not installed
+        """
+        if pyarrow is None:
+            raise ImportError("pyarrow is required to convert record batches to Arrow tables")
+        return pyarrow.table({name: self.column(name) for name in self.schema})
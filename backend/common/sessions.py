@@ -0,0 +1,144 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+import requests
+from django.conf import settings
+
+class AuthenticationError(Exception):
+    """
+    Raised when logging in to an external system fails.
+    """
+    
+    def __init__(self, message, details=None):
+        super().__init__(message)
+        self.details = details or {}
+
+class AuthenticatedSession(requests.Session):
+    """
+    requests session that logs in again when a request is rejected with 401,
+    e.g. because the server-side session or its cookie expired.
+    
+    The login callable receives the session and sets its cookies or headers;
+    it raises AuthenticationError when the credentials are rejected. Requests
+    made by the login callable itself should pass reauthenticate=False.
+    """
+    
+    def __init__(self, login):
+        super().__init__()
+        self.login = login
+        self.authenticated = False
+        self._login_lock = threading.Lock()
+        self._logins = 0
+    
+    def authenticate(self):
+        """
+        Log in, replacing the credentials of the session.
+        
+        Raises:
+            AuthenticationError: If the credentials are rejected
+        """
+        with self._login_lock:
+            self._relogin()
+    
+    def _relogin(self):
+        self.authenticated = False
+        self.login(self)
+        self.authenticated = True
+        self._logins += 1
+    
+    def request(self, method, url, *args, reauthenticate=True, **kwargs):
+        logins = self._logins
+        response = super().request(method, url, *args, **kwargs)
+        if response.status_code != 401 or not reauthenticate:
+            return response
+        
+        with self._login_lock:
+            # Threads sharing the session log in only once
+            if logins == self._logins:
+                try:
+                    self._relogin()
+                except AuthenticationError:
+                    return response
+        return super().request(method, url, *args, **kwargs)
+
+class SessionPool:
+    """
+    Process-wide pool of authenticated sessions, keyed by a hash of the
+    connection settings.
+    
+    Reusing a session skips the login and keeps its keep-alive connections.
+    Sessions expire ADAPTER_SESSION_TTL seconds after their login, and the
+    least recently used ones are closed when the pool holds more than
+    ADAPTER_SESSION_POOL_SIZE sessions.
+    """
+    
+    def __init__(self):
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def get_key(namespace, connection):
+        digest = hashlib.sha256(json.dumps(connection, sort_keys=True, default=str).encode()).hexdigest()
+        return f"{namespace}:{digest}"
+    
+    def get(self, namespace, connection, create):
+        """
+        Return the pooled session of a connection, creating it if needed.
+        
+        Args:
+            namespace (str): Kind of system, e.g. 'alm'
+            connection (dict): Settings identifying the connection, including
+                               the credentials
+            create (callable): Returns a new authenticated session
+        
+        Returns:
+            AuthenticatedSession: A logged-in session
+        
+        Raises:
+            AuthenticationError: If a new session cannot log in
+        """
+        key = self.get_key(namespace, connection)
+        with self._lock:
+            entry = self._sessions.get(key)
+            if entry is not None:
+                session, expires_at = entry
+                if session.authenticated and expires_at > time.monotonic():
+                    self._sessions.move_to_end(key)
+                    return session
+                self._discard(key)
+        
+        session = create()
+        with self._lock:
+            if key in self._sessions:
+                # Another thread created one meanwhile; keep the pooled one
+                session.close()
+                return self._sessions[key][0]
+            self._sessions[key] = (session, time.monotonic() + settings.ADAPTER_SESSION_TTL)
+            while len(self._sessions) > settings.ADAPTER_SESSION_POOL_SIZE:
+                self._discard(next(iter(self._sessions)))
+        return session
+    
+    def discard(self, namespace, connection):
+        """
+        Close and forget the pooled session of a connection.
+        """
+        with self._lock:
+            self._discard(self.get_key(namespace, connection))
+    
+    def clear(self):
+        """
+        Close every pooled session.
+        """
+        with self._lock:
+            for key in list(self._sessions):
+                self._discard(key)
+    
+    def _discard(self, key):
+        entry = self._sessions.pop(key, None)
+        if entry is not None:
+            entry[0].close()
+
+session_pool = SessionPool()
@@ -0,0 +1,80 @@
+import pytest
+import requests
+
+from .sessions import AuthenticatedSession, AuthenticationError, SessionPool
+
+class TokenServer(requests.adapters.BaseAdapter):
+    """
+    Transport adapter answering 401 to requests without the current token.
+    """
+    
+    def __init__(self):
+        super().__init__()
+        self.token = 'first'
+        self.accept_logins = True
+        self.requests = []
+    
+    def send(self, request, **kwargs):
+        self.requests.append(request.url)
+        response = requests.Response()
+        response.request = request
+        response.url = request.url
+        response.status_code = 200 if request.headers.get('Authorization') == self.token else 401
+        return response
+    
+    def close(self):
+        pass
+
+@pytest.fixture
+def server():
+    return TokenServer()
+
+@pytest.fixture
+def create_session(server):
+    logins = []
+    
+    def login(session):
+        if not server.accept_logins:
+            raise AuthenticationError("Invalid credentials")
+        logins.append(server.token)
+        session.headers['Authorization'] = server.token
+    
+    def create():
+        session = AuthenticatedSession(login)
+        session.mount('https://', server)
+        session.authenticate()
+        return session
+    
+    create.logins = logins
+    return create
+
+def test_pooled_session_logs_in_again_on_401(server, create_session):
+    pool = SessionPool()
+    connection = {'base_url': 'https://alm.example.com', 'client_id': 'client'}
+    session = pool.get('alm', connection, create_session)
+    assert pool.get('alm', connection, create_session) is session
+    
+    # The server-side session expires
+    server.token = 'second'
+    response = session.get('https://alm.example.com/tests')
+    
+    assert response.status_code == 200
+    assert create_session.logins == ['first', 'second']
+    assert server.requests == ['https://alm.example.com/tests'] * 2
+    assert pool.get('alm', connection, create_session) is session
+
+def test_rejected_login_returns_the_401(server, create_session):
+    session = create_session()
+    server.token = 'second'
+    server.accept_logins = False
+    
+    assert session.get('https://alm.example.com/tests').status_code == 401
+    assert session.get('https://alm.example.com/tests', reauthenticate=False).status_code == 401
+    assert create_session.logins == ['first']
+
+def test_pool_does_not_reuse_sessions_of_other_credentials(create_session):
+    pool = SessionPool()
+    session = pool.get('jira', {'username': 'ana'}, create_session)
+    
+    assert pool.get('jira', {'username': 'bo'}, create_session) is not session
+    assert pool.get('alm', {'username': 'ana'}, create_session) is not session
@@ -0,0 +1,61 @@
+from datetime import timedelta
+
+import pytest
+from django.core.cache import cache
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from jobs.models import Job
+from pipelines.models import Pipeline
+
+@pytest.fixture(autouse=True)
+def local_cache(settings):
+    """
+    Replace the Redis cache with a private in-memory one, so tests need no
+    Redis server and never get responses cached by another test.
+    """
+    settings.CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'tests',
+        }
+    }
+    cache.clear()
+
+@pytest.fixture
+def api_client(django_user_model):
+    client = APIClient()
+    client.force_authenticate(django_user_model.objects.create_user('tests'))
+    return client
+
+@pytest.fixture
+def pipelines(db):
+    """
+    Create a few pipelines with a history of finished jobs each, so that
+    per-row queries show up as a growing query count.
+    """
+    now = timezone.now()
+    pipelines = []
+    for index in range(3):
+        pipeline = Pipeline.objects.create(
+            name=f"Pipeline {index}",
+            source_type='alm',
+            source_config={'url': 'http://alm.example.com'},
+            destination_type='jira',
+            destination_config={'url': 'http://jira.example.com'},
+            status='active'
+        )
+        Job.objects.bulk_create([
+            Job(
+                pipeline=pipeline,
+                status=['completed', 'failed'][number % 2],
+                started_at=now - timedelta(hours=number + 1),
+                completed_at=now - timedelta(hours=number),
+                source_record_count=100,
+                destination_record_count=100 - number,
+                logs=[{'message': f"Log {line}", 'level': 'info'} for line in range(20)]
+            )
+            for number in range(4)
+        ])
+        pipelines.append(pipeline)
+    return pipelines
@@ -1,6 +1,10 @@
 import os
 from pathlib import Path
 from datetime import timedelta
+
+from celery.schedules import crontab
+from kombu import Queue
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
 
@@ -30,6 +34,7 @@ CORS_ALLOW_HEADERS = [
     'authorization',
     'content-type',
     'dnt',
+    'idempotency-key',
     'origin',
     'user-agent',
     'x-csrftoken',
@@ -51,6 +56,7 @@ INSTALLED_APPS = [
     'rest_framework_simplejwt',
     'corsheaders',
     'django_celery_results',  # Add this line for Celery results backend
+    'django_celery_beat',
     
     # Project apps
     'pipelines',
@@ -59,6 +65,7 @@ INSTALLED_APPS = [
     'jobs',
     'common',
     'authentication',
+    'benchmarks',
 ]
 
 MIDDLEWARE = [
@@ -152,6 +159,147 @@ CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
 
+# Celery queues: long extraction work, upload work and short control tasks are
+# consumed by separate workers, so bulk jobs never delay latency-sensitive ones
+CELERY_TASK_QUEUES = (
+    Queue('extraction'),
+    Queue('upload'),
+    Queue('control'),
+)
+CELERY_TASK_DEFAULT_QUEUE = 'control'
+CELERY_TASK_ROUTES = {
+    'jobs.tasks.execute_pipeline': {'queue': 'extraction'},
+    'jobs.tasks.execute_partition': {'queue': 'extraction'},
+    'jobs.tasks.upload_*': {'queue': 'upload'},
+    'jobs.tasks.finalize_partitioned_job': {'queue': 'control'},
+    'jobs.tasks.enforce_job_cancellation': {'queue': 'control'},
+    'jobs.tasks.run_scheduled_pipeline': {'queue': 'control'},
+    'jobs.tasks.compact_job_history': {'queue': 'control'},
+}
+
+# Bulk tasks are acknowledged after they finish, so a lost worker hands them
+# back to the queue; control tasks keep the default early acknowledgement
+PIPELINE_SOFT_TIME_LIMIT = int(os.environ.get('PIPELINE_SOFT_TIME_LIMIT', str(6 * 60 * 60)))  # Seconds
+PIPELINE_TIME_LIMIT = int(os.environ.get('PIPELINE_TIME_LIMIT', str(6 * 60 * 60 + 300)))  # Seconds
+BULK_TASK_ANNOTATIONS = {
+    'acks_late': True,
+    'soft_time_limit': PIPELINE_SOFT_TIME_LIMIT,
+    'time_limit': PIPELINE_TIME_LIMIT,
+}
+CELERY_TASK_ANNOTATIONS = {
+    'jobs.tasks.execute_pipeline': BULK_TASK_ANNOTATIONS,
+    'jobs.tasks.execute_partition': BULK_TASK_ANNOTATIONS,
+    'jobs.tasks.upload_staged_job': BULK_TASK_ANNOTATIONS,
+    'jobs.tasks.finalize_partitioned_job': {'soft_time_limit': 60, 'time_limit': 120},
+    'jobs.tasks.enforce_job_cancellation': {'soft_time_limit': 60, 'time_limit': 120},
+    'jobs.tasks.run_scheduled_pipeline': {'soft_time_limit': 60, 'time_limit': 120},
+    'jobs.tasks.compact_job_history': {'soft_time_limit': 3600, 'time_limit': 3900},
+}
+CELERY_TASK_REJECT_ON_WORKER_LOST = True
+
+# Workers reserve one message at a time by default; the control worker raises
+# this on its command line since its tasks are short
+CELERY_WORKER_PREFETCH_MULTIPLIER = int(os.environ.get('CELERY_WORKER_PREFETCH_MULTIPLIER', '1'))
+
+# Redis emulates priorities with one list per step; 0 is the highest priority.
+# Redis redelivers an unacknowledged message once its visibility timeout has
+# passed, so with late acknowledgement the timeout must outlast the longest
+# task, or a second worker runs it again and creates duplicate issues
+PIPELINE_BROKER_VISIBILITY_TIMEOUT = max(
+    int(os.environ.get('PIPELINE_BROKER_VISIBILITY_TIMEOUT', str(PIPELINE_TIME_LIMIT + 3600))),
+    PIPELINE_TIME_LIMIT + 60
+)  # Seconds
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    'visibility_timeout': PIPELINE_BROKER_VISIBILITY_TIMEOUT,
+    'priority_steps': list(range(10)),
+    'sep': ':',
+    'queue_order_strategy': 'priority',
+}
+PIPELINE_DEFAULT_PRIORITY = int(os.environ.get('PIPELINE_DEFAULT_PRIORITY', '5'))
+
+# Scheduled runs are created from Pipeline.schedule by django-celery-beat
+CELERY_BEAT_SCHEDULER = 'django_celery_beat.schedulers:DatabaseScheduler'
+PIPELINE_SCHEDULE_OVERLAP_POLICY = os.environ.get('PIPELINE_SCHEDULE_OVERLAP_POLICY', 'skip')  # 'skip' or 'queue'
+SCHEDULED_RUNS_MAX_CONCURRENT = int(os.environ.get('SCHEDULED_RUNS_MAX_CONCURRENT', '10'))
+SCHEDULED_RUNS_DEFER_DELAY = int(os.environ.get('SCHEDULED_RUNS_DEFER_DELAY', '60'))  # Seconds
+
+CELERY_BEAT_SCHEDULE = {
+    'compact-job-history': {
+        'task': 'jobs.tasks.compact_job_history',
+        'schedule': crontab(minute=0, hour=3),
+    },
+}
+
+# Job history retention: logs and errors of old jobs are moved to compressed
+# archives in the job_archive storage; summary columns stay in the database
+JOB_LOG_RETENTION_DAYS = int(os.environ.get('JOB_LOG_RETENTION_DAYS', '30'))
+CELERY_RESULT_RETENTION_DAYS = int(os.environ.get('CELERY_RESULT_RETENTION_DAYS', '7'))
+JOB_ARCHIVE_BATCH_SIZE = int(os.environ.get('JOB_ARCHIVE_BATCH_SIZE', '500'))
+JOB_ARCHIVE_COMPRESSION_LEVEL = int(os.environ.get('JOB_ARCHIVE_COMPRESSION_LEVEL', '9'))
+
+# Any Django storage backend works for the archive, e.g. an S3-compatible one
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+    'job_archive': {
+        'BACKEND': os.environ.get('JOB_ARCHIVE_STORAGE', 'django.core.files.storage.FileSystemStorage'),
+        'OPTIONS': {
+            'location': os.environ.get('JOB_ARCHIVE_DIR', os.path.join(BASE_DIR, 'archive')),
+        },
+    },
+}
+
+# Shared cache, also used for distributed locks
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ.get('REDIS_CACHE_URL', 'redis://localhost:6379/1'),
+    }
+}
+
+# Serialized pipeline and job responses, keyed by their ETag
+API_RESPONSE_CACHE_TIMEOUT = int(os.environ.get('API_RESPONSE_CACHE_TIMEOUT', '300'))  # Seconds
+
+# Authenticated ALM/Jira sessions reused across jobs of a worker process
+ADAPTER_SESSION_TTL = int(os.environ.get('ADAPTER_SESSION_TTL', '1800'))  # Seconds after login
+ADAPTER_SESSION_POOL_SIZE = int(os.environ.get('ADAPTER_SESSION_POOL_SIZE', '32'))
+
+# Jira create metadata used to validate issues before they are uploaded
+JIRA_CREATE_METADATA_CACHE_TIMEOUT = int(os.environ.get('JIRA_CREATE_METADATA_CACHE_TIMEOUT', '3600'))  # Seconds
+
+# Pipeline execution
+PIPELINE_BATCH_SIZE = int(os.environ.get('PIPELINE_BATCH_SIZE', '100'))
+PIPELINE_MAX_PARTITIONS = int(os.environ.get('PIPELINE_MAX_PARTITIONS', '16'))
+# Stage extracted records on disk and upload them in a separate task, unless
+# the pipeline's execution_config sets "staging"
+PIPELINE_STAGING = os.environ.get('PIPELINE_STAGING', 'False') == 'True'
+# Skip records that did not change since the last successful run, unless the
+# pipeline's execution_config sets "change_detection"
+PIPELINE_CHANGE_DETECTION = os.environ.get('PIPELINE_CHANGE_DETECTION', 'False') == 'True'
+
+# Directory under which the file destination adapter writes its output
+FILE_DESTINATION_ROOT = os.environ.get('FILE_DESTINATION_ROOT', os.path.join(BASE_DIR, 'exports'))
+
+# Cooperative job cancellation
+JOB_CANCEL_POLL_INTERVAL = float(os.environ.get('JOB_CANCEL_POLL_INTERVAL', '1'))  # Seconds
+JOB_CANCEL_DRAIN_TIMEOUT = int(os.environ.get('JOB_CANCEL_DRAIN_TIMEOUT', '60'))  # Seconds
+
+# Grouping of the errors reported by adapters
+JOB_ERROR_FLUSH_INTERVAL = float(os.environ.get('JOB_ERROR_FLUSH_INTERVAL', '5'))  # Seconds
+JOB_ERROR_SAMPLE_SIZE = int(os.environ.get('JOB_ERROR_SAMPLE_SIZE', '20'))  # Item IDs kept per error group
+JOB_ERROR_DETAIL_MAX_LENGTH = int(os.environ.get('JOB_ERROR_DETAIL_MAX_LENGTH', '2000'))  # Characters
+
+# Job artifacts (profiles, staging files, exports)
+JOB_ARTIFACTS_DIR = os.environ.get('JOB_ARTIFACTS_DIR', os.path.join(BASE_DIR, 'artifacts'))
+
+# Opt-in job profiling
+JOB_PROFILING_MAX_CONCURRENT = int(os.environ.get('JOB_PROFILING_MAX_CONCURRENT', '1'))
+JOB_PROFILING_SAMPLE_INTERVAL = float(os.environ.get('JOB_PROFILING_SAMPLE_INTERVAL', '0.01'))  # Seconds
+JOB_PROFILING_MAX_DEPTH = int(os.environ.get('JOB_PROFILING_MAX_DEPTH', '64'))
 
 
 # JWT settings
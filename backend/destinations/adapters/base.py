@@ -7,8 +7,38 @@ class DestinationAdapterBase(ABC):
     
     Destination adapters are responsible for connecting to a destination system,
     authenticating, and uploading data.
+    
+    Subclasses describe themselves to the pipeline types endpoint through
+    display_name, description and capabilities.
     """
     
+    display_name = None
+    description = ''
+    # bulk: upload_data() sends several records per request
+    # max_concurrency: number of concurrent requests made to the destination
+    capabilities = {
+        'bulk': False,
+        'max_concurrency': 1,
+    }
+    
+    @classmethod
+    def describe(cls, adapter_type):
+        """
+        Return the metadata of this adapter.
+        
+        Args:
+            adapter_type (str): Type under which the adapter is registered
+            
+        Returns:
+            dict: ID, name, description and capabilities of the adapter
+        """
+        return {
+            'id': adapter_type,
+            'name': cls.display_name or adapter_type,
+            'description': cls.description,
+            'capabilities': {**DestinationAdapterBase.capabilities, **cls.capabilities},
+        }
+    
     def __init__(self, config, job=None):
         """
         Initialize the adapter with configuration.
@@ -45,13 +75,39 @@ class DestinationAdapterBase(ABC):
         Upload data to the destination system.
         
         Args:
-            data (list): The data to upload
+            data (RecordBatch or list): The records to upload; iterating a
+                                        RecordBatch yields dict-like views
             
         Returns:
             dict: Results of the upload operation
         """
         pass
     
+    def get_uploaded_ids(self, results):
+        """
+        Extract the source IDs of the records uploaded successfully.
+        
+        Args:
+            results (dict): Results returned by upload_data()
+            
+        Returns:
+            list: Source IDs of the uploaded records
+        """
+        return [
+            created['source_id'] for created in results.get('created_issues', [])
+            if created.get('source_id') is not None
+        ]
+    
+    def close(self):
+        """
+        Finish the upload once the runner is done with the adapter.
+        
+        Called at the end of every run or partition, whether it completed,
+        was cancelled or failed, so that adapters writing their output in
+        stages can publish what has been uploaded. Does nothing by default.
+        """
+        pass
+    
     @abstractmethod
     def test_connection(self):
         """
@@ -63,6 +119,15 @@ class DestinationAdapterBase(ABC):
         """
         pass
     
+    def should_stop(self):
+        """
+        Check whether the job has been asked to stop.
+        
+        Adapters should call this between items and return early, letting
+        in-flight requests finish, so cancellation never interrupts a write.
+        """
+        return bool(self.job and self.job.is_cancel_requested())
+    
     def log(self, message, level='info'):
         """
         Log a message to the job if available.
@@ -74,7 +139,10 @@ class DestinationAdapterBase(ABC):
     def report_error(self, message, details=None):
         """
         Report an error to the job if available.
+        
+        Errors are grouped by status code and message, so adapters can report
+        each failed item without writing an entry per item.
         """
         if self.job:
-            self.job.add_error(message, details)
+            self.job.report_error(message, details)
         # Could also add standard error logging here
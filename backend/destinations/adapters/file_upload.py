@@ -0,0 +1,564 @@
+# destinations/adapters/file_upload.py
+import bz2
+import csv
+import fcntl
+import gzip
+import io
+import json
+import lzma
+import os
+import re
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+from django.conf import settings
+
+from common.records import MISSING, RecordBatch
+from .base import DestinationAdapterBase
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+FORMATS = ['jsonl', 'csv', 'parquet']
+
+# Compression of line-based files: each batch is compressed as a complete
+# stream and appended, which gzip, bzip2 and xz readers read as one file
+LINE_COMPRESSIONS = {
+    'gzip': ('.gz', lambda data, level: gzip.compress(data, compresslevel=6 if level is None else level)),
+    'bz2': ('.bz2', lambda data, level: bz2.compress(data, 9 if level is None else level)),
+    'xz': ('.xz', lambda data, level: lzma.compress(data, preset=level)),
+}
+PARQUET_COMPRESSIONS = ['snappy', 'gzip', 'zstd', 'brotli', 'lz4']
+
+# json.dumps() builds a new encoder per call when given options
+encode_json = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'), default=str).encode
+
+# Hive's name for partitions of records without a value
+NULL_PARTITION = '__HIVE_DEFAULT_PARTITION__'
+
+TEMP_SUFFIX = '.inprogress'
+
+def get_temp_path(path):
+    return os.path.join(os.path.dirname(path), f".{os.path.basename(path)}{TEMP_SUFFIX}")
+
+def get_final_path(temp_path):
+    return os.path.join(os.path.dirname(temp_path), os.path.basename(temp_path)[1:-len(TEMP_SUFFIX)])
+
+def lock_file(handle):
+    """
+    Take the lock a writer holds on its ".inprogress" file until it is
+    published. The system releases it when the worker dies, which tells
+    recovery the file was abandoned.
+    
+    Returns:
+        bool: False if another writer holds the file
+    """
+    try:
+        fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        return False
+    return True
+
+def publish_file(handle, temp_path, path):
+    """
+    Flush and sync a temporary file, then rename it to its final path.
+    """
+    handle.flush()
+    os.fsync(handle.fileno())
+    handle.close()
+    os.replace(temp_path, path)
+    # Persist the rename itself
+    directory = os.open(os.path.dirname(path), os.O_RDONLY)
+    try:
+        os.fsync(directory)
+    finally:
+        os.close(directory)
+
+def read_complete_batches(reader):
+    """
+    Read the record batches of an Arrow IPC stream, stopping at a batch cut
+    short by a writer that died, which was never reported as uploaded.
+    """
+    while True:
+        try:
+            yield reader.read_next_batch()
+        except StopIteration:
+            return
+        except (pyarrow.ArrowInvalid, OSError):
+            return
+
+def encode_value(value):
+    """
+    Format a field value for text columns of CSV and Parquet files.
+    """
+    if value is None or value is MISSING:
+        return None
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (dict, list, tuple)):
+        return encode_json(value)
+    return str(value)
+
+class FileWriter(ABC):
+    """
+    Output file being written by the file destination adapter.
+    
+    Records are written to a hidden ".inprogress" file next to the final
+    one, which publish() flushes, syncs and renames in one atomic step, so
+    readers of the output directory never see a partial file. Every batch
+    is flushed to that file before it is reported as uploaded, so that the
+    files of a worker that died can be published when the job resumes; see
+    FileDestinationAdapter.recover_abandoned_files().
+    """
+    
+    def __init__(self, path, fields=None):
+        """
+        Args:
+            path (str): Final path of the file
+            fields (tuple, optional): Fields of the records, for formats with
+                                      a fixed set of columns
+        """
+        self.path = path
+        self.temp_path = get_temp_path(path)
+        self.fields = fields
+        self.record_count = 0
+    
+    def accepts(self, batch):
+        """
+        Whether the records of a batch fit in this file's columns.
+        """
+        return self.fields is None or set(batch.schema) <= set(self.fields)
+    
+    @abstractmethod
+    def write(self, batch):
+        """
+        Append the records of a batch and flush them to the ".inprogress" file.
+        """
+        pass
+    
+    @abstractmethod
+    def publish(self):
+        """
+        Complete the file and move it to its final path.
+        """
+        pass
+    
+    def _open_temp_file(self):
+        handle = open(self.temp_path, 'w+b')
+        lock_file(handle)
+        return handle
+
+class LineFileWriter(FileWriter):
+    """
+    JSON Lines or CSV file.
+    
+    Each batch is serialized and compressed in memory, then appended with a
+    single write and flushed, so that the records reported as uploaded are
+    in the file even if the worker stops before publishing it.
+    """
+    
+    def __init__(self, path, file_format, compression=None, compression_level=None, fields=None):
+        super().__init__(path, fields if file_format == 'csv' else None)
+        self.file_format = file_format
+        self.compress = LINE_COMPRESSIONS[compression][1] if compression else None
+        self.compression_level = compression_level
+        self._handle = self._open_temp_file()
+        if file_format == 'csv':
+            self._write_chunk(self._serialize_csv([self.fields]))
+    
+    def write(self, batch):
+        if self.file_format == 'csv':
+            # Encoded column by column, as most columns only hold text
+            data = self._serialize_csv(zip(*(
+                [encode_value(value) for value in batch.column(name)] for name in self.fields
+            )))
+        else:
+            schema = batch.schema
+            columns = [batch.column(name, MISSING) for name in schema]
+            data = ''.join(
+                encode_json({name: value for name, value in zip(schema, row) if value is not MISSING}) + '\n'
+                for row in zip(*columns)
+            )
+        self._write_chunk(data)
+        self.record_count += len(batch)
+    
+    def _serialize_csv(self, rows):
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        return buffer.getvalue()
+    
+    def _write_chunk(self, text):
+        data = text.encode('utf-8')
+        if self.compress:
+            data = self.compress(data, self.compression_level)
+        self._handle.write(data)
+        self._handle.flush()
+    
+    def publish(self):
+        publish_file(self._handle, self.temp_path, self.path)
+    
+    @staticmethod
+    def recover(handle, temp_path, **options):
+        """
+        Publish the ".inprogress" file of a writer that died. Its batches
+        were flushed one by one, so it holds every record reported as
+        uploaded.
+        """
+        publish_file(handle, temp_path, get_final_path(temp_path))
+
+class ParquetFileWriter(FileWriter):
+    """
+    Parquet file with one nullable text column per field.
+    
+    A Parquet file is only readable once its footer is written, so records
+    are first appended to the ".inprogress" file as an Arrow IPC stream,
+    flushed after every batch. publish() then writes the Parquet file from
+    it, in row groups of row_group_size records.
+    """
+    
+    def __init__(self, path, fields, compression='snappy', row_group_size=100_000):
+        super().__init__(path, fields)
+        self.compression = compression
+        self.row_group_size = row_group_size
+        self.schema = pyarrow.schema([(name, pyarrow.string()) for name in fields])
+        self._handle = self._open_temp_file()
+        self._stream = pyarrow.ipc.new_stream(self._handle, self.schema)
+    
+    def write(self, batch):
+        self._stream.write_table(pyarrow.table(
+            {name: [encode_value(value) for value in batch.column(name)] for name in self.fields},
+            schema=self.schema
+        ))
+        self._handle.flush()
+        self.record_count += len(batch)
+    
+    def publish(self):
+        self._stream.close()
+        self._handle.seek(0)
+        self.build(self._handle, self.path, self.compression, self.row_group_size)
+        self._handle.close()
+        os.remove(self.temp_path)
+    
+    @staticmethod
+    def build(stream, path, compression, row_group_size):
+        """
+        Write and publish a Parquet file from an Arrow IPC stream of records.
+        
+        Raises:
+            pyarrow.ArrowInvalid: If the stream does not even hold its schema
+        """
+        reader = pyarrow.ipc.open_stream(stream)
+        build_path = f"{get_temp_path(path)}.build"
+        with open(build_path, 'wb') as build_file:
+            writer = pyarrow.parquet.ParquetWriter(build_file, reader.schema, compression=compression or 'none')
+            pending = []
+            pending_count = 0
+            for batch in read_complete_batches(reader):
+                pending.append(batch)
+                pending_count += batch.num_rows
+                if pending_count >= row_group_size:
+                    writer.write_table(pyarrow.Table.from_batches(pending), row_group_size=row_group_size)
+                    pending = []
+                    pending_count = 0
+            if pending:
+                writer.write_table(pyarrow.Table.from_batches(pending), row_group_size=row_group_size)
+            writer.close()
+            publish_file(build_file, build_path, path)
+    
+    @classmethod
+    def recover(cls, handle, temp_path, compression='snappy', row_group_size=100_000, **options):
+        """
+        Write the Parquet file of a writer that died from its stream.
+        """
+        path = get_final_path(temp_path)
+        try:
+            # A writer that died after publishing only left its stream behind
+            if not os.path.exists(path):
+                cls.build(handle, path, compression, row_group_size)
+        except pyarrow.ArrowInvalid:
+            # The writer died before flushing its first batch
+            pass
+        handle.close()
+        os.remove(temp_path)
+
+class FileDestinationAdapter(DestinationAdapterBase):
+    """
+    Adapter writing records to JSON Lines, CSV or Parquet files.
+    
+    Files are written under FILE_DESTINATION_ROOT, in the configured
+    directory, and named after the job, so that runs and the partitions of
+    a job never write to the same file. With partition_by, records are split
+    into Hive-style "field=value" subdirectories.
+    
+    Files only appear under their final name once complete: they are
+    published when they reach max_file_records, when a batch brings fields
+    a CSV or Parquet file has no column for, and when the runner closes the
+    adapter at the end of a run. Files left in progress by a worker that
+    died are published when the job resumes. JSON Lines and CSV files can be compressed
+    with gzip, bz2 or xz; Parquet files, which require pyarrow, with any
+    codec pyarrow supports.
+    
+    Parquet columns are all nullable strings: numbers, booleans and dates
+    are written as text, and lists and objects as JSON, the way they appear
+    in CSV files. Column types are not inferred, since a field holding
+    numbers in one batch may hold text in the next, and the files of a
+    dataset must share one schema.
+    """
+    
+    display_name = 'File'
+    description = 'JSON Lines, CSV or Parquet files'
+    capabilities = {
+        'bulk': True,
+        'max_concurrency': 1,
+    }
+    
+    def validate_config(self):
+        """
+        Validate file adapter configuration.
+        """
+        file_format = self.config.get('format', 'jsonl')
+        if file_format not in FORMATS:
+            raise ValueError(f"Unsupported file format: {file_format}")
+        if file_format == 'parquet' and pyarrow is None:
+            raise ValueError("Parquet output requires pyarrow to be installed")
+        
+        compression = self.config.get('compression')
+        allowed = PARQUET_COMPRESSIONS if file_format == 'parquet' else LINE_COMPRESSIONS
+        if compression is not None and compression not in allowed:
+            raise ValueError(f"Unsupported compression for {file_format} files: {compression}")
+        
+        partition_by = self.config.get('partition_by', [])
+        if not isinstance(partition_by, list) or not all(isinstance(field, str) for field in partition_by):
+            raise ValueError("partition_by must be a list of field names")
+        
+        for option in ['max_file_records', 'row_group_size', 'max_open_files']:
+            value = self.config.get(option)
+            if value is not None and (not isinstance(value, int) or value < 1):
+                raise ValueError(f"{option} must be a positive integer")
+        
+        # Raises ValueError for directories outside the root
+        self.get_directory()
+    
+    def get_directory(self):
+        """
+        Resolve the configured directory inside FILE_DESTINATION_ROOT.
+        """
+        root = os.path.realpath(settings.FILE_DESTINATION_ROOT)
+        directory = os.path.realpath(os.path.join(root, self.config.get('directory', '')))
+        if os.path.commonpath([root, directory]) != root:
+            raise ValueError("directory must be inside the file destination root")
+        return directory
+    
+    def authenticate(self):
+        """
+        Create the output directory and, when the job resumes, publish the
+        files its previous attempt left in progress; there are no
+        credentials to check.
+        """
+        try:
+            os.makedirs(self.get_directory(), exist_ok=True)
+            if self.job and self.job.checkpoint:
+                self.recover_abandoned_files()
+        except OSError as e:
+            self.report_error("Could not prepare the output directory", {'exception': str(e)})
+            return False
+        self.writers = OrderedDict()
+        self.file_prefix = f"part-{self.job.id if self.job else 'adhoc'}-{uuid.uuid4().hex[:8]}"
+        self.file_sequence = 0
+        self.published = []
+        return True
+    
+    def upload_data(self, data):
+        """
+        Write records to the open files of their partitions.
+        
+        Args:
+            data (RecordBatch or list): The records to write
+        
+        Returns:
+            dict: Results of the upload operation with the written source IDs
+        """
+        if not hasattr(self, 'writers'):
+            if not self.authenticate():
+                raise Exception("Could not prepare the output directory")
+        
+        batch = RecordBatch.from_records(data)
+        for directory, rows in self._group_by_partition(batch).items():
+            part = batch if len(rows) == len(batch) else batch.take(rows)
+            self._get_writer(directory, part).write(part)
+        
+        return {
+            'success_count': len(batch),
+            'error_count': 0,
+            'uploaded_ids': [source_id for source_id in batch.column('id') if source_id is not None],
+            'errors': []
+        }
+    
+    def get_uploaded_ids(self, results):
+        return results.get('uploaded_ids', [])
+    
+    def close(self):
+        """
+        Publish every open file.
+        """
+        writers = getattr(self, 'writers', {})
+        while writers:
+            _, writer = writers.popitem(last=False)
+            self._publish(writer)
+        if getattr(self, 'published', None):
+            record_count = sum(writer.record_count for writer in self.published)
+            self.log(f"Wrote {record_count} records to {len(self.published)} files in {self.get_directory()}")
+            self.published = []
+    
+    def recover_abandoned_files(self):
+        """
+        Publish the files of this job left in progress by a worker that died.
+        
+        Their records were reported as uploaded and checkpointed, so the
+        resumed run does not write them again. Files locked by a live writer,
+        such as those of the job's other partitions, are left alone.
+        
+        Returns:
+            int: Number of files recovered
+        """
+        file_format = self.config.get('format', 'jsonl')
+        writer_class = ParquetFileWriter if file_format == 'parquet' else LineFileWriter
+        options = {
+            'compression': self.config.get('compression') or 'snappy',
+            'row_group_size': self.config.get('row_group_size', 100_000),
+        } if file_format == 'parquet' else {}
+        
+        prefix = f".part-{self.job.id}-"
+        recovered = 0
+        for directory, _, names in os.walk(self.get_directory()):
+            for name in names:
+                if not (name.startswith(prefix) and name.endswith(TEMP_SUFFIX)):
+                    continue
+                temp_path = os.path.join(directory, name)
+                try:
+                    handle = open(temp_path, 'rb')
+                except FileNotFoundError:
+                    # Published or recovered meanwhile
+                    continue
+                if not lock_file(handle):
+                    handle.close()
+                    continue
+                try:
+                    writer_class.recover(handle, temp_path, **options)
+                    recovered += 1
+                except FileNotFoundError:
+                    # Recovered by another attempt after it was opened here
+                    handle.close()
+        
+        if recovered:
+            self.log(f"Published {recovered} files left in progress by a previous attempt")
+        return recovered
+    
+    def _group_by_partition(self, batch):
+        """
+        Group the rows of a batch by the directory of their partition.
+        
+        Returns:
+            dict: Row indices keyed by directory
+        """
+        directory = self.get_directory()
+        partition_by = self.config.get('partition_by', [])
+        if not partition_by:
+            return {directory: range(len(batch))}
+        
+        groups = {}
+        values = zip(*(batch.column(field) for field in partition_by))
+        for row, key in enumerate(values):
+            groups.setdefault(key, []).append(row)
+        return {
+            os.path.join(directory, *(
+                f"{field}={self._partition_value(value)}" for field, value in zip(partition_by, key)
+            )): rows
+            for key, rows in groups.items()
+        }
+    
+    def _partition_value(self, value):
+        if value is None or value == '':
+            return NULL_PARTITION
+        return re.sub(r'[^\w.-]', '_', str(value))[:100]
+    
+    def _get_writer(self, directory, batch):
+        """
+        Return the open file of a partition able to take a batch, publishing
+        the current one first if it is full or lacks columns.
+        """
+        writer = self.writers.pop(directory, None)
+        max_file_records = self.config.get('max_file_records', 1_000_000)
+        if writer is not None and (
+            writer.record_count + len(batch) > max_file_records or not writer.accepts(batch)
+        ):
+            self._publish(writer)
+            writer = None
+        
+        if writer is None:
+            # Keep the number of open files bounded when there are many partitions
+            while len(self.writers) >= self.config.get('max_open_files', 32):
+                _, oldest = self.writers.popitem(last=False)
+                self._publish(oldest)
+            writer = self._open_writer(directory, batch.schema)
+        
+        # Most recently used last
+        self.writers[directory] = writer
+        return writer
+    
+    def _open_writer(self, directory, fields):
+        os.makedirs(directory, exist_ok=True)
+        self.file_sequence += 1
+        file_format = self.config.get('format', 'jsonl')
+        compression = self.config.get('compression')
+        name = f"{self.file_prefix}-{self.file_sequence:05d}.{file_format}"
+        
+        if file_format == 'parquet':
+            return ParquetFileWriter(
+                os.path.join(directory, name),
+                fields,
+                compression=compression or 'snappy',
+                row_group_size=self.config.get('row_group_size', 100_000)
+            )
+        if compression:
+            name += LINE_COMPRESSIONS[compression][0]
+        return LineFileWriter(
+            os.path.join(directory, name),
+            file_format,
+            compression=compression,
+            compression_level=self.config.get('compression_level'),
+            fields=fields
+        )
+    
+    def _publish(self, writer):
+        writer.publish()
+        self.published.append(writer)
+    
+    def test_connection(self):
+        """
+        Check that the output directory can be created and written to.
+        
+        Returns:
+            dict: Connection test results with status and message
+        """
+        try:
+            directory = self.get_directory()
+            os.makedirs(directory, exist_ok=True)
+            probe = os.path.join(directory, f".probe-{uuid.uuid4().hex}")
+            with open(probe, 'wb') as probe_file:
+                probe_file.write(b'')
+            os.remove(probe)
+            return {
+                "status": "success",
+                "message": f"Output directory {directory} is writable"
+            }
+        except Exception as e:
+            return {
+                "status": "error",
+                "message": f"Connection test failed: {str(e)}"
+            }
@@ -0,0 +1,315 @@
+# destinations/adapters/jira_schema.py
+import datetime
+import hashlib
+import json
+from collections.abc import Mapping
+
+from django.conf import settings
+from django.core.cache import cache
+
+# Fields Jira fills in itself when they are left out of a create request
+AUTOMATIC_FIELDS = {'project', 'issuetype', 'reporter'}
+
+# Length limits Jira enforces on create but does not publish in the metadata
+SUMMARY_MAX_LENGTH = 255
+TEXT_FIELD_MAX_LENGTH = 255
+TEXT_AREA_MAX_LENGTH = 32767
+
+# Smallest batch in which a required field that is empty in every record
+# points at the field mapping rather than at the records
+EMPTY_REQUIRED_MIN_BATCH = 10
+
+# How each type of allowed value is referenced in a create request
+REFERENCE_KEYS = {
+    'option': 'value',
+    'priority': 'name',
+    'component': 'name',
+    'version': 'name',
+    'resolution': 'name',
+}
+
+class MappingError(ValueError):
+    """
+    The field mapping of a pipeline cannot produce valid Jira issues.
+    """
+    pass
+
+def fetch_create_metadata(session, base_url, project_key, issue_type, verify=True):
+    """
+    Retrieve the fields of the create screen of an issue type.
+    
+    Uses the createmeta endpoints of Jira 8.4+ and Jira Cloud, falling back
+    to the expanded createmeta resource of older servers.
+    
+    Returns:
+        dict: Field metadata keyed by field ID
+    
+    Raises:
+        MappingError: If the project or issue type does not exist
+    """
+    issue_types_url = f"{base_url}/rest/api/2/issue/createmeta/{project_key}/issuetypes"
+    response = session.get(issue_types_url, verify=verify)
+    if response.status_code == 200:
+        issue_types = response.json().get('values', [])
+        issue_type_id = next((item['id'] for item in issue_types if item.get('name') == issue_type), None)
+        if issue_type_id is None:
+            raise MappingError(f"Issue type {issue_type!r} is not available in project {project_key}")
+        
+        fields = {}
+        start_at = 0
+        while True:
+            response = session.get(
+                f"{issue_types_url}/{issue_type_id}",
+                params={'startAt': start_at, 'maxResults': 100},
+                verify=verify
+            )
+            response.raise_for_status()
+            page = response.json()
+            values = page.get('values', [])
+            for field in values:
+                fields[field['fieldId']] = field
+            start_at += len(values)
+            if page.get('isLast', True) or not values:
+                return fields
+    
+    response = session.get(
+        f"{base_url}/rest/api/2/issue/createmeta",
+        params={
+            'projectKeys': project_key,
+            'issuetypeNames': issue_type,
+            'expand': 'projects.issuetypes.fields'
+        },
+        verify=verify
+    )
+    response.raise_for_status()
+    projects = response.json().get('projects', [])
+    if not projects or not projects[0].get('issuetypes'):
+        raise MappingError(f"Issue type {issue_type!r} is not available in project {project_key}")
+    return projects[0]['issuetypes'][0].get('fields', {})
+
+def get_issue_schema(session, base_url, project_key, issue_type, verify=True):
+    """
+    Return the IssueSchema of an issue type, from the cache when possible.
+    
+    Create metadata changes rarely, so it is cached for
+    JIRA_CREATE_METADATA_CACHE_TIMEOUT seconds and shared by every job
+    uploading to the same project and issue type.
+    """
+    digest = hashlib.sha256(json.dumps([base_url, project_key, issue_type]).encode()).hexdigest()
+    cache_key = f"jira-createmeta:{digest}"
+    fields = cache.get(cache_key)
+    if fields is None:
+        fields = fetch_create_metadata(session, base_url, project_key, issue_type, verify)
+        cache.set(cache_key, fields, settings.JIRA_CREATE_METADATA_CACHE_TIMEOUT)
+    return IssueSchema(fields)
+
+def _is_empty(value):
+    return value is None or value == '' or value == [] or value == {}
+
+class IssueSchema:
+    """
+    The create metadata of a Jira issue type, used to validate the fields of
+    issues locally before they are sent.
+    
+    Checks cover required fields, allowed values, lengths and value types.
+    With auto_fix, values that can be converted without guessing are fixed
+    instead of rejected: numbers and dates given as text, allowed values
+    given by name in any case, scalars for array fields, over-long text and
+    labels containing spaces.
+    """
+    
+    def __init__(self, fields):
+        """
+        Args:
+            fields (dict): Field metadata keyed by field ID
+        """
+        self.fields = fields
+        self.allowed = {
+            field_id: self._index_allowed_values(field.get('allowedValues'))
+            for field_id, field in fields.items()
+            if field.get('allowedValues')
+        }
+        self.required = [
+            field_id for field_id, field in fields.items()
+            if field.get('required') and not field.get('hasDefaultValue') and field_id not in AUTOMATIC_FIELDS
+        ]
+    
+    def _index_allowed_values(self, allowed_values):
+        index = {}
+        for allowed in allowed_values:
+            for key in ['name', 'value', 'id', 'key']:
+                if allowed.get(key) is not None:
+                    index.setdefault(str(allowed[key]).lower(), allowed)
+        return index
+    
+    def check_mapping(self, field_ids):
+        """
+        Check that a set of mapped fields can create issues at all.
+        
+        Args:
+            field_ids (iterable): IDs of the Jira fields set by the mapping
+        
+        Raises:
+            MappingError: If a mapped field is not on the create screen, or a
+                          required field is not mapped
+        """
+        field_ids = set(field_ids)
+        unknown = sorted(field_ids - set(self.fields) - AUTOMATIC_FIELDS)
+        if unknown:
+            raise MappingError(f"Fields not on the Jira create screen: {', '.join(unknown)}")
+        
+        unmapped = [field_id for field_id in self.required if field_id not in field_ids]
+        if unmapped:
+            names = ', '.join(f"{self.fields[field_id].get('name', field_id)} ({field_id})" for field_id in unmapped)
+            raise MappingError(f"Required Jira fields are not mapped: {names}")
+    
+    def validate_batch(self, issues, auto_fix=True):
+        """
+        Validate the fields of a batch of issues.
+        
+        Args:
+            issues (list): Fields of each issue, as sent in create requests
+            auto_fix (bool): Fix values that can be converted
+        
+        Returns:
+            tuple: (fields of each valid issue or None for rejected ones,
+                   list of problems of each issue, number of fixed values)
+        
+        Raises:
+            MappingError: If a required field is empty in every issue of a
+                          batch of at least EMPTY_REQUIRED_MIN_BATCH issues,
+                          which means its source field is not mapped
+                          correctly; in smaller batches, such as the last
+                          one of a job, the issues are rejected individually
+        """
+        valid = []
+        problems = []
+        fixed_count = 0
+        empty_required = {field_id: 0 for field_id in self.required}
+        
+        for fields in issues:
+            fields = dict(fields)
+            issue_problems = []
+            for field_id in self.required:
+                if _is_empty(fields.get(field_id)):
+                    empty_required[field_id] += 1
+                    issue_problems.append(f"{field_id}: required field is empty")
+            
+            for field_id, value in list(fields.items()):
+                if field_id in AUTOMATIC_FIELDS or field_id not in self.fields or _is_empty(value):
+                    continue
+                try:
+                    converted = self.convert(field_id, value, auto_fix)
+                except ValueError as e:
+                    issue_problems.append(f"{field_id}: {e}")
+                    continue
+                if converted != value:
+                    fields[field_id] = converted
+                    fixed_count += 1
+            
+            valid.append(None if issue_problems else fields)
+            problems.append(issue_problems)
+        
+        broken = [field_id for field_id, count in empty_required.items() if issues and count == len(issues)]
+        if broken and len(issues) >= EMPTY_REQUIRED_MIN_BATCH:
+            raise MappingError(
+                f"Required Jira fields are empty in all {len(issues)} records of the batch: {', '.join(broken)}"
+            )
+        
+        return valid, problems, fixed_count
+    
+    def convert(self, field_id, value, auto_fix=True):
+        """
+        Check a field value and return it in the form Jira expects.
+        
+        Raises:
+            ValueError: If the value is invalid and cannot be fixed
+        """
+        schema = self.fields[field_id].get('schema', {})
+        field_type = schema.get('type')
+        
+        if field_type == 'array':
+            if not isinstance(value, (list, tuple)):
+                if not auto_fix:
+                    raise ValueError("expected a list")
+                value = [value]
+            return [self._convert_item(field_id, schema.get('items'), item, auto_fix) for item in value]
+        return self._convert_item(field_id, field_type, value, auto_fix)
+    
+    def _convert_item(self, field_id, item_type, value, auto_fix):
+        schema = self.fields[field_id].get('schema', {})
+        
+        if field_id in self.allowed:
+            return self._convert_allowed(field_id, item_type, value, auto_fix)
+        
+        if item_type == 'string':
+            if not isinstance(value, str):
+                if not auto_fix or isinstance(value, (Mapping, list)):
+                    raise ValueError(f"expected text, got {type(value).__name__}")
+                value = str(value)
+            if schema.get('system') == 'labels' and ' ' in value:
+                if not auto_fix:
+                    raise ValueError("labels cannot contain spaces")
+                value = value.replace(' ', '_')
+            max_length = self._max_length(field_id, schema)
+            if max_length and len(value) > max_length:
+                if not auto_fix:
+                    raise ValueError(f"longer than {max_length} characters")
+                value = value[:max_length]
+            return value
+        
+        if item_type == 'number':
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                if not auto_fix:
+                    raise ValueError(f"expected a number, got {type(value).__name__}")
+                try:
+                    number = float(str(value).strip())
+                except ValueError:
+                    raise ValueError(f"{value!r} is not a number")
+                value = int(number) if number.is_integer() else number
+            return value
+        
+        if item_type in ('date', 'datetime'):
+            text = str(value).strip()
+            try:
+                parsed = datetime.datetime.fromisoformat(text)
+            except ValueError:
+                raise ValueError(f"{value!r} is not an ISO 8601 {item_type}")
+            if item_type == 'date':
+                fixed = parsed.date().isoformat()
+            else:
+                fixed = parsed.strftime('%Y-%m-%dT%H:%M:%S.000%z') if parsed.tzinfo else text
+            if fixed != value and not auto_fix:
+                raise ValueError(f"{value!r} is not in Jira {item_type} format")
+            return fixed
+        
+        return value
+    
+    def _convert_allowed(self, field_id, item_type, value, auto_fix):
+        reference_key = REFERENCE_KEYS.get(item_type, 'name')
+        if isinstance(value, Mapping):
+            if len(value) != 1:
+                return value
+            reference_key, name = next(iter(value.items()))
+        else:
+            name = value
+        
+        allowed = self.allowed[field_id].get(str(name).lower())
+        if allowed is None:
+            raise ValueError(f"{name!r} is not an allowed value")
+        if not auto_fix and str(name) not in {str(allowed.get(key)) for key in ['name', 'value', 'id', 'key']}:
+            raise ValueError(f"{name!r} only matches an allowed value when ignoring case")
+        
+        if allowed.get(reference_key) is None:
+            reference_key = 'id'
+        return {reference_key: allowed[reference_key]}
+    
+    def _max_length(self, field_id, schema):
+        if schema.get('system') == 'summary':
+            return SUMMARY_MAX_LENGTH
+        custom = schema.get('custom', '')
+        if custom.endswith(':textfield'):
+            return TEXT_FIELD_MAX_LENGTH
+        if custom.endswith(':textarea') or schema.get('system') in ('description', 'environment'):
+            return TEXT_AREA_MAX_LENGTH
+        return None
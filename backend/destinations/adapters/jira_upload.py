@@ -1,13 +1,25 @@
 # destinations/adapters/jira_upload.py
-import requests
 import base64
+from collections.abc import Mapping
+from celery.exceptions import SoftTimeLimitExceeded
+from common.sessions import AuthenticatedSession, AuthenticationError, session_pool
 from .base import DestinationAdapterBase
+from .jira_schema import get_issue_schema
 
 class JiraDestinationAdapter(DestinationAdapterBase):
     """
     Adapter for uploading data to Jira.
+    
+    Unless validate_fields is disabled in the configuration, each batch is
+    validated against the create metadata of the issue type before any issue
+    is created: invalid values are fixed when possible (auto_fix, enabled by
+    default) and the remaining invalid records are rejected together, while a
+    mapping that cannot produce valid issues fails the upload outright.
     """
     
+    display_name = 'Jira'
+    description = 'Atlassian Jira Issue Tracking'
+    
     def validate_config(self):
         """
         Validate Jira adapter configuration.
@@ -45,46 +57,67 @@ class JiraDestinationAdapter(DestinationAdapterBase):
         """
         self.log("Setting up Jira authentication...")
         
-        auth_method = self.config['auth_method']
-        self.session = requests.Session()
-        
+        connection = {
+            name: self.config.get(name)
+            for name in ['base_url', 'auth_method', 'username', 'password', 'api_token', 'oauth_token', 'verify_ssl']
+        }
         try:
+            self.session = session_pool.get('jira', connection, self.open_session)
+        except AuthenticationError as e:
+            self.report_error("Jira authentication failed", e.details)
+            return False
+        except SoftTimeLimitExceeded:
+            raise
+        except Exception as e:
+            self.report_error("Jira authentication error", {"exception": str(e)})
+            return False
+        
+        self.log("Jira authentication successful")
+        return True
+    
+    def open_session(self):
+        """
+        Open a session authenticated with the configured credentials.
+        
+        The session only depends on the configuration, so it can be pooled
+        and reused by later jobs.
+        
+        Raises:
+            AuthenticationError: If Jira rejects the credentials
+        """
+        config = dict(self.config)
+        
+        def login(session):
+            auth_method = config['auth_method']
             if auth_method == 'basic':
                 # For basic auth, we'll use the auth parameter in requests
-                self.auth = (self.config['username'], self.config['password'])
-                self.session.auth = self.auth
+                session.auth = (config['username'], config['password'])
             elif auth_method == 'token':
                 # For API token auth, we'll use the Authorization header
-                token = self.config['api_token']
-                self.session.headers.update({
-                    'Authorization': f'Bearer {token}'
+                session.headers.update({
+                    'Authorization': f"Bearer {config['api_token']}"
                 })
             elif auth_method == 'oauth':
                 # For OAuth, we'll use the Authorization header
-                oauth_token = self.config['oauth_token']
-                self.session.headers.update({
-                    'Authorization': f'Bearer {oauth_token}'
+                session.headers.update({
+                    'Authorization': f"Bearer {config['oauth_token']}"
                 })
-                
+            
             # Test authentication with a simple request
-            response = self.session.get(
-                f"{self.config['base_url']}/rest/api/2/myself",
-                verify=self.config.get('verify_ssl', True)
+            response = session.get(
+                f"{config['base_url']}/rest/api/2/myself",
+                verify=config.get('verify_ssl', True),
+                reauthenticate=False
             )
-            
-            if response.status_code == 200:
-                self.log("Jira authentication successful")
-                return True
-            else:
-                self.report_error(
-                    "Jira authentication failed", 
+            if response.status_code != 200:
+                raise AuthenticationError(
+                    "Jira authentication failed",
                     {"status_code": response.status_code, "response": response.text}
                 )
-                return False
-                
-        except Exception as e:
-            self.report_error("Jira authentication error", {"exception": str(e)})
-            return False
+        
+        session = AuthenticatedSession(login)
+        session.authenticate()
+        return session
     
     def upload_data(self, data):
         """
@@ -114,23 +147,19 @@ class JiraDestinationAdapter(DestinationAdapterBase):
             'errors': []
         }
         
-        for index, item in enumerate(data):
+        issues = [self._map_fields(item, project_key, issue_type, field_mapping) for item in data]
+        
+        if self.config.get('validate_fields', True):
+            issues = self._validate_issues(data, issues, results)
+        
+        for index, (item, fields) in enumerate(zip(data, issues)):
+            if self.should_stop():
+                self.log(f"Cancellation requested, stopping upload after {index} of {len(data)} items", level='warning')
+                break
+            if fields is None:
+                continue
+            
             try:
-                # Map fields according to mapping configuration
-                fields = {
-                    'project': {'key': project_key},
-                    'issuetype': {'name': issue_type},
-                    'summary': self._get_mapped_value(item, field_mapping.get('summary', 'name')),
-                    'description': self._get_mapped_value(item, field_mapping.get('description', 'description')),
-                }
-                
-                # Add any additional configured field mappings
-                for jira_field, source_field in field_mapping.items():
-                    if jira_field not in ['summary', 'description']:
-                        value = self._get_mapped_value(item, source_field)
-                        if value is not None:
-                            fields[jira_field] = value
-                
                 # Create the issue in Jira
                 payload = {'fields': fields}
                 
@@ -164,6 +193,8 @@ class JiraDestinationAdapter(DestinationAdapterBase):
                     results['errors'].append(error_details)
                     results['error_count'] += 1
                     
+            except SoftTimeLimitExceeded:
+                raise
             except Exception as e:
                 error_details = {
                     'exception': str(e),
@@ -177,6 +208,67 @@ class JiraDestinationAdapter(DestinationAdapterBase):
         self.log(f"Upload complete. Created {results['success_count']} issues with {results['error_count']} errors.")
         return results
     
+    def _map_fields(self, item, project_key, issue_type, field_mapping):
+        """
+        Build the fields of the issue created for an item.
+        """
+        fields = {
+            'project': {'key': project_key},
+            'issuetype': {'name': issue_type},
+            'summary': self._get_mapped_value(item, field_mapping.get('summary', 'name')),
+            'description': self._get_mapped_value(item, field_mapping.get('description', 'description')),
+        }
+        
+        # Add any additional configured field mappings
+        for jira_field, source_field in field_mapping.items():
+            if jira_field not in ['summary', 'description']:
+                value = self._get_mapped_value(item, source_field)
+                if value is not None:
+                    fields[jira_field] = value
+        
+        return fields
+    
+    def _validate_issues(self, data, issues, results):
+        """
+        Validate the issues of a batch against the Jira create metadata.
+        
+        Rejected items are added to the results and reported as errors.
+        
+        Returns:
+            list: Fields of each issue to create, None for rejected items
+            
+        Raises:
+            MappingError: If the field mapping cannot produce valid issues
+        """
+        schema = get_issue_schema(
+            self.session,
+            self.config['base_url'],
+            self.config['project_key'],
+            self.config.get('issue_type', 'Bug'),
+            verify=self.config.get('verify_ssl', True)
+        )
+        if not getattr(self, '_mapping_checked', False):
+            mapped_fields = {'summary', 'description', *self.config.get('field_mapping', {})}
+            schema.check_mapping(mapped_fields)
+            self._mapping_checked = True
+        
+        valid, problems, fixed_count = schema.validate_batch(issues, auto_fix=self.config.get('auto_fix', True))
+        if fixed_count:
+            self.log(f"Fixed {fixed_count} field values to match the Jira create metadata")
+        
+        for index, (item, issue_problems) in enumerate(zip(data, problems)):
+            if issue_problems:
+                error_details = {
+                    'validation_errors': issue_problems,
+                    'item_index': index,
+                    'item_id': item.get('id')
+                }
+                self.report_error(f"Item {index} does not match the Jira create metadata", error_details)
+                results['errors'].append(error_details)
+                results['error_count'] += 1
+        
+        return valid
+    
     def _get_mapped_value(self, item, field_path):
         """
         Extract a value from an item based on a field path.
@@ -195,7 +287,7 @@ class JiraDestinationAdapter(DestinationAdapterBase):
         value = item
         
         for part in parts:
-            if isinstance(value, dict) and part in value:
+            if isinstance(value, Mapping) and part in value:
                 value = value[part]
             else:
                 return None
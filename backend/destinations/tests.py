@@ -0,0 +1,216 @@
+import json
+
+import pytest
+from celery.exceptions import SoftTimeLimitExceeded
+
+from destinations.adapters.file_upload import FileDestinationAdapter
+from destinations.adapters.jira_schema import EMPTY_REQUIRED_MIN_BATCH, IssueSchema, MappingError, fetch_create_metadata
+from destinations.adapters.jira_upload import JiraDestinationAdapter
+from jobs.models import Job
+
+pyarrow = pytest.importorskip('pyarrow')
+import pyarrow.parquet  # noqa: E402
+
+RECORDS = [
+    {'id': str(number), 'name': f"Test {number}", 'status': 'Ready' if number % 2 else None, 'steps': [number]}
+    for number in range(1, 8)
+]
+
+@pytest.fixture
+def output_directory(settings, tmp_path):
+    settings.FILE_DESTINATION_ROOT = str(tmp_path)
+    return tmp_path / 'out'
+
+def read_output(output_directory, file_format):
+    """
+    Read back the records of the published files, as written.
+    """
+    paths = sorted(output_directory.iterdir())
+    assert paths and not any(path.name.startswith('.') for path in paths)
+    if file_format == 'parquet':
+        return [row for path in paths for row in pyarrow.parquet.read_table(path).to_pylist()]
+    return [json.loads(line) for path in paths for line in path.read_text().splitlines()]
+
+def test_parquet_round_trip(output_directory):
+    adapter = FileDestinationAdapter({'directory': 'out', 'format': 'parquet', 'row_group_size': 3})
+    assert adapter.authenticate()
+    adapter.upload_data(RECORDS[:4])
+    adapter.upload_data(RECORDS[4:])
+    adapter.close()
+    
+    (path,) = output_directory.iterdir()
+    assert pyarrow.parquet.ParquetFile(path).metadata.num_row_groups == 3
+    assert read_output(output_directory, 'parquet') == [
+        {
+            'id': record['id'],
+            'name': record['name'],
+            'status': record['status'],
+            'steps': json.dumps(record['steps'])
+        }
+        for record in RECORDS
+    ]
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('file_format', ['jsonl', 'parquet'])
+def test_resume_publishes_abandoned_files(output_directory, pipelines, file_format):
+    job = Job.objects.filter(pipeline=pipelines[0]).first()
+    config = {'directory': 'out', 'format': file_format}
+    adapter = FileDestinationAdapter(config, job=job)
+    assert adapter.authenticate()
+    results = adapter.upload_data(RECORDS)
+    
+    # The worker dies: the lock on its file is released, the file stays in progress
+    for writer in adapter.writers.values():
+        writer._handle.close()
+    assert all(path.name.endswith('.inprogress') for path in output_directory.iterdir())
+    
+    job.checkpoint = {'completed_batches': 1, 'uploaded_ids': results['uploaded_ids']}
+    assert FileDestinationAdapter(config, job=job).authenticate()
+    
+    records = read_output(output_directory, file_format)
+    assert [record['id'] for record in records] == [record['id'] for record in RECORDS]
+
+@pytest.mark.django_db
+def test_resume_leaves_live_files_alone(output_directory, pipelines):
+    job = Job.objects.filter(pipeline=pipelines[0]).first()
+    job.checkpoint = {'completed_batches': 1}
+    config = {'directory': 'out', 'format': 'jsonl'}
+    partition = FileDestinationAdapter(config, job=job)
+    assert partition.authenticate()
+    partition.upload_data(RECORDS)
+    
+    # Another partition of the same job starts while the first one is writing
+    assert FileDestinationAdapter(config, job=job).recover_abandoned_files() == 0
+    partition.close()
+    assert len(read_output(output_directory, 'jsonl')) == len(RECORDS)
+
+class TimedOutSession:
+    """
+    Stands in for the Jira session of a task that reaches its soft time limit.
+    """
+    
+    def post(self, url, **kwargs):
+        raise SoftTimeLimitExceeded()
+
+def test_jira_upload_does_not_swallow_the_soft_time_limit():
+    adapter = JiraDestinationAdapter({
+        'base_url': 'https://jira.example.com',
+        'auth_method': 'token',
+        'api_token': 'token',
+        'project_key': 'QA',
+        'validate_fields': False,
+    })
+    adapter.session = TimedOutSession()
+    
+    with pytest.raises(SoftTimeLimitExceeded):
+        adapter.upload_data(RECORDS)
+
+CREATE_FIELDS = {
+    'summary': {'fieldId': 'summary', 'name': 'Summary', 'required': True, 'schema': {'type': 'string', 'system': 'summary'}},
+    'priority': {
+        'fieldId': 'priority',
+        'name': 'Priority',
+        'required': False,
+        'schema': {'type': 'priority', 'system': 'priority'},
+        'allowedValues': [{'id': '1', 'name': 'High'}, {'id': '2', 'name': 'Low'}],
+    },
+    'labels': {'fieldId': 'labels', 'name': 'Labels', 'required': False, 'schema': {'type': 'array', 'items': 'string', 'system': 'labels'}},
+    'customfield_10001': {'fieldId': 'customfield_10001', 'name': 'Estimate', 'required': False, 'schema': {'type': 'number'}},
+    'duedate': {'fieldId': 'duedate', 'name': 'Due date', 'required': False, 'schema': {'type': 'date', 'system': 'duedate'}},
+    'customfield_10002': {'fieldId': 'customfield_10002', 'name': 'Team', 'required': True, 'schema': {'type': 'string'}},
+}
+
+class CreateMetadataResponse:
+    
+    def __init__(self, payload, status_code=200):
+        self.payload = payload
+        self.status_code = status_code
+    
+    def json(self):
+        return self.payload
+    
+    def raise_for_status(self):
+        pass
+
+class CreateMetadataSession:
+    """
+    Serves the paged createmeta endpoints of Jira 8.4+, two fields per page.
+    """
+    
+    def get(self, url, params=None, verify=True):
+        if url.endswith('/issuetypes'):
+            return CreateMetadataResponse({'values': [{'id': '10', 'name': 'Task'}, {'id': '11', 'name': 'Bug'}]})
+        assert url.endswith('/issuetypes/11')
+        fields = list(CREATE_FIELDS.values())
+        start_at = params['startAt']
+        page = fields[start_at:start_at + 2]
+        return CreateMetadataResponse({'values': page, 'isLast': start_at + 2 >= len(fields)})
+
+def test_create_metadata_is_read_from_every_page():
+    fields = fetch_create_metadata(CreateMetadataSession(), 'https://jira.example.com', 'QA', 'Bug')
+    
+    assert fields == CREATE_FIELDS
+    with pytest.raises(MappingError):
+        fetch_create_metadata(CreateMetadataSession(), 'https://jira.example.com', 'QA', 'Story')
+
+def test_mapping_must_set_required_fields_on_the_create_screen():
+    schema = IssueSchema(CREATE_FIELDS)
+    schema.check_mapping(['summary', 'customfield_10002', 'project', 'issuetype'])
+    
+    with pytest.raises(MappingError, match='Team'):
+        schema.check_mapping(['summary'])
+    with pytest.raises(MappingError, match='environment'):
+        schema.check_mapping(['summary', 'customfield_10002', 'environment'])
+
+def test_validation_fixes_convertible_values():
+    schema = IssueSchema(CREATE_FIELDS)
+    issue = {
+        'summary': 'x' * 300,
+        'customfield_10002': 'QA',
+        'priority': 'high',
+        'labels': 'smoke test',
+        'customfield_10001': ' 3.0 ',
+        'duedate': '2024-05-01T10:00:00',
+    }
+    
+    (fields,), (problems,), fixed_count = schema.validate_batch([issue])
+    
+    assert problems == []
+    assert fields == {
+        'summary': 'x' * 255,
+        'customfield_10002': 'QA',
+        'priority': {'name': 'High'},
+        'labels': ['smoke_test'],
+        'customfield_10001': 3,
+        'duedate': '2024-05-01',
+    }
+    assert fixed_count == 5
+
+def test_validation_without_auto_fix_rejects_the_same_values():
+    schema = IssueSchema(CREATE_FIELDS)
+    issues = [
+        {'summary': 'Login', 'customfield_10002': 'QA', 'priority': 'high'},
+        {'summary': 'Logout', 'customfield_10002': 'QA', 'customfield_10001': 'three'},
+        {'summary': 'Search', 'customfield_10002': 'QA', 'priority': 'High'},
+    ]
+    
+    valid, problems, fixed_count = schema.validate_batch(issues, auto_fix=False)
+    
+    assert valid == [None, None, {'summary': 'Search', 'customfield_10002': 'QA', 'priority': {'name': 'High'}}]
+    assert [len(issue_problems) for issue_problems in problems] == [1, 1, 0]
+
+def test_empty_required_field_rejects_the_records_of_a_small_batch():
+    schema = IssueSchema(CREATE_FIELDS)
+    issues = [{'summary': f"Test {number}", 'customfield_10002': ''} for number in range(EMPTY_REQUIRED_MIN_BATCH - 1)]
+    
+    valid, problems, _ = schema.validate_batch(issues)
+    
+    assert valid == [None] * len(issues)
+    assert all(problems)
+
+def test_empty_required_field_fails_a_large_batch():
+    schema = IssueSchema(CREATE_FIELDS)
+    issues = [{'summary': f"Test {number}", 'customfield_10002': None} for number in range(EMPTY_REQUIRED_MIN_BATCH)]
+    
+    with pytest.raises(MappingError, match='customfield_10002'):
+        schema.validate_batch(issues)
@@ -1,4 +1,6 @@
 from django.contrib import admin
-from .models import Job
+from .models import Job, JobDailyStat, RecordFingerprint
 
-admin.site.register(Job)
\ No newline at end of file
+admin.site.register(Job)
+admin.site.register(JobDailyStat)
+admin.site.register(RecordFingerprint)
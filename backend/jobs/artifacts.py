@@ -0,0 +1,19 @@
+import os
+
+from django.conf import settings
+
+def get_job_artifact_dir(job, create=True):
+    """
+    Return the directory holding the on-disk artifacts of a job.
+
+    Args:
+        job (Job): The job owning the artifacts
+        create (bool): Create the directory if it does not exist yet
+
+    Returns:
+        str: Absolute path of the job's artifact directory
+    """
+    path = os.path.join(settings.JOB_ARTIFACTS_DIR, str(job.id))
+    if create:
+        os.makedirs(path, exist_ok=True)
+    return path
@@ -0,0 +1,80 @@
+from celery import current_app, group
+from django.conf import settings
+
+def get_dispatch_options(pipeline):
+    """
+    Build the Celery routing options for the tasks of a pipeline.
+    
+    The pipeline's execution_config may set a "priority" (0 is the highest),
+    a "queue" overriding the default route, and "soft_time_limit" /
+    "time_limit" in seconds.
+    
+    Args:
+        pipeline (Pipeline): The pipeline being executed
+        
+    Returns:
+        dict: Keyword arguments for apply_async() or Signature.set()
+    """
+    execution_config = pipeline.execution_config
+    options = {
+        'priority': execution_config.get('priority', settings.PIPELINE_DEFAULT_PRIORITY)
+    }
+    
+    for option in ['queue', 'soft_time_limit', 'time_limit']:
+        if execution_config.get(option):
+            options[option] = execution_config[option]
+    
+    return options
+
+def get_job_signature(job):
+    """
+    Build the task signature executing a job.
+    
+    A task ID already set on the job is reused, so callers can store it
+    together with the job before dispatching.
+    """
+    from .tasks import execute_pipeline
+    
+    return execute_pipeline.signature(
+        (str(job.pipeline_id), str(job.id)),
+        task_id=job.task_id,
+        **get_dispatch_options(job.pipeline)
+    )
+
+def dispatch_job(job):
+    """
+    Queue the execution of a job with its pipeline's routing options.
+    
+    Args:
+        job (Job): The pending job to execute
+        
+    Returns:
+        AsyncResult: The dispatched Celery task
+    """
+    return get_job_signature(job).apply_async()
+
+def dispatch_jobs(jobs):
+    """
+    Queue the execution of several jobs in a single group.
+    
+    Args:
+        jobs (list): The pending jobs to execute
+        
+    Returns:
+        GroupResult: The dispatched Celery tasks
+    """
+    return group(get_job_signature(job) for job in jobs).apply_async()
+
+def revoke_job_tasks(job, terminate=False):
+    """
+    Revoke the tasks of a job: its main task, and the partition and upload
+    tasks it dispatched.
+    
+    Args:
+        job (Job): The job being cancelled
+        terminate (bool): Also kill the worker processes running the tasks,
+                          rather than only dropping those not started yet
+    """
+    task_ids = [task_id for task_id in [job.task_id, *job.subtask_ids] if task_id]
+    if task_ids:
+        current_app.control.revoke(task_ids, terminate=terminate)
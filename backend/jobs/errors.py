@@ -0,0 +1,114 @@
+import datetime
+import hashlib
+import re
+import threading
+import time
+
+from django.conf import settings
+
+# Variable parts of error messages: quoted values, hex IDs (UUIDs, hashes) and numbers
+VARIABLE_PARTS = [
+    (re.compile(r"'[^']*'|\"[^\"]*\""), '?'),
+    (re.compile(r'\b[0-9a-f]{8,}(?:-[0-9a-f]{4,})*\b', re.IGNORECASE), '<id>'),
+    (re.compile(r'\d+'), '#'),
+    (re.compile(r'\s+'), ' '),
+]
+
+# Details that vary per item and are kept as samples instead
+ITEM_DETAILS = ['item_id', 'item_index']
+
+def normalize_message(message):
+    """
+    Strip the variable parts of an error message, so that errors that only
+    differ by item ID, value or count look the same.
+    """
+    message = str(message)
+    for pattern, replacement in VARIABLE_PARTS:
+        message = pattern.sub(replacement, message)
+    return message.strip()[:500]
+
+def error_signature(message, details):
+    """
+    Return the signature errors are grouped by: the status code and the
+    normalized message, including the reason given in the details.
+    """
+    reason = details.get('response') or details.get('exception') or details.get('validation_errors') or ''
+    key = f"{details.get('status_code', '')}|{normalize_message(message)}|{normalize_message(reason)}"
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+def truncate_details(details):
+    """
+    Drop the per-item details and truncate long texts such as response bodies.
+    """
+    max_length = settings.JOB_ERROR_DETAIL_MAX_LENGTH
+    truncated = {}
+    for name, value in details.items():
+        if name in ITEM_DETAILS:
+            continue
+        if isinstance(value, str) and len(value) > max_length:
+            value = value[:max_length] + '...'
+        truncated[name] = value
+    return truncated
+
+class ErrorAggregator:
+    """
+    Groups the errors reported during a job run before they are written.
+
+    Errors with the same signature are merged into one entry that counts
+    their occurrences and keeps a bounded sample of the affected item IDs,
+    so a failure repeated for every item costs one entry and one write per
+    flush instead of one of each per item. Pending groups are flushed every
+    JOB_ERROR_FLUSH_INTERVAL seconds, and whenever the job commits progress.
+    """
+
+    def __init__(self, job):
+        self.job = job
+        self.groups = {}
+        self._flushed_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def add(self, message, details=None):
+        """
+        Record an error.
+
+        Args:
+            message (str): Description of the error
+            details (dict, optional): Status code, response, item ID, ...
+        """
+        details = details or {}
+        signature = error_signature(message, details)
+        now = datetime.datetime.now().isoformat()
+
+        with self._lock:
+            group = self.groups.get(signature)
+            if group is None:
+                group = self.groups[signature] = {
+                    'timestamp': now,
+                    'message': message,
+                    'details': truncate_details(details),
+                    'signature': signature,
+                    'count': 0,
+                    'item_ids': [],
+                    'last_seen': now
+                }
+            group['count'] += 1
+            group['last_seen'] = now
+            if details.get('item_id') is not None and len(group['item_ids']) < settings.JOB_ERROR_SAMPLE_SIZE:
+                group['item_ids'].append(details['item_id'])
+
+            due = time.monotonic() - self._flushed_at >= settings.JOB_ERROR_FLUSH_INTERVAL
+
+        if due:
+            self.flush()
+
+    def flush(self):
+        """
+        Merge the pending groups into the job's errors.
+        """
+        with self._lock:
+            groups = list(self.groups.values())
+            self.groups = {}
+            self._flushed_at = time.monotonic()
+
+        if groups:
+            self.job.merge_errors(groups)
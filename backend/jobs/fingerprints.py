@@ -0,0 +1,144 @@
+import hashlib
+import json
+import unicodedata
+from collections.abc import Mapping
+
+from django.db.models import F
+
+from .models import RecordFingerprint
+
+# Destination settings that do not affect where or how records are uploaded
+CREDENTIAL_FIELDS = {'auth_method', 'username', 'password', 'api_token', 'oauth_token', 'client_id', 'client_secret'}
+
+def normalize_value(value):
+    """
+    Normalize a field value so that formatting-only differences between
+    extractions do not change the fingerprint of a record.
+    """
+    if isinstance(value, str):
+        return unicodedata.normalize('NFC', value).strip()
+    if isinstance(value, Mapping):
+        return {str(name): normalize_value(item) for name, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [normalize_value(item) for item in value]
+    return value
+
+def fingerprint_record(record, salt=''):
+    """
+    Compute a stable hash of a record.
+    
+    Every field takes part in the hash, which covers the design steps and the
+    attachment checksums of sources that include them in their records. Empty
+    fields are left out, so a field going from missing to empty is no change.
+    
+    Args:
+        record (Mapping): The record, as it would be uploaded
+        salt (str): Mixed into the hash, e.g. to tell destinations apart
+    
+    Returns:
+        str: Hex SHA-256 digest
+    """
+    fields = {
+        str(name): normalize_value(value)
+        for name, value in record.items()
+        if value is not None and value != ''
+    }
+    payload = json.dumps(fields, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(f"{salt}\n{payload}".encode('utf-8')).hexdigest()
+
+class ChangeDetector:
+    """
+    Skips the records of a pipeline that did not change since its last
+    successful run.
+    
+    Fingerprints of uploaded records are staged as pending on the job and
+    only become the reference for later runs through commit_fingerprints(),
+    once the job completes.
+    """
+    
+    def __init__(self, pipeline, job):
+        self.pipeline = pipeline
+        self.job = job
+        # Uploading to another destination makes every record new again,
+        # while rotating credentials does not
+        destination = {
+            name: value for name, value in pipeline.destination_config.items()
+            if name not in CREDENTIAL_FIELDS
+        }
+        self.salt = hashlib.sha256(json.dumps(
+            [pipeline.destination_type, destination],
+            sort_keys=True,
+            default=str
+        ).encode('utf-8')).hexdigest()
+    
+    def filter(self, batch):
+        """
+        Keep the records of a batch that are new or changed.
+        
+        The stored fingerprints of the whole batch are read in one query.
+        
+        Args:
+            batch (RecordBatch): Records to upload, with their "id" field
+        
+        Returns:
+            tuple: (RecordBatch of the changed records, dict of their
+                   fingerprints by source ID)
+        """
+        hashes = {}
+        for record in batch:
+            hashes[str(record.get('id'))] = fingerprint_record(record, self.salt)
+        
+        stored = dict(RecordFingerprint.objects.filter(
+            pipeline=self.pipeline,
+            source_id__in=list(hashes)
+        ).values_list('source_id', 'hash'))
+        
+        rows = [
+            row for row, source_id in enumerate(batch.column('id'))
+            if stored.get(str(source_id)) != hashes[str(source_id)]
+        ]
+        changed = batch.take(rows)
+        return changed, {
+            str(source_id): hashes[str(source_id)] for source_id in changed.column('id')
+        }
+    
+    def record(self, source_ids, hashes):
+        """
+        Stage the fingerprints of uploaded records as pending on the job.
+        
+        Args:
+            source_ids (iterable): IDs of the records uploaded
+            hashes (dict): Fingerprints by source ID, as returned by filter()
+        """
+        fingerprints = [
+            RecordFingerprint(
+                pipeline=self.pipeline,
+                source_id=source_id,
+                pending_hash=hashes[source_id],
+                pending_job=self.job
+            )
+            for source_id in set(map(str, source_ids))
+            if source_id in hashes
+        ]
+        RecordFingerprint.objects.bulk_create(
+            fingerprints,
+            update_conflicts=True,
+            unique_fields=['pipeline', 'source_id'],
+            update_fields=['pending_hash', 'pending_job', 'updated_at']
+        )
+
+def commit_fingerprints(job):
+    """
+    Make the fingerprints uploaded by a completed job the reference for the
+    next runs of its pipeline.
+    
+    Args:
+        job (Job): A job that just completed
+    
+    Returns:
+        int: Number of fingerprints committed
+    """
+    return RecordFingerprint.objects.filter(pending_job=job).update(
+        hash=F('pending_hash'),
+        pending_job=None
+    )
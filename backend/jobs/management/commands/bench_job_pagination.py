@@ -0,0 +1,117 @@
+import random
+import time
+from urllib.parse import parse_qs, urlparse
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from rest_framework.pagination import Cursor
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from jobs.models import Job
+from jobs.pagination import JobCursorPagination
+from jobs.views import JobViewSet
+from pipelines.models import Pipeline
+
+BENCHMARK_PIPELINE_NAME = '__bench_job_pagination__'
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the job list endpoint with page-number (OFFSET) and cursor "
+        "(keyset) pagination over a large job history."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--jobs', type=int, default=1_000_000, help='Number of jobs to seed')
+        parser.add_argument('--pipelines', type=int, default=100, help='Number of pipelines to spread the jobs over')
+        parser.add_argument('--page-size', type=int, default=10)
+        parser.add_argument('--depths', type=int, nargs='+', default=[1, 100, 10_000, 50_000],
+                            help='Page numbers to measure')
+        parser.add_argument('--repeat', type=int, default=5, help='Requests per measurement')
+        parser.add_argument('--keep', action='store_true', help='Keep the seeded data afterwards')
+
+    def handle(self, *args, **options):
+        pipelines = self.seed(options['jobs'], options['pipelines'])
+        user, _ = User.objects.get_or_create(username='__bench__')
+
+        try:
+            self.stdout.write(f"{'endpoint':<28}{'page':>8}{'page-number ms':>18}{'cursor ms':>12}")
+            for filters in [{}, {'pipeline': str(pipelines[0].id)}, {'status': 'completed'}]:
+                label = '/api/jobs/' + (f"?{next(iter(filters))}=" if filters else '')
+                for depth in options['depths']:
+                    offset_ms = self.measure(user, dict(filters, page=depth, page_size=options['page_size']), options['repeat'])
+                    cursor_ms = self.measure_cursor(user, filters, depth, options['page_size'], options['repeat'])
+                    self.stdout.write(f"{label:<28}{depth:>8}{offset_ms:>18.2f}{cursor_ms:>12.2f}")
+        finally:
+            if not options['keep']:
+                Pipeline.objects.filter(name=BENCHMARK_PIPELINE_NAME).delete()
+                user.delete()
+
+    def seed(self, job_count, pipeline_count):
+        """
+        Create the benchmark pipelines and their jobs with bulk inserts.
+        """
+        pipelines = list(Pipeline.objects.filter(name=BENCHMARK_PIPELINE_NAME))
+        existing = Job.objects.filter(pipeline__in=pipelines).count()
+        if pipelines and existing >= job_count:
+            self.stdout.write(f"Reusing {existing} seeded jobs")
+            return pipelines
+
+        Pipeline.objects.filter(name=BENCHMARK_PIPELINE_NAME).delete()
+        pipelines = Pipeline.objects.bulk_create([
+            Pipeline(name=BENCHMARK_PIPELINE_NAME, source_type='alm', destination_type='jira')
+            for _ in range(pipeline_count)
+        ])
+
+        statuses = [choice for choice, _ in Job.STATUS_CHOICES]
+        rng = random.Random(0)
+        started = time.perf_counter()
+        for start in range(0, job_count, 10_000):
+            Job.objects.bulk_create([
+                Job(
+                    pipeline=rng.choice(pipelines),
+                    status=rng.choice(statuses),
+                    source_record_count=rng.randint(0, 50_000),
+                    destination_record_count=rng.randint(0, 50_000),
+                )
+                for _ in range(min(10_000, job_count - start))
+            ])
+        self.stdout.write(f"Seeded {job_count} jobs in {time.perf_counter() - started:.1f}s")
+        return pipelines
+
+    def request(self, user, params):
+        request = APIRequestFactory().get('/api/jobs/', params)
+        force_authenticate(request, user=user)
+        response = JobViewSet.as_view({'get': 'list'})(request)
+        response.render()
+        return response
+
+    def measure(self, user, params, repeat):
+        """
+        Return the average latency in milliseconds of a job list request.
+        """
+        started = time.perf_counter()
+        for _ in range(repeat):
+            self.request(user, params)
+        return (time.perf_counter() - started) * 1000 / repeat
+
+    def measure_cursor(self, user, filters, depth, page_size, repeat):
+        """
+        Return the average latency of fetching the page at the given depth
+        through a cursor, as a client paging from the start would.
+        """
+        params = dict(filters, page_size=page_size)
+        if depth > 1:
+            # The cursor of a page holds the position of the last job before it
+            index = (depth - 1) * page_size - 1
+            position = Job.objects.filter(**filters).order_by('-created_at').values_list(
+                'created_at', flat=True
+            )[index:index + 1].first()
+            if position is None:
+                return float('nan')
+
+            paginator = JobCursorPagination()
+            paginator.base_url = 'http://testserver/api/jobs/'
+            link = paginator.encode_cursor(Cursor(offset=0, reverse=False, position=str(position)))
+            params['cursor'] = parse_qs(urlparse(link).query)['cursor'][0]
+
+        return self.measure(user, params, repeat)
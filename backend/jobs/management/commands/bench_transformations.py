@@ -0,0 +1,137 @@
+import random
+import re
+import time
+
+from django.core.management.base import BaseCommand
+
+from jobs.transformations import CONVERSIONS, NUMERIC_OPERATORS, TransformationPlan
+
+# Representative configuration for ALM tests uploaded as Jira issues
+BENCHMARK_CONFIG = {
+    'field_mapping': {
+        'Test Name': 'summary',
+        'Description': 'description',
+    },
+    'transformations': [
+        {'type': 'map', 'field': 'Status', 'values': {'Ready': 'To Do', 'Design': 'In Progress', 'Imported': 'Done'}},
+        {'type': 'convert', 'field': 'Priority', 'to': 'integer'},
+        {'type': 'filter', 'field': 'Priority', 'op': 'ge', 'value': 2},
+        {'type': 'extract', 'field': 'Path', 'pattern': r'^Subject/([^/]+)', 'target': 'component'},
+        {'type': 'concat', 'fields': ['component', 'summary'], 'target': 'title', 'separator': ' / '},
+        {'type': 'compute', 'target': 'external_id', 'template': 'ALM-{id}'},
+        {'type': 'drop', 'fields': ['Path']},
+    ],
+}
+
+def interpret(config, records):
+    """
+    Reference implementation that interprets the configuration per record.
+    """
+    steps = [
+        {'type': 'rename', 'source': source, 'target': target}
+        for source, target in config.get('field_mapping', {}).items()
+    ] + config.get('transformations', [])
+
+    output = []
+    for record in records:
+        record = dict(record)
+        keep = True
+        for step in steps:
+            kind = step['type']
+            if kind == 'rename':
+                if step['source'] in record:
+                    record[step['target']] = record.pop(step['source'])
+            elif kind == 'map':
+                value = record.get(step['field'])
+                record[step['field']] = step['values'].get(value, value)
+            elif kind == 'convert':
+                if step['field'] in record:
+                    record[step['field']] = CONVERSIONS[step['to']](record[step['field']])
+            elif kind == 'filter':
+                value = record.get(step['field'])
+                try:
+                    keep = value is not None and NUMERIC_OPERATORS[step['op']](float(value), step['value'])
+                except (TypeError, ValueError):
+                    keep = False
+                if not keep:
+                    break
+            elif kind == 'extract':
+                match = re.search(step['pattern'], str(record.get(step['field'])))
+                record[step['target']] = match.group(1) if match else None
+            elif kind == 'concat':
+                record[step['target']] = step['separator'].join(
+                    str(record[field]) for field in step['fields'] if record.get(field) not in (None, '')
+                )
+            elif kind == 'compute':
+                record[step['target']] = re.sub(r'\{([^{}]+)\}', lambda m: str(record.get(m.group(1), '')), step['template'])
+            elif kind == 'drop':
+                for field in step['fields']:
+                    record.pop(field, None)
+        if keep:
+            output.append(record)
+    return output
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the compiled transformation engine against per-record "
+        "interpretation of the same transformation_config."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--records', type=int, default=100_000, help='Number of records to transform')
+        parser.add_argument('--fields', type=int, default=40, help='Extra fields per record, as in wide ALM tests')
+        parser.add_argument('--batch-size', type=int, default=100)
+
+    def handle(self, *args, **options):
+        records = self.generate(options['records'], options['fields'])
+        batches = [
+            records[start:start + options['batch_size']]
+            for start in range(0, len(records), options['batch_size'])
+        ]
+
+        started = time.perf_counter()
+        plan = TransformationPlan(BENCHMARK_CONFIG)
+        compile_ms = (time.perf_counter() - started) * 1000
+
+        compiled_seconds, compiled_output = self.measure(plan.apply, batches)
+        interpreted_seconds, interpreted_output = self.measure(lambda batch: interpret(BENCHMARK_CONFIG, batch), batches)
+        if compiled_output != interpreted_output:
+            self.stderr.write("Compiled and interpreted outputs differ")
+
+        self.stdout.write(f"{len(records)} records with {options['fields'] + 6} fields, plan compiled in {compile_ms:.2f} ms")
+        self.stdout.write(f"{'engine':<14}{'records/s':>14}{'s per 1M records':>20}")
+        for engine, seconds in [('compiled', compiled_seconds), ('interpreted', interpreted_seconds)]:
+            self.stdout.write(
+                f"{engine:<14}{len(records) / seconds:>14,.0f}{seconds * 1_000_000 / len(records):>20.2f}"
+            )
+        self.stdout.write(f"Speedup: {interpreted_seconds / compiled_seconds:.1f}x")
+
+    def generate(self, count, extra_fields):
+        """
+        Generate ALM-like test records.
+        """
+        rng = random.Random(0)
+        statuses = ['Ready', 'Design', 'Imported', 'Repair']
+        folders = ['Demo', 'Regression', 'Smoke', 'Payments']
+        return [
+            {
+                'id': str(index),
+                'Test Name': f"Test {index}",
+                'Description': 'Verify the behaviour of the system under test',
+                'Status': rng.choice(statuses),
+                'Priority': str(rng.randint(1, 5)),
+                'Path': f"Subject/{rng.choice(folders)}/Suite {index % 50}",
+                **{f"Step Description {step}": f"Step {step} of test {index}" for step in range(extra_fields)},
+            }
+            for index in range(count)
+        ]
+
+    def measure(self, transform, batches):
+        """
+        Return the seconds spent transforming every batch, and the output.
+        """
+        output = []
+        started = time.perf_counter()
+        for batch in batches:
+            output.extend(transform(batch))
+        return time.perf_counter() - started, output
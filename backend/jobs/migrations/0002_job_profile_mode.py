@@ -0,0 +1,22 @@
+# Generated by Django 4.2.7 on 2026-10-19 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("jobs", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="job",
+            name="profile_mode",
+            field=models.CharField(
+                blank=True,
+                choices=[("sampling", "Sampling"), ("deterministic", "Deterministic")],
+                max_length=20,
+                null=True,
+            ),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-19 10:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("jobs", "0002_job_profile_mode"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="job",
+            name="checkpoint",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
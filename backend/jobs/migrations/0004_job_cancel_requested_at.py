@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-19 13:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("jobs", "0003_job_checkpoint"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="job",
+            name="cancel_requested_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
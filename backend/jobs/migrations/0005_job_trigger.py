@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-19 14:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("jobs", "0004_job_cancel_requested_at"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="job",
+            name="trigger",
+            field=models.CharField(
+                choices=[("manual", "Manual"), ("scheduled", "Scheduled")],
+                default="manual",
+                max_length=20,
+            ),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-19 15:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("jobs", "0005_job_trigger"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="job",
+            name="idempotency_key",
+            field=models.CharField(blank=True, max_length=255, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.7 on 2026-10-19 16:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("jobs", "0006_job_idempotency_key"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="job",
+            index=models.Index(fields=["-created_at"], name="job_created_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="job",
+            index=models.Index(
+                fields=["pipeline", "-created_at"], name="job_pipeline_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="job",
+            index=models.Index(
+                fields=["status", "-created_at"], name="job_status_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="job",
+            index=models.Index(
+                fields=["pipeline", "status", "-created_at"],
+                name="job_pipe_status_created_idx",
+            ),
+        ),
+    ]
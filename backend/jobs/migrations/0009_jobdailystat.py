@@ -0,0 +1,128 @@
+# Generated by Django 4.2.7 on 2026-10-19 19:25
+
+from collections import defaultdict
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.utils import timezone
+
+
+def backfill_daily_stats(apps, schema_editor):
+    """
+    Build the rollups from the jobs that finished before they existed.
+    """
+    Job = apps.get_model("jobs", "Job")
+    JobDailyStat = apps.get_model("jobs", "JobDailyStat")
+
+    stats = defaultdict(lambda: defaultdict(float))
+    finished_jobs = Job.objects.filter(
+        status__in=["completed", "failed", "cancelled"]
+    ).values_list(
+        "pipeline_id",
+        "status",
+        "created_at",
+        "started_at",
+        "completed_at",
+        "source_record_count",
+        "destination_record_count",
+        "error_count",
+    )
+    for (
+        pipeline_id,
+        status,
+        created_at,
+        started_at,
+        completed_at,
+        source_count,
+        destination_count,
+        error_count,
+    ) in finished_jobs.iterator():
+        finished_at = completed_at or created_at
+        stat = stats[(pipeline_id, timezone.localdate(finished_at), status)]
+        stat["job_count"] += 1
+        stat["source_record_count"] += source_count or 0
+        stat["destination_record_count"] += destination_count or 0
+        stat["error_count"] += error_count
+        if started_at and completed_at:
+            stat["total_duration"] += (completed_at - started_at).total_seconds()
+
+    JobDailyStat.objects.bulk_create(
+        [
+            JobDailyStat(
+                pipeline_id=pipeline_id,
+                date=date,
+                status=status,
+                job_count=int(stat["job_count"]),
+                source_record_count=int(stat["source_record_count"]),
+                destination_record_count=int(stat["destination_record_count"]),
+                error_count=int(stat["error_count"]),
+                total_duration=stat["total_duration"],
+            )
+            for (pipeline_id, date, status), stat in stats.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("pipelines", "0002_pipeline_execution_config"),
+        ("jobs", "0008_job_archive"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="JobDailyStat",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField()),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "Pending"),
+                            ("running", "Running"),
+                            ("completed", "Completed"),
+                            ("failed", "Failed"),
+                            ("cancelled", "Cancelled"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("job_count", models.IntegerField(default=0)),
+                ("source_record_count", models.BigIntegerField(default=0)),
+                ("destination_record_count", models.BigIntegerField(default=0)),
+                ("error_count", models.BigIntegerField(default=0)),
+                ("total_duration", models.FloatField(default=0)),
+                (
+                    "pipeline",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="daily_stats",
+                        to="pipelines.pipeline",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["-date"],
+                "indexes": [
+                    models.Index(fields=["date"], name="job_daily_stat_date_idx")
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="jobdailystat",
+            constraint=models.UniqueConstraint(
+                fields=("pipeline", "date", "status"), name="job_daily_stat_unique"
+            ),
+        ),
+        migrations.RunPython(backfill_daily_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 4.2.7 on 2026-10-19 20:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("pipelines", "0003_pipeline_version"),
+        ("jobs", "0010_job_version"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="job",
+            name="skipped_record_count",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name="RecordFingerprint",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("source_id", models.CharField(max_length=255)),
+                ("hash", models.CharField(blank=True, max_length=64)),
+                ("pending_hash", models.CharField(blank=True, max_length=64)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "pending_job",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to="jobs.job",
+                    ),
+                ),
+                (
+                    "pipeline",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="record_fingerprints",
+                        to="pipelines.pipeline",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="recordfingerprint",
+            constraint=models.UniqueConstraint(
+                fields=("pipeline", "source_id"), name="record_fingerprint_unique"
+            ),
+        ),
+    ]
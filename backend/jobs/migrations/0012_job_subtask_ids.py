@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-19 11:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("jobs", "0011_recordfingerprint"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="job",
+            name="subtask_ids",
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
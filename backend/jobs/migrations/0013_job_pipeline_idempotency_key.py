@@ -0,0 +1,24 @@
+# Generated by Django 4.2.7 on 2026-10-19 11:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("jobs", "0012_job_subtask_ids"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="job",
+            name="idempotency_key",
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name="job",
+            constraint=models.UniqueConstraint(
+                fields=("pipeline", "idempotency_key"),
+                name="job_pipeline_idempotency_key_unique",
+            ),
+        ),
+    ]
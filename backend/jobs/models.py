@@ -1,8 +1,37 @@
 # jobs/models.py
+import time
 import uuid
-from django.db import models
-from django.db.models import JSONField
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import F, JSONField
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from common.caching import touch_collections
 from pipelines.models import Pipeline
+from .errors import ErrorAggregator
+
+class JobQuerySet(models.QuerySet):
+    # Columns shown by JobSummarySerializer
+    SUMMARY_FIELDS = [
+        'id', 'pipeline', 'status', 'started_at', 'completed_at', 'created_at',
+        'source_record_count', 'destination_record_count', 'skipped_record_count',
+        'error_count', 'cancel_requested_at'
+    ]
+    # Potentially large JSON columns
+    BLOB_FIELDS = ['logs', 'errors', 'checkpoint']
+    
+    def summaries(self):
+        """
+        Select only the summary columns of jobs, with the pipeline name
+        joined in.
+        """
+        return self.select_related('pipeline').only(*self.SUMMARY_FIELDS, 'pipeline__name')
+    
+    def without_blobs(self):
+        """
+        Defer the large JSON columns until they are accessed.
+        """
+        return self.defer(*self.BLOB_FIELDS)
 
 class Job(models.Model):
     """
@@ -16,6 +45,14 @@ class Job(models.Model):
         ('failed', 'Failed'),
         ('cancelled', 'Cancelled'),
     )
+    TRIGGER_CHOICES = (
+        ('manual', 'Manual'),
+        ('scheduled', 'Scheduled'),
+    )
+    PROFILE_MODE_CHOICES = (
+        ('sampling', 'Sampling'),
+        ('deterministic', 'Deterministic'),
+    )
     
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     pipeline = models.ForeignKey(Pipeline, on_delete=models.CASCADE, related_name='jobs')
@@ -24,26 +61,115 @@ class Job(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     started_at = models.DateTimeField(null=True, blank=True)
     completed_at = models.DateTimeField(null=True, blank=True)
+    cancel_requested_at = models.DateTimeField(null=True, blank=True)  # Cooperative cancellation signal
     
     # Execution metadata
     task_id = models.CharField(max_length=255, null=True, blank=True)  # Celery task ID
+    subtask_ids = models.JSONField(default=list, blank=True)  # Celery IDs of the partition and upload tasks
+    trigger = models.CharField(max_length=20, choices=TRIGGER_CHOICES, default='manual')
+    idempotency_key = models.CharField(max_length=255, null=True, blank=True)  # Deduplicates execute requests of a pipeline
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    version = models.PositiveIntegerField(default=1)  # Incremented on every change, drives ETags
+    profile_mode = models.CharField(max_length=20, choices=PROFILE_MODE_CHOICES, null=True, blank=True)  # Opt-in profiling
     
     # Results
     source_record_count = models.IntegerField(null=True, blank=True)  # Number of records retrieved
     destination_record_count = models.IntegerField(null=True, blank=True)  # Number of records uploaded
+    skipped_record_count = models.IntegerField(default=0)  # Unchanged records not uploaded again
     error_count = models.IntegerField(default=0)  # Number of errors encountered
     
     # Detailed data
     logs = models.JSONField(default=list)
     errors = models.JSONField(default=list)
+    checkpoint = models.JSONField(default=dict, blank=True)  # Progress of the last committed batch
+    
+    # Archiving of logs and errors
+    archived_at = models.DateTimeField(null=True, blank=True)
+    archive_path = models.CharField(max_length=255, null=True, blank=True)  # Name in the job_archive storage
+    
+    objects = JobQuerySet.as_manager()
     
     class Meta:
         ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(fields=['pipeline', 'idempotency_key'], name='job_pipeline_idempotency_key_unique'),
+        ]
+        indexes = [
+            # Match the filters and ordering of the job list endpoints
+            models.Index(fields=['-created_at'], name='job_created_idx'),
+            models.Index(fields=['pipeline', '-created_at'], name='job_pipeline_created_idx'),
+            models.Index(fields=['status', '-created_at'], name='job_status_created_idx'),
+            models.Index(fields=['pipeline', 'status', '-created_at'], name='job_pipe_status_created_idx'),
+        ]
         
     def __str__(self):
         return f"Job {self.id} - {self.pipeline.name} ({self.status})"
     
+    def save(self, *args, **kwargs):
+        """
+        Bump the version of the job and invalidate the cached responses that
+        include it.
+        """
+        if not self._state.adding:
+            self.version += 1
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'version', 'updated_at'}
+        super().save(*args, **kwargs)
+        self.touch_collections()
+    
+    def touch_collections(self):
+        """
+        Invalidate the cached job and pipeline responses after a change.
+        """
+        touch_collections('jobs', 'pipelines', f'pipeline-jobs:{self.pipeline_id}')
+    
+    def finish(self, status):
+        """
+        Record the final status of this job.
+        
+        A job cancelled in the meantime, e.g. by enforce_job_cancellation
+        while its task was still running, keeps its cancelled status.
+        
+        Args:
+            status (str): 'completed', 'failed' or 'cancelled'
+        
+        Returns:
+            bool: True if the status was recorded, False if the job had
+                  already been cancelled
+        """
+        with transaction.atomic():
+            current_status, completed_at = Job.objects.select_for_update().values_list(
+                'status', 'completed_at'
+            ).get(pk=self.pk)
+            if current_status == 'cancelled':
+                self.status = current_status
+                self.completed_at = completed_at
+                return False
+            
+            self.status = status
+            self.completed_at = timezone.now()
+            self.save(update_fields=['status', 'completed_at'])
+        return True
+    
+    def is_cancel_requested(self):
+        """
+        Check whether cancellation of this job has been requested.
+        
+        The database is polled at most once per JOB_CANCEL_POLL_INTERVAL, so
+        adapters can call this between every item.
+        """
+        if self.cancel_requested_at:
+            return True
+        
+        now = time.monotonic()
+        if now - getattr(self, '_cancel_checked_at', 0) >= settings.JOB_CANCEL_POLL_INTERVAL:
+            self._cancel_checked_at = now
+            self.cancel_requested_at = Job.objects.filter(pk=self.pk).values_list(
+                'cancel_requested_at', flat=True
+            ).first()
+        return self.cancel_requested_at is not None
+    
     def add_log(self, message, level='info'):
         """
         Add a log message to this job.
@@ -54,8 +180,7 @@ class Job(models.Model):
             'level': level,
             'message': message
         }
-        self.logs.append(log_entry)
-        self.save(update_fields=['logs'])
+        self._append_entry('logs', log_entry)
         
     def add_error(self, message, details=None):
         """
@@ -67,6 +192,175 @@ class Job(models.Model):
             'message': message,
             'details': details or {}
         }
-        self.errors.append(error_entry)
-        self.error_count += 1
-        self.save(update_fields=['errors', 'error_count'])
+        self._append_entry('errors', error_entry, error_count=1)
+    
+    def report_error(self, message, details=None):
+        """
+        Report an error that may repeat for many items, e.g. a failed upload.
+        
+        Errors are grouped by signature and written periodically; see
+        ErrorAggregator. Call flush_errors() before the job finishes.
+        """
+        self.error_aggregator.add(message, details)
+    
+    def flush_errors(self):
+        """
+        Write the errors reported since the last flush.
+        """
+        if hasattr(self, '_error_aggregator'):
+            self._error_aggregator.flush()
+    
+    @property
+    def error_aggregator(self):
+        if not hasattr(self, '_error_aggregator'):
+            self._error_aggregator = ErrorAggregator(self)
+        return self._error_aggregator
+    
+    def merge_errors(self, groups):
+        """
+        Merge groups of errors into the error entries of this job.
+        
+        Groups matching an existing entry by signature add to its count and
+        sample of item IDs; the others are appended. error_count grows by the
+        number of occurrences.
+        """
+        with transaction.atomic():
+            entries = Job.objects.select_for_update().values_list('errors', flat=True).get(pk=self.pk)
+            positions = {
+                entry['signature']: position for position, entry in enumerate(entries)
+                if entry.get('signature')
+            }
+            for group in groups:
+                position = positions.get(group['signature'])
+                if position is None:
+                    positions[group['signature']] = len(entries)
+                    entries.append(group)
+                    continue
+                entry = entries[position]
+                entry['count'] = entry.get('count', 1) + group['count']
+                entry['last_seen'] = group['last_seen']
+                room = settings.JOB_ERROR_SAMPLE_SIZE - len(entry['item_ids'])
+                entry['item_ids'].extend(group['item_ids'][:max(room, 0)])
+            
+            occurrences = sum(group['count'] for group in groups)
+            Job.objects.filter(pk=self.pk).update(
+                errors=entries,
+                error_count=F('error_count') + occurrences,
+                version=F('version') + 1,
+                updated_at=timezone.now()
+            )
+        
+        self.errors = entries
+        self.error_count += occurrences
+        self.touch_collections()
+    
+    def _append_entry(self, field, entry, **increments):
+        """
+        Append an entry to a JSON list field under a row lock, so that the
+        partition tasks of a fanned-out job do not overwrite each other.
+        """
+        with transaction.atomic():
+            entries = Job.objects.select_for_update().values_list(field, flat=True).get(pk=self.pk)
+            entries.append(entry)
+            updates = {name: F(name) + amount for name, amount in increments.items()}
+            Job.objects.filter(pk=self.pk).update(
+                **{field: entries},
+                **updates,
+                version=F('version') + 1,
+                updated_at=timezone.now()
+            )
+        
+        setattr(self, field, entries)
+        for name, amount in increments.items():
+            setattr(self, name, getattr(self, name) + amount)
+        self.touch_collections()
+    
+    def save_checkpoint(self, **state):
+        """
+        Record the progress of this job after a batch has been committed,
+        so that a retry can resume from it instead of starting over.
+        """
+        self.checkpoint.update(state)
+        self.save(update_fields=['checkpoint', 'source_record_count', 'destination_record_count', 'skipped_record_count'])
+    
+    def save_partition_checkpoint(self, partition_key, source_count=0, destination_count=0, skipped_count=0, **state):
+        """
+        Record the progress of one partition of a fanned-out job and add the
+        records it just processed to the job's counters.
+        """
+        with transaction.atomic():
+            checkpoint = Job.objects.select_for_update().values_list('checkpoint', flat=True).get(pk=self.pk)
+            checkpoint.setdefault('partitions', {}).setdefault(partition_key, {}).update(state)
+            Job.objects.filter(pk=self.pk).update(
+                checkpoint=checkpoint,
+                source_record_count=Coalesce(F('source_record_count'), 0) + source_count,
+                destination_record_count=Coalesce(F('destination_record_count'), 0) + destination_count,
+                skipped_record_count=F('skipped_record_count') + skipped_count,
+                version=F('version') + 1,
+                updated_at=timezone.now()
+            )
+        
+        self.checkpoint = checkpoint
+        self.touch_collections()
+    
+    @property
+    def skip_ratio(self):
+        """
+        Share of the fetched records skipped because they did not change.
+        """
+        if not self.source_record_count:
+            return None
+        return round(self.skipped_record_count / self.source_record_count, 4)
+
+class JobDailyStat(models.Model):
+    """
+    Rollup of finished job runs per pipeline, day and final status.
+    
+    Rows are updated incrementally each time a job run finishes, so dashboard
+    aggregates never scan the Job table. A failed run that is later retried
+    counts once per attempt.
+    """
+    pipeline = models.ForeignKey(Pipeline, on_delete=models.CASCADE, related_name='daily_stats')
+    date = models.DateField()
+    status = models.CharField(max_length=20, choices=Job.STATUS_CHOICES)
+    
+    job_count = models.IntegerField(default=0)
+    source_record_count = models.BigIntegerField(default=0)
+    destination_record_count = models.BigIntegerField(default=0)
+    error_count = models.BigIntegerField(default=0)
+    total_duration = models.FloatField(default=0)  # Seconds, summed over the runs
+    
+    class Meta:
+        ordering = ['-date']
+        constraints = [
+            models.UniqueConstraint(fields=['pipeline', 'date', 'status'], name='job_daily_stat_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['date'], name='job_daily_stat_date_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.pipeline_id} {self.date} {self.status}: {self.job_count}"
+
+class RecordFingerprint(models.Model):
+    """
+    Content hash of a source record as last uploaded by a pipeline.
+    
+    The hash is only replaced by pending_hash once the job that uploaded the
+    record completes, so change detection always compares against the last
+    successful run.
+    """
+    pipeline = models.ForeignKey(Pipeline, on_delete=models.CASCADE, related_name='record_fingerprints')
+    source_id = models.CharField(max_length=255)
+    hash = models.CharField(max_length=64, blank=True)  # Of the last successful upload
+    pending_hash = models.CharField(max_length=64, blank=True)  # Uploaded by pending_job
+    pending_job = models.ForeignKey(Job, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['pipeline', 'source_id'], name='record_fingerprint_unique'),
+        ]
+    
+    def __str__(self):
+        return f"{self.pipeline_id} {self.source_id}: {self.hash}"
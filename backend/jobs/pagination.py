@@ -0,0 +1,47 @@
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+class JobPageNumberPagination(PageNumberPagination):
+    """
+    Page-number pagination kept for clients that request ?page=.
+    """
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+class JobCursorPagination(CursorPagination):
+    """
+    Keyset pagination for the job history.
+    
+    Pages are fetched with "WHERE created_at < <cursor>" instead of OFFSET,
+    so deep pages cost the same as the first one. Requests with a "page"
+    parameter fall back to page-number pagination, which also supports
+    ordering by the other job list fields.
+    """
+    ordering = ('-created_at', '-id')
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    
+    def get_ordering(self, request, queryset, view):
+        """
+        Page by creation time, with the primary key breaking ties.
+        
+        Cursors need a non-null column, so the nullable started_at and
+        completed_at orderings are only honoured with page numbers; here
+        only the direction of a created_at ordering is.
+        """
+        requested = super().get_ordering(request, queryset, view)
+        if requested and requested[0] == 'created_at':
+            return ('created_at', 'id')
+        return self.ordering
+    
+    def paginate_queryset(self, queryset, request, view=None):
+        if JobPageNumberPagination.page_query_param in request.query_params:
+            self.page_number_paginator = JobPageNumberPagination()
+            return self.page_number_paginator.paginate_queryset(queryset, request, view)
+        
+        self.page_number_paginator = None
+        return super().paginate_queryset(queryset, request, view)
+    
+    def get_paginated_response(self, data):
+        if self.page_number_paginator:
+            return self.page_number_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
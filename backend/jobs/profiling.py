@@ -0,0 +1,118 @@
+import cProfile
+import fcntl
+import os
+import pstats
+import sys
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+from django.conf import settings
+
+from .artifacts import get_job_artifact_dir
+
+PROFILE_STATS_FILENAME = 'profile.pstats'
+PROFILE_COLLAPSED_FILENAME = 'profile.collapsed.txt'
+PROFILE_LOCK_FILENAME = '.profile.lock'
+
+def get_profile_artifacts(job):
+    """
+    Return the existing profile artifact paths of a job, keyed by kind.
+    """
+    directory = get_job_artifact_dir(job, create=False)
+    artifacts = {
+        'pstats': os.path.join(directory, PROFILE_STATS_FILENAME),
+        'collapsed': os.path.join(directory, PROFILE_COLLAPSED_FILENAME),
+    }
+    return {kind: path for kind, path in artifacts.items() if os.path.exists(path)}
+
+class SamplingProfiler:
+    """
+    Low-overhead statistical profiler.
+
+    A background thread snapshots the stacks of every other thread at a fixed
+    interval and counts identical stacks, which is exactly the collapsed-stack
+    format consumed by flamegraph tools.
+    """
+
+    def __init__(self, interval=None, max_depth=None):
+        self.interval = interval or settings.JOB_PROFILING_SAMPLE_INTERVAL
+        self.max_depth = max_depth or settings.JOB_PROFILING_MAX_DEPTH
+        self.samples = Counter()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='job-sampling-profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join()
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop_event.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id != own_id:
+                    self.samples[self._collapse(frame)] += 1
+
+    def _collapse(self, frame):
+        stack = []
+        while frame is not None and len(stack) < self.max_depth:
+            code = frame.f_code
+            stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            frame = frame.f_back
+        return ';'.join(reversed(stack))
+
+    def write_collapsed(self, path):
+        """
+        Write the collapsed stacks, adding to the counts already in the file.
+        """
+        samples = Counter(self.samples)
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as collapsed_file:
+                for line in collapsed_file:
+                    stack, _, count = line.rstrip('\n').rpartition(' ')
+                    samples[stack] += int(count)
+
+        with open(path, 'w', encoding='utf-8') as collapsed_file:
+            for stack, count in samples.most_common():
+                collapsed_file.write(f"{stack} {count}\n")
+
+@contextmanager
+def profile_job(job):
+    """
+    Profile the enclosed block and store the results as artifacts of the job.
+
+    Sampling mode only records collapsed stacks; deterministic mode additionally
+    runs cProfile on the calling thread and dumps a pstats file.
+
+    Every task of a job (extraction, upload, partitions and retries) adds to
+    the same artifacts, under a lock since partitions finish concurrently.
+    """
+    sampler = SamplingProfiler()
+    profiler = cProfile.Profile() if job.profile_mode == 'deterministic' else None
+
+    sampler.start()
+    if profiler:
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if profiler:
+            profiler.disable()
+        sampler.stop()
+
+        directory = get_job_artifact_dir(job)
+        with open(os.path.join(directory, PROFILE_LOCK_FILENAME), 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            sampler.write_collapsed(os.path.join(directory, PROFILE_COLLAPSED_FILENAME))
+            if profiler:
+                stats_path = os.path.join(directory, PROFILE_STATS_FILENAME)
+                stats = pstats.Stats(profiler)
+                if os.path.exists(stats_path):
+                    stats.add(stats_path)
+                stats.dump_stats(stats_path)
+        job.add_log(f"Profile captured ({job.profile_mode}, {sum(sampler.samples.values())} samples)")
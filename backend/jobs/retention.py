@@ -0,0 +1,167 @@
+import gzip
+import io
+import json
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import storages
+from django.utils import timezone
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from .models import Job
+from .staging import StagingStore
+
+logger = logging.getLogger(__name__)
+
+FINISHED_STATUSES = ['completed', 'failed', 'cancelled']
+
+def get_archive_storage():
+    return storages['job_archive']
+
+def compress(data):
+    """
+    Compress archive data with zstd when available, gzip otherwise.
+    
+    Returns:
+        tuple: (compressed bytes, file suffix)
+    """
+    if zstandard:
+        return zstandard.ZstdCompressor(level=settings.JOB_ARCHIVE_COMPRESSION_LEVEL).compress(data), '.jsonl.zst'
+    return gzip.compress(data, compresslevel=min(settings.JOB_ARCHIVE_COMPRESSION_LEVEL, 9)), '.jsonl.gz'
+
+def decompress(data, name):
+    if name.endswith('.zst'):
+        if not zstandard:
+            raise ImportError("The zstandard package is required to read zstd archives")
+        return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+    return gzip.decompress(data)
+
+def archive_job(job):
+    """
+    Move the logs and errors of a finished job to a compressed JSONL archive
+    and clear them from the job row. Summary columns are kept.
+    
+    Each line of the archive holds one entry, tagged with its kind
+    ("log" or "error"). The checkpoint and staged records of a completed job
+    are deleted; failed and cancelled jobs keep both so they can be resumed.
+    """
+    buffer = io.StringIO()
+    for kind, entries in [('log', job.logs), ('error', job.errors)]:
+        for entry in entries:
+            buffer.write(json.dumps({'kind': kind, **entry}) + '\n')
+    
+    data, suffix = compress(buffer.getvalue().encode('utf-8'))
+    name = f"{job.created_at:%Y/%m}/{job.id}{suffix}"
+    name = get_archive_storage().save(name, ContentFile(data))
+    
+    job.logs = []
+    job.errors = []
+    update_fields = ['logs', 'errors', 'archived_at', 'archive_path']
+    if job.status == 'completed':
+        # A completed job is never resumed, so its checkpoint is obsolete
+        job.checkpoint = {}
+        update_fields.append('checkpoint')
+    job.archived_at = timezone.now()
+    job.archive_path = name
+    job.save(update_fields=update_fields)
+    
+    # Staged records are only kept while the job may still be resumed: a
+    # checkpoint marked as staged must always have its store
+    if job.status == 'completed':
+        StagingStore(job, create=False).delete()
+
+def load_archived_entries(job):
+    """
+    Read the logs and errors of an archived job back from its archive.
+    
+    Returns:
+        dict: Lists of entries under "logs" and "errors"
+    """
+    entries = {'logs': [], 'errors': []}
+    with get_archive_storage().open(job.archive_path, 'rb') as archive_file:
+        data = decompress(archive_file.read(), job.archive_path)
+    
+    for line in data.decode('utf-8').splitlines():
+        entry = json.loads(line)
+        kind = entry.pop('kind')
+        entries['logs' if kind == 'log' else 'errors'].append(entry)
+    return entries
+
+def restore_job(job):
+    """
+    Put the archived logs and errors of a job back into its row.
+    
+    The archive is only deleted once the row is saved, so a failure never
+    loses the entries.
+    """
+    entries = load_archived_entries(job)
+    archive_path = job.archive_path
+    
+    job.logs = entries['logs'] + job.logs
+    job.errors = entries['errors'] + job.errors
+    job.archived_at = None
+    job.archive_path = None
+    job.save(update_fields=['logs', 'errors', 'archived_at', 'archive_path'])
+    
+    get_archive_storage().delete(archive_path)
+
+def archive_old_jobs(batch_size=None):
+    """
+    Archive the logs of every finished job older than JOB_LOG_RETENTION_DAYS.
+    
+    Jobs are processed in batches of primary keys so memory stays bounded
+    however large the backlog is. A job that cannot be archived is logged
+    and skipped until the next run.
+    
+    Returns:
+        int: Number of jobs archived
+    """
+    batch_size = batch_size or settings.JOB_ARCHIVE_BATCH_SIZE
+    cutoff = timezone.now() - timedelta(days=settings.JOB_LOG_RETENTION_DAYS)
+    candidates = Job.objects.filter(
+        status__in=FINISHED_STATUSES,
+        completed_at__lt=cutoff,
+        archived_at__isnull=True
+    )
+    
+    archived = 0
+    failed_ids = []
+    while True:
+        # Jobs that failed stay candidates, so they are excluded explicitly
+        batch = list(candidates.exclude(pk__in=failed_ids).order_by('completed_at')[:batch_size])
+        if not batch:
+            return archived
+        
+        for job in batch:
+            try:
+                archive_job(job)
+                archived += 1
+            except Exception:
+                logger.exception("Could not archive job %s", job.id)
+                failed_ids.append(job.id)
+
+def purge_task_results(batch_size=None):
+    """
+    Delete Celery task results older than CELERY_RESULT_RETENTION_DAYS, in
+    batches to keep each delete transaction short.
+    
+    Returns:
+        int: Number of task results deleted
+    """
+    from django_celery_results.models import TaskResult
+    
+    batch_size = batch_size or settings.JOB_ARCHIVE_BATCH_SIZE
+    cutoff = timezone.now() - timedelta(days=settings.CELERY_RESULT_RETENTION_DAYS)
+    
+    deleted = 0
+    while True:
+        ids = list(TaskResult.objects.filter(date_done__lt=cutoff).values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        deleted += TaskResult.objects.filter(id__in=ids).delete()[0]
@@ -0,0 +1,434 @@
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.conf import settings
+
+from common.records import RecordBatch
+
+from .fingerprints import ChangeDetector
+from .staging import StagingStore
+from .transformations import compile_transformations
+
+class JobCancelled(Exception):
+    """
+    Raised when a job stops early because its cancellation was requested.
+    """
+    pass
+
+class PipelineRunner:
+    """
+    Moves data from a pipeline's source to its destination batch by batch.
+
+    After each batch has been uploaded, the source cursor, the number of
+    completed batches and the uploaded source IDs are checkpointed on the job,
+    so that a retry resumes after the last committed batch.
+
+    Cancellation is cooperative: it is checked between batches, and a batch
+    interrupted by a cancellation only commits the records it has uploaded,
+    without advancing the source cursor.
+
+    When a partition is given, only that shard of the source is processed and
+    progress is checkpointed per partition, so that the shards of one job can
+    run concurrently in separate tasks.
+
+    With staging enabled (execution_config "staging", or PIPELINE_STAGING),
+    extraction and upload are separate phases connected by the job's
+    StagingStore, so the upload can be retried or resumed without fetching
+    the source again.
+
+    With change detection enabled (execution_config "change_detection", or
+    PIPELINE_CHANGE_DETECTION), records whose content hash matches the one
+    uploaded by the pipeline's last successful run are skipped.
+
+    The time spent in each stage (fetch, transform, upload, ...) is summed in
+    timings and reported with the record counters.
+    """
+
+    def __init__(self, pipeline, job, batch_size=None, partition_key=None, partition=None):
+        """
+        Args:
+            pipeline (Pipeline): The pipeline to run
+            job (Job): The job tracking this execution
+            batch_size (int, optional): Number of records per batch
+            partition_key (str, optional): Key of the partition in the job's checkpoint
+            partition (dict, optional): Shard descriptor from get_partitions()
+        """
+        self.pipeline = pipeline
+        self.job = job
+        self.batch_size = (
+            batch_size
+            or pipeline.execution_config.get('batch_size')
+            or settings.PIPELINE_BATCH_SIZE
+        )
+        self.partition_key = partition_key
+        self.partition = partition
+        self.label = f"Partition {partition_key}: " if partition_key is not None else ""
+        self.staging = pipeline.execution_config.get('staging', settings.PIPELINE_STAGING)
+        self.timings = defaultdict(float)
+        self.change_detector = None
+        if pipeline.execution_config.get('change_detection', settings.PIPELINE_CHANGE_DETECTION):
+            self.change_detector = ChangeDetector(pipeline, job)
+
+    def get_checkpoint(self):
+        """
+        Return the checkpoint this runner resumes from.
+        """
+        checkpoint = self.job.checkpoint or {}
+        if self.partition_key is None:
+            return checkpoint
+        return checkpoint.get('partitions', {}).get(self.partition_key, {})
+
+    def plan_partitions(self):
+        """
+        Split the source into shards for a partitioned run.
+
+        The plan is stored in the job's checkpoint on first use, so that a
+        retried job processes the very same shards.
+
+        Returns:
+            dict: Shard descriptors keyed by partition key, or None if the
+                  source adapter cannot be partitioned
+        """
+        job = self.job
+        plan = (job.checkpoint or {}).get('partition_plan')
+        if plan is not None:
+            return plan
+
+        source_adapter = self.pipeline.get_source_adapter(job)
+        max_partitions = self.pipeline.execution_config.get('max_partitions', settings.PIPELINE_MAX_PARTITIONS)
+        partitions = source_adapter.get_partitions(max_partitions)
+        if partitions is None:
+            return None
+
+        plan = {str(index): partition for index, partition in enumerate(partitions)}
+        job.source_record_count = 0
+        job.destination_record_count = 0
+        job.save_checkpoint(partition_plan=plan, partitions={})
+        return plan
+
+    def run(self):
+        """
+        Run the pipeline until the source (or partition) is exhausted.
+
+        With staging, the source is first extracted into the job's staging
+        store and the upload then reads from it; otherwise each batch is
+        uploaded as soon as it is fetched.
+
+        Returns:
+            dict: Record counters of the run
+        """
+        if self.staging:
+            self.extract()
+            return self.load()
+
+        job = self.job
+        checkpoint = self.resume(checkpoint_key='completed_batches')
+        source_adapter = self.get_source_adapter()
+        destination_adapter = self.get_destination_adapter()
+        transformations = self.get_transformations()
+
+        completed_batches = checkpoint.get('completed_batches', 0)
+        # Records of the batch in flight when a previous attempt stopped
+        uploaded_ids = set(checkpoint.get('uploaded_ids', []))
+
+        job.add_log(f"{self.label}Fetching data from source")
+        batches = source_adapter.fetch_batches(checkpoint.get('cursor'), self.batch_size, partition=self.partition)
+        with self.closing(destination_adapter):
+            for batch, cursor in self.timed_batches(batches, 'fetch'):
+                batch = RecordBatch.from_records(batch)
+                uploaded_count, skipped_count = self.upload_batch(
+                    batch, destination_adapter, transformations, completed_batches, uploaded_ids
+                )
+
+                # Resuming starts after this batch, so its IDs are not needed any more
+                completed_batches += 1
+                uploaded_ids.clear()
+                self.commit_batch(
+                    len(batch),
+                    uploaded_count,
+                    skipped_count,
+                    cursor=cursor,
+                    completed_batches=completed_batches,
+                    uploaded_ids=[]
+                )
+
+        return self.finish()
+
+    def extract(self):
+        """
+        Stream the source (or partition) into the job's staging store.
+
+        Extraction is checkpointed per batch like a direct run, and skipped
+        entirely once everything has been staged.
+        """
+        job = self.job
+        checkpoint = self.resume(checkpoint_key='staged_batches')
+        if checkpoint.get('staged'):
+            return
+
+        store = StagingStore(job)
+        source_adapter = self.get_source_adapter()
+        staged_batches = checkpoint.get('staged_batches', 0)
+
+        job.add_log(f"{self.label}Staging data from source")
+        batches = source_adapter.fetch_batches(checkpoint.get('cursor'), self.batch_size, partition=self.partition)
+        for batch, cursor in self.timed_batches(batches, 'fetch'):
+            if job.is_cancel_requested():
+                self.raise_cancelled(staged_batches)
+
+            batch = RecordBatch.from_records(batch)
+            with self.timed('stage'):
+                store.write(batch, partition=self.partition_key)
+            staged_batches += 1
+            self.commit_batch(len(batch), 0, cursor=cursor, staged_batches=staged_batches)
+
+        self.commit_batch(0, 0, staged=True)
+        job.add_log(f"{self.label}Staged {self.source_count} records in {staged_batches} batches")
+
+    def load(self):
+        """
+        Upload the staged records of the job (or partition) to the destination.
+
+        Returns:
+            dict: Record counters of the run
+        """
+        job = self.job
+        checkpoint = self.resume(checkpoint_key='completed_batches')
+        store = StagingStore(job)
+        destination_adapter = self.get_destination_adapter()
+        transformations = self.get_transformations()
+
+        completed_batches = checkpoint.get('completed_batches', 0)
+        # Records of the batch in flight when a previous attempt stopped
+        uploaded_ids = set(checkpoint.get('uploaded_ids', []))
+
+        job.add_log(f"{self.label}Uploading staged records")
+        batches = store.scan(checkpoint.get('staged_position', 0), self.batch_size, partition=self.partition_key)
+        with self.closing(destination_adapter):
+            for batch, position in self.timed_batches(batches, 'read staged'):
+                uploaded_count, skipped_count = self.upload_batch(
+                    batch, destination_adapter, transformations, completed_batches, uploaded_ids
+                )
+
+                # Resuming starts after this batch, so its IDs are not needed any more
+                completed_batches += 1
+                uploaded_ids.clear()
+                self.commit_batch(
+                    0,
+                    uploaded_count,
+                    skipped_count,
+                    staged_position=position,
+                    completed_batches=completed_batches,
+                    uploaded_ids=[]
+                )
+
+        return self.finish()
+
+    def resume(self, checkpoint_key):
+        """
+        Restore the counters from the checkpoint, logging how far a previous
+        attempt got.
+
+        Args:
+            checkpoint_key (str): Batch counter of the phase being resumed
+
+        Returns:
+            dict: The checkpoint
+        """
+        checkpoint = self.get_checkpoint()
+        if checkpoint.get(checkpoint_key):
+            self.job.add_log(
+                f"{self.label}Resuming from checkpoint: {checkpoint[checkpoint_key]} batches, "
+                f"{checkpoint.get('destination_record_count', 0)} records already uploaded"
+            )
+        self.source_count = checkpoint.get('source_record_count', 0)
+        self.destination_count = checkpoint.get('destination_record_count', 0)
+        self.skipped_count = checkpoint.get('skipped_record_count', 0)
+        return checkpoint
+
+    def get_source_adapter(self):
+        self.job.add_log(f"{self.label}Initializing source adapter")
+        return self.pipeline.get_source_adapter(self.job)
+
+    def get_destination_adapter(self):
+        self.job.add_log(f"{self.label}Initializing destination adapter")
+        return self.pipeline.get_destination_adapter(self.job)
+
+    def get_transformations(self):
+        """
+        Compile the pipeline's transformations once per run.
+        """
+        transformations = compile_transformations(self.pipeline.transformation_config)
+        if transformations:
+            self.job.add_log(f"{self.label}Applying {len(transformations)} data transformations to each batch")
+        return transformations
+
+    def upload_batch(self, batch, destination_adapter, transformations, completed_batches, uploaded_ids):
+        """
+        Transform and upload the records of a batch that a previous attempt
+        did not upload yet.
+
+        The IDs of the uploaded records are added to uploaded_ids, which only
+        holds the IDs of this batch: they are checkpointed when the job is
+        cancelled or fails in the middle of it, and dropped once it is
+        committed, since a resumed run starts after it. With change
+        detection, records that did not change since the last successful run
+        are skipped after the transformations.
+
+        Returns:
+            tuple: Number of records uploaded and skipped
+        """
+        job = self.job
+        label = self.label
+        if job.is_cancel_requested():
+            # The batch may be incomplete; it is fetched again on resume
+            self.raise_cancelled(completed_batches)
+
+        uploaded_count = 0
+        skipped_count = 0
+
+        # Skip records uploaded by a previous attempt of this job
+        pending = batch.take(
+            row for row, source_id in enumerate(batch.column('id')) if str(source_id) not in uploaded_ids
+        )
+        if pending and transformations:
+            with self.timed('transform'):
+                transformed = transformations.apply(pending)
+            if len(transformed) < len(pending):
+                job.add_log(f"{label}Filtered out {len(pending) - len(transformed)} records of batch {completed_batches + 1}")
+            pending = transformed
+
+        if pending and self.change_detector:
+            with self.timed('change detection'):
+                changed, hashes = self.change_detector.filter(pending)
+            skipped_count = len(pending) - len(changed)
+            if skipped_count:
+                job.add_log(f"{label}Skipped {skipped_count} unchanged records of batch {completed_batches + 1}")
+            pending = changed
+
+        if pending:
+            job.add_log(f"{label}Uploading batch {completed_batches + 1} ({len(pending)} records) to destination")
+            with self.timed('upload'):
+                upload_results = destination_adapter.upload_data(pending)
+            uploaded_count = upload_results.get('success_count', 0)
+            batch_uploaded_ids = [str(source_id) for source_id in destination_adapter.get_uploaded_ids(upload_results)]
+            uploaded_ids.update(batch_uploaded_ids)
+
+        try:
+            if pending and self.change_detector:
+                with self.timed('change detection'):
+                    self.change_detector.record(batch_uploaded_ids, hashes)
+            cancel_requested = job.is_cancel_requested()
+        except Exception:
+            # A retry fetches the batch again and must skip what was uploaded
+            self.commit_batch(0, uploaded_count, uploaded_ids=sorted(uploaded_ids))
+            raise
+
+        if cancel_requested:
+            self.commit_batch(0, uploaded_count, uploaded_ids=sorted(uploaded_ids))
+            self.raise_cancelled(completed_batches)
+
+        return uploaded_count, skipped_count
+
+    def finish(self):
+        """
+        Mark the partition as done and return the record counters.
+        """
+        if self.partition_key is not None:
+            self.job.save_partition_checkpoint(self.partition_key, done=True)
+        elif not self.source_count:
+            self.job.add_log("No data received from source", level="warning")
+
+        timings = {stage: round(seconds, 3) for stage, seconds in self.timings.items()}
+        if timings:
+            self.job.add_log(
+                f"{self.label}Stage timings: " + ', '.join(f"{stage} {seconds:.2f}s" for stage, seconds in timings.items())
+            )
+
+        return {
+            'source_count': self.source_count,
+            'destination_count': self.destination_count,
+            'skipped_count': self.skipped_count,
+            'timings': timings,
+        }
+
+    @contextmanager
+    def timed(self, stage):
+        """
+        Add the time spent in the block to the timings of a stage.
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[stage] += time.perf_counter() - started
+
+    @contextmanager
+    def closing(self, destination_adapter):
+        """
+        Close the destination adapter when the upload loop ends, even when it
+        is cancelled or fails, so that what was uploaded gets published.
+        """
+        try:
+            yield
+        finally:
+            with self.timed('close'):
+                destination_adapter.close()
+
+    def timed_batches(self, batches, stage):
+        """
+        Iterate over batches, adding the time spent producing each to the
+        timings of a stage.
+        """
+        batches = iter(batches)
+        while True:
+            with self.timed(stage):
+                batch = next(batches, None)
+            if batch is None:
+                return
+            yield batch
+
+    def commit_batch(self, source_count, destination_count, skipped_count=0, **state):
+        """
+        Add a committed batch to the counters and checkpoint the progress.
+        """
+        self.source_count += source_count
+        self.destination_count += destination_count
+        self.skipped_count += skipped_count
+        with self.timed('checkpoint'):
+            self.job.flush_errors()
+
+            if self.partition_key is None:
+                self.job.source_record_count = self.source_count
+                self.job.destination_record_count = self.destination_count
+                self.job.skipped_record_count = self.skipped_count
+                self.job.save_checkpoint(
+                    source_record_count=self.source_count,
+                    destination_record_count=self.destination_count,
+                    skipped_record_count=self.skipped_count,
+                    **state
+                )
+            else:
+                self.job.save_partition_checkpoint(
+                    self.partition_key,
+                    source_count=source_count,
+                    destination_count=destination_count,
+                    skipped_count=skipped_count,
+                    source_record_count=self.source_count,
+                    destination_record_count=self.destination_count,
+                    skipped_record_count=self.skipped_count,
+                    **state
+                )
+
+    def raise_cancelled(self, completed_batches):
+        """
+        Record how far the run got and stop it.
+        """
+        self.job.flush_errors()
+        self.job.add_log(
+            f"{self.label}Cancelled after {completed_batches} batches: {self.source_count} records fetched, "
+            f"{self.destination_count} uploaded",
+            level='warning'
+        )
+        raise JobCancelled()
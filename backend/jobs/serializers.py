@@ -8,13 +8,16 @@ class JobSummarySerializer(serializers.ModelSerializer):
     """
     pipeline_name = serializers.CharField(source='pipeline.name', read_only=True)
     duration = serializers.SerializerMethodField()
+    skip_ratio = serializers.FloatField(read_only=True)
     
     class Meta:
         model = Job
         fields = [
             'id', 'pipeline', 'pipeline_name', 'status', 'started_at', 
             'completed_at', 'duration', 'source_record_count', 
-            'destination_record_count', 'error_count', 'created_at'
+            'destination_record_count', 'skipped_record_count', 'skip_ratio',
+            'error_count', 'created_at',
+            'cancel_requested_at'
         ]
         read_only_fields = fields
     
@@ -34,5 +37,5 @@ class JobDetailSerializer(JobSummarySerializer):
     class Meta(JobSummarySerializer.Meta):
         fields = JobSummarySerializer.Meta.fields + [
             'task_id', 'logs', 'errors', 'pipeline_source_type', 
-            'pipeline_destination_type'
+            'pipeline_destination_type', 'profile_mode', 'archived_at'
         ]
@@ -0,0 +1,139 @@
+import json
+import os
+import sqlite3
+from contextlib import closing, contextmanager
+
+from common.records import RecordBatch
+
+from .artifacts import get_job_artifact_dir
+
+STAGING_FILENAME = 'staging.sqlite3'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    position INTEGER PRIMARY KEY AUTOINCREMENT,
+    partition TEXT NOT NULL,
+    source_id TEXT,
+    data TEXT NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS records_partition_source_id ON records (partition, source_id);
+CREATE INDEX IF NOT EXISTS records_source_id ON records (source_id);
+"""
+
+class StagingStore:
+    """
+    On-disk store of the records extracted by a job, in a SQLite file among
+    the job's artifacts.
+
+    Records are appended as batches stream in from the source, so the upload
+    can run, be retried or resumed later without fetching again. Positions
+    increase in insertion order, which makes sequential scans of a partition
+    a range read; records can also be looked up by source ID. Staging the
+    same source ID twice (e.g. when a batch is fetched again on resume)
+    replaces the record in place.
+    """
+
+    def __init__(self, job, create=True):
+        """
+        Args:
+            job (Job): The job owning the store
+            create (bool): Create the artifact directory if needed
+        """
+        self.path = os.path.join(get_job_artifact_dir(job, create=create), STAGING_FILENAME)
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    @contextmanager
+    def connect(self):
+        """
+        Open a connection, committing on success.
+
+        WAL mode lets the partitions of a job stage concurrently while
+        other tasks read.
+        """
+        with closing(sqlite3.connect(self.path, timeout=60)) as connection:
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.executescript(SCHEMA)
+            with connection:
+                yield connection
+
+    def write(self, records, partition=None):
+        """
+        Stage a batch of records.
+
+        Args:
+            records (RecordBatch or list): Records to stage
+            partition (str, optional): Partition the records belong to
+        """
+        rows = [
+            (
+                partition or '',
+                None if record.get('id') is None else str(record.get('id')),
+                json.dumps(dict(record), default=str)
+            )
+            for record in records
+        ]
+        with self.connect() as connection:
+            connection.executemany(
+                'INSERT INTO records (partition, source_id, data) VALUES (?, ?, ?) '
+                'ON CONFLICT (partition, source_id) DO UPDATE SET data = excluded.data',
+                rows
+            )
+
+    def scan(self, after=0, batch_size=100, partition=None):
+        """
+        Read the staged records of a partition in staging order.
+
+        Args:
+            after (int): Position to resume after, as yielded by a previous scan
+            batch_size (int): Number of records per batch
+            partition (str, optional): Partition to read
+
+        Yields:
+            tuple: (RecordBatch, position of its last record)
+        """
+        while True:
+            with self.connect() as connection:
+                rows = connection.execute(
+                    'SELECT position, data FROM records WHERE partition = ? AND position > ? '
+                    'ORDER BY position LIMIT ?',
+                    (partition or '', after, batch_size)
+                ).fetchall()
+            if not rows:
+                return
+            after = rows[-1][0]
+            yield RecordBatch.from_records(json.loads(data) for _, data in rows), after
+
+    def get(self, source_id, partition=None):
+        """
+        Return the staged record with the given source ID, or None.
+        """
+        query = 'SELECT data FROM records WHERE source_id = ?'
+        params = [str(source_id)]
+        if partition is not None:
+            query += ' AND partition = ?'
+            params.append(partition)
+        with self.connect() as connection:
+            row = connection.execute(query + ' LIMIT 1', params).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def count(self, partition=None):
+        """
+        Return the number of staged records, optionally of one partition.
+        """
+        with self.connect() as connection:
+            if partition is None:
+                return connection.execute('SELECT COUNT(*) FROM records').fetchone()[0]
+            return connection.execute(
+                'SELECT COUNT(*) FROM records WHERE partition = ?', (partition,)
+            ).fetchone()[0]
+
+    def delete(self):
+        """
+        Remove the store from disk.
+        """
+        for suffix in ['', '-wal', '-shm']:
+            if os.path.exists(self.path + suffix):
+                os.remove(self.path + suffix)
@@ -0,0 +1,109 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from .models import JobDailyStat
+
+def record_job_completion(job):
+    """
+    Add a finished job run to the daily rollups.
+    
+    Args:
+        job (Job): A job that just reached a final status
+    """
+    finished_at = job.completed_at or timezone.now()
+    duration = (finished_at - job.started_at).total_seconds() if job.started_at else 0
+    
+    stat, _ = JobDailyStat.objects.get_or_create(
+        pipeline_id=job.pipeline_id,
+        date=timezone.localdate(finished_at),
+        status=job.status
+    )
+    JobDailyStat.objects.filter(pk=stat.pk).update(
+        job_count=F('job_count') + 1,
+        source_record_count=F('source_record_count') + (job.source_record_count or 0),
+        destination_record_count=F('destination_record_count') + (job.destination_record_count or 0),
+        error_count=F('error_count') + job.error_count,
+        total_duration=F('total_duration') + duration
+    )
+
+def get_dashboard_stats(days=30, pipeline_id=None):
+    """
+    Aggregate the rollups of the last days for the dashboard.
+    
+    All figures are computed from a single grouped query over the rollup
+    table, whose size depends on the number of days and pipelines only.
+    
+    Args:
+        days (int): Number of days to cover, including today
+        pipeline_id (str, optional): Restrict the figures to one pipeline
+        
+    Returns:
+        dict: Totals, per-status, per-day and per-pipeline aggregates
+    """
+    since = timezone.localdate() - timedelta(days=days - 1)
+    rows = JobDailyStat.objects.filter(date__gte=since)
+    if pipeline_id:
+        rows = rows.filter(pipeline_id=pipeline_id)
+    rows = rows.values('date', 'status', 'pipeline_id', 'pipeline__name').annotate(
+        jobs=Sum('job_count'),
+        source_records=Sum('source_record_count'),
+        destination_records=Sum('destination_record_count'),
+        errors=Sum('error_count'),
+        duration=Sum('total_duration')
+    ).order_by()
+    
+    totals = defaultdict(float)
+    by_status = defaultdict(int)
+    daily = defaultdict(lambda: defaultdict(int))
+    by_pipeline = {}
+    
+    for row in rows:
+        for name in ['jobs', 'source_records', 'destination_records', 'errors', 'duration']:
+            totals[name] += row[name]
+        by_status[row['status']] += row['jobs']
+        
+        day = daily[row['date']]
+        day['jobs'] += row['jobs']
+        day[row['status']] += row['jobs']
+        day['destination_records'] += row['destination_records']
+        
+        pipeline = by_pipeline.setdefault(row['pipeline_id'], {
+            'pipeline': row['pipeline_id'],
+            'pipeline_name': row['pipeline__name'],
+            'jobs': 0,
+            'completed': 0,
+            'destination_records': 0,
+        })
+        pipeline['jobs'] += row['jobs']
+        pipeline['destination_records'] += row['destination_records']
+        if row['status'] == 'completed':
+            pipeline['completed'] += row['jobs']
+    
+    def success_rate(completed, jobs):
+        return round(completed / jobs, 4) if jobs else None
+    
+    jobs = int(totals['jobs'])
+    return {
+        'since': since,
+        'totals': {
+            'jobs': jobs,
+            'success_rate': success_rate(by_status['completed'], jobs),
+            'source_records': int(totals['source_records']),
+            'destination_records': int(totals['destination_records']),
+            'errors': int(totals['errors']),
+            'average_duration': totals['duration'] / jobs if jobs else None,
+            'throughput': totals['destination_records'] / totals['duration'] if totals['duration'] else None,
+        },
+        'by_status': dict(by_status),
+        'daily': [
+            {'date': date, **figures}
+            for date, figures in sorted(daily.items())
+        ],
+        'by_pipeline': [
+            dict(pipeline, success_rate=success_rate(pipeline['completed'], pipeline['jobs']))
+            for pipeline in sorted(by_pipeline.values(), key=lambda pipeline: -pipeline['jobs'])
+        ],
+    }
@@ -1,10 +1,25 @@
 # jobs/tasks.py
-import datetime
-from celery import shared_task
+import random
+import uuid
+
+from celery import chord, shared_task
+from celery.exceptions import SoftTimeLimitExceeded
+from django.conf import settings
 from django.utils import timezone
 
+from common.locks import cache_lock
+from destinations.adapters.jira_schema import MappingError
 from pipelines.models import Pipeline
+from jobs.dispatch import dispatch_job, get_dispatch_options, revoke_job_tasks
+from jobs.fingerprints import commit_fingerprints
 from jobs.models import Job
+from jobs.profiling import profile_job
+from jobs.retention import archive_old_jobs, purge_task_results
+from jobs.runner import JobCancelled, PipelineRunner
+from jobs.stats import record_job_completion
+
+# Errors of the pipeline configuration, which a retry would only repeat
+NON_RETRYABLE_ERRORS = (MappingError,)
 
 @shared_task(bind=True, max_retries=3)
 def execute_pipeline(self, pipeline_id, job_id=None):
@@ -45,6 +60,29 @@ def execute_pipeline(self, pipeline_id, job_id=None):
             status='pending'
         )
     
+    if job.status == 'cancelled':
+        return {
+            'status': 'cancelled',
+            'job_id': str(job.id)
+        }
+    
+    if job.profile_mode:
+        with profile_job(job):
+            return _run_pipeline(self, pipeline, job)
+    return _run_pipeline(self, pipeline, job)
+
+def _run_pipeline(task, pipeline, job):
+    """
+    Run the pipeline for the given job and record the outcome on it.
+    
+    Args:
+        task (Task): The bound Celery task, used for retries
+        pipeline (Pipeline): The pipeline to run
+        job (Job): The job tracking this execution
+    
+    Returns:
+        dict: Results of the job execution
+    """
     # Update job and pipeline status
     job.status = 'running'
     job.started_at = timezone.now()
@@ -57,86 +95,395 @@ def execute_pipeline(self, pipeline_id, job_id=None):
     job.add_log("Pipeline execution started")
     
     try:
-        # Get the source adapter
-        job.add_log("Initializing source adapter")
-        source_adapter = pipeline.get_source_adapter(job)
-        
-        # Get the destination adapter
-        job.add_log("Initializing destination adapter")
-        destination_adapter = pipeline.get_destination_adapter(job)
+        runner = PipelineRunner(pipeline, job)
         
-        # Fetch data from source
-        job.add_log("Fetching data from source")
-        source_data = source_adapter.fetch_data()
+        if pipeline.execution_config.get('mode') == 'partitioned':
+            partitions = runner.plan_partitions()
+            if partitions is not None:
+                return _dispatch_partitions(pipeline, job, partitions)
+            job.add_log("Source adapter does not support partitioning, running in a single task", level="warning")
         
-        if not source_data:
-            job.add_log("No data received from source", level="warning")
-            job.status = 'completed'
-            job.completed_at = timezone.now()
-            job.source_record_count = 0
-            job.destination_record_count = 0
-            job.save()
-            
+        if runner.staging:
+            # Hand the upload of the staged records over to the upload queue,
+            # recording its task ID first so a cancellation can revoke it
+            runner.extract()
+            upload_task_id = str(uuid.uuid4())
+            job.subtask_ids = [upload_task_id]
+            job.save(update_fields=['subtask_ids'])
+            upload_staged_job.apply_async(
+                args=(str(pipeline.id), str(job.id)),
+                task_id=upload_task_id,
+                priority=get_dispatch_options(pipeline)['priority']
+            )
             return {
-                'status': 'completed',
-                'message': 'No data to process'
+                'status': 'running',
+                'job_id': str(job.id),
+                'staged_count': job.source_record_count
             }
         
-        job.source_record_count = len(source_data)
-        job.save()
+        return _complete_job(pipeline, job, runner.run())
         
-        # Apply transformations if configured
-        if pipeline.transformation_config:
-            job.add_log("Applying data transformations")
-            # To be implemented - apply transformation rules
+    except JobCancelled:
+        return _cancel_job(job)
         
-        # Upload data to destination
-        job.add_log(f"Uploading {len(source_data)} records to destination")
-        upload_results = destination_adapter.upload_data(source_data)
+    except SoftTimeLimitExceeded as e:
+        return _fail_job(task, pipeline, job, e, retry=False)
         
-        # Update job status
-        job.destination_record_count = upload_results.get('success_count', 0)
-        job.error_count = upload_results.get('error_count', 0)
-        job.status = 'completed'
-        job.completed_at = timezone.now()
-        job.save()
-        
-        job.add_log(
-            f"Pipeline execution completed: {job.destination_record_count} records uploaded, "
-            f"{job.error_count} errors"
+    except Exception as e:
+        return _fail_job(task, pipeline, job, e)
+
+def _complete_job(pipeline, job, results):
+    """
+    Record the successful end of a job run.
+    """
+    job.flush_errors()
+    if not job.finish('completed'):
+        return _cancelled_result(job)
+    commit_fingerprints(job)
+    record_job_completion(job)
+    
+    job.add_log(
+        f"Pipeline execution completed: {job.destination_record_count} records uploaded, "
+        f"{job.skipped_record_count} unchanged records skipped, {job.error_count} errors"
+    )
+    
+    # Update pipeline status
+    pipeline.status = 'active'
+    pipeline.save()
+    
+    return {
+        'status': 'completed',
+        'job_id': str(job.id),
+        'source_count': results['source_count'],
+        'destination_count': results['destination_count'],
+        'skipped_count': results['skipped_count'],
+        'error_count': job.error_count,
+        'timings': results.get('timings', {})
+    }
+
+def _cancel_job(job):
+    """
+    Record that a job run stopped after its cancellation was requested.
+    """
+    job.flush_errors()
+    if job.finish('cancelled'):
+        record_job_completion(job)
+    return _cancelled_result(job)
+
+def _cancelled_result(job):
+    """
+    Build the result of a task whose job was cancelled.
+    """
+    return {
+        'status': 'cancelled',
+        'job_id': str(job.id),
+        'source_count': job.source_record_count,
+        'destination_count': job.destination_record_count
+    }
+
+def _fail_job(task, pipeline, job, exc, retry=True):
+    """
+    Record the failure of a job run and retry the task if appropriate.
+    
+    A run stopped by the soft time limit is failed without retrying: the
+    batches committed so far stay checkpointed, but another attempt would
+    get no more time than this one did.
+    """
+    job.flush_errors()
+    if not job.finish('failed'):
+        return _cancelled_result(job)
+    
+    if isinstance(exc, SoftTimeLimitExceeded):
+        error_message = "Pipeline execution failed: the task exceeded its time limit"
+    else:
+        error_message = f"Pipeline execution failed: {str(exc)}"
+    job.add_error(error_message)
+    record_job_completion(job)
+    
+    # Update pipeline status if this was a pipeline error
+    pipeline.status = 'error'
+    pipeline.save()
+    
+    # Retry the task if appropriate, resuming from the job's checkpoint
+    if retry and task.request.retries < task.max_retries and not isinstance(exc, NON_RETRYABLE_ERRORS):
+        raise task.retry(
+            args=(str(pipeline.id), str(job.id)),
+            exc=exc,
+            countdown=60 * (2 ** task.request.retries)
         )
         
-        # Update pipeline status
-        pipeline.status = 'active'
-        pipeline.save()
-        
+    return {
+        'status': 'failed',
+        'error': error_message,
+        'job_id': str(job.id)
+    }
+
+@shared_task(bind=True, max_retries=3)
+def upload_staged_job(self, pipeline_id, job_id):
+    """
+    Upload the staged records of a job to the pipeline's destination.
+    
+    Runs on the upload queue after the extraction task has staged the source;
+    a retry resumes the upload without fetching the source again.
+    
+    Args:
+        pipeline_id (str): UUID of the pipeline
+        job_id (str): UUID of the job whose records were staged
+    
+    Returns:
+        dict: Results of the job execution
+    """
+    try:
+        pipeline = Pipeline.objects.get(pk=pipeline_id)
+        job = Job.objects.get(pk=job_id)
+    except (Pipeline.DoesNotExist, Job.DoesNotExist):
         return {
-            'status': 'completed',
-            'job_id': str(job.id),
-            'source_count': job.source_record_count,
-            'destination_count': job.destination_record_count,
-            'error_count': job.error_count
+            'status': 'failed',
+            'error': f'Job {job_id} of pipeline {pipeline_id} does not exist'
         }
-        
+    
+    if job.status == 'cancelled':
+        return {
+            'status': 'cancelled',
+            'job_id': str(job.id)
+        }
+    
+    if job.profile_mode:
+        with profile_job(job):
+            return _upload_staged_job(self, pipeline, job)
+    return _upload_staged_job(self, pipeline, job)
+
+def _upload_staged_job(task, pipeline, job):
+    """
+    Upload the staged records of a job and record the outcome on it.
+    """
+    if job.status != 'running':
+        job.status = 'running'
+        job.save(update_fields=['status'])
+    
+    try:
+        return _complete_job(pipeline, job, PipelineRunner(pipeline, job).load())
+    except JobCancelled:
+        return _cancel_job(job)
+    except SoftTimeLimitExceeded as e:
+        return _fail_job(task, pipeline, job, e, retry=False)
     except Exception as e:
-        # Handle and log any exceptions
-        job.status = 'failed'
-        job.completed_at = timezone.now()
-        job.save()
-        
-        error_message = f"Pipeline execution failed: {str(e)}"
-        job.add_error(error_message)
-        
-        # Update pipeline status if this was a pipeline error
+        return _fail_job(task, pipeline, job, e)
+
+def _dispatch_partitions(pipeline, job, partitions):
+    """
+    Fan the partitions of a job out to separate tasks, with a chord callback
+    that finalizes the job once every partition has finished.
+    """
+    done = job.checkpoint.get('partitions', {})
+    pending = {
+        key: partition for key, partition in partitions.items()
+        if not done.get(key, {}).get('done')
+    }
+    job.add_log(f"Dispatching {len(pending)} of {len(partitions)} partitions")
+    
+    options = get_dispatch_options(pipeline)
+    header = [
+        execute_partition.s(str(pipeline.id), str(job.id), key, partition).set(task_id=str(uuid.uuid4()), **options)
+        for key, partition in pending.items()
+    ]
+    
+    # Record the partition task IDs first so a cancellation can revoke them
+    job.subtask_ids = [signature.id for signature in header]
+    job.save(update_fields=['subtask_ids'])
+    callback = finalize_partitioned_job.s(str(pipeline.id), str(job.id)).set(priority=options['priority'])
+    if header:
+        chord(header)(callback)
+    else:
+        callback.delay([])
+    
+    return {
+        'status': 'running',
+        'job_id': str(job.id),
+        'partitions': len(pending)
+    }
+
+@shared_task(bind=True, max_retries=3)
+def execute_partition(self, pipeline_id, job_id, partition_key, partition):
+    """
+    Process one partition of a fanned-out pipeline execution.
+    
+    Failures are retried from the partition's checkpoint and, once retries
+    are exhausted, reported as a result rather than raised, so that the
+    chord callback always runs.
+    
+    Returns:
+        dict: Outcome and record counters of the partition
+    """
+    pipeline = Pipeline.objects.get(pk=pipeline_id)
+    job = Job.objects.get(pk=job_id)
+    
+    if job.profile_mode:
+        with profile_job(job):
+            return _run_partition(self, pipeline, job, partition_key, partition)
+    return _run_partition(self, pipeline, job, partition_key, partition)
+
+def _run_partition(task, pipeline, job, partition_key, partition):
+    """
+    Run one partition of a job, reporting its outcome as a result.
+    """
+    try:
+        results = PipelineRunner(pipeline, job, partition_key=partition_key, partition=partition).run()
+    except JobCancelled:
+        return {'partition': partition_key, 'status': 'cancelled'}
+    except SoftTimeLimitExceeded:
+        job.flush_errors()
+        job.add_error(f"Partition {partition_key} failed: the task exceeded its time limit")
+        return {'partition': partition_key, 'status': 'failed', 'error': 'Time limit exceeded'}
+    except Exception as e:
+        job.flush_errors()
+        job.add_error(f"Partition {partition_key} failed: {str(e)}")
+        if task.request.retries < task.max_retries and not isinstance(e, NON_RETRYABLE_ERRORS):
+            raise task.retry(exc=e, countdown=60 * (2 ** task.request.retries))
+        return {'partition': partition_key, 'status': 'failed', 'error': str(e)}
+    
+    return {'partition': partition_key, 'status': 'completed', **results}
+
+@shared_task
+def finalize_partitioned_job(partition_results, pipeline_id, job_id):
+    """
+    Merge the outcome of all partitions into the parent job's status.
+    """
+    pipeline = Pipeline.objects.get(pk=pipeline_id)
+    job = Job.objects.get(pk=job_id)
+    
+    failed = [result['partition'] for result in partition_results if result['status'] == 'failed']
+    cancelled = any(result['status'] == 'cancelled' for result in partition_results)
+    if failed:
+        status = 'failed'
+    elif cancelled or job.is_cancel_requested():
+        status = 'cancelled'
+    else:
+        status = 'completed'
+    if not job.finish(status):
+        # Already cancelled and recorded by enforce_job_cancellation
+        return _cancelled_result(job)
+    
+    if job.status == 'cancelled':
+        job.add_log(
+            f"Pipeline execution cancelled: {job.source_record_count} records fetched, "
+            f"{job.destination_record_count} uploaded",
+            level='warning'
+        )
+    elif failed:
+        job.add_error(f"Pipeline execution failed: partitions {', '.join(failed)} did not complete")
         pipeline.status = 'error'
-        pipeline.save()
-        
-        # Retry the task if appropriate
-        if self.request.retries < self.max_retries:
-            raise self.retry(exc=e, countdown=60 * (2 ** self.request.retries))
-            
+    else:
+        commit_fingerprints(job)
+        job.add_log(
+            f"Pipeline execution completed: {job.destination_record_count} records uploaded, "
+            f"{job.skipped_record_count} unchanged records skipped, {job.error_count} errors"
+        )
+        pipeline.status = 'active'
+    pipeline.save()
+    record_job_completion(job)
+    
+    return {
+        'status': job.status,
+        'job_id': str(job.id),
+        'source_count': job.source_record_count,
+        'destination_count': job.destination_record_count,
+        'skipped_count': job.skipped_record_count,
+        'error_count': job.error_count
+    }
+
+@shared_task
+def enforce_job_cancellation(job_id):
+    """
+    Terminate a job that did not stop cooperatively within the drain deadline.
+    """
+    job = Job.objects.get(pk=job_id)
+    if job.status not in ['pending', 'running']:
+        return {'status': job.status, 'job_id': str(job.id)}
+    
+    revoke_job_tasks(job, terminate=True)
+    
+    if not job.finish('cancelled'):
+        return {'status': 'cancelled', 'job_id': str(job.id)}
+    job.add_log("Job did not stop within the cancellation deadline and was terminated", level='warning')
+    record_job_completion(job)
+    
+    return {'status': 'cancelled', 'job_id': str(job.id), 'terminated': True}
+
+@shared_task(bind=True, max_retries=None)
+def run_scheduled_pipeline(self, pipeline_id):
+    """
+    Start a scheduled run of a pipeline.
+    
+    When the previous run of the pipeline is still in progress, the run is
+    skipped or, with the "queue" overlap policy, deferred until it finishes.
+    Runs are also deferred while SCHEDULED_RUNS_MAX_CONCURRENT scheduled jobs
+    are in progress, so that schedules sharing the same time do not all hit
+    the workers and source systems at once.
+    
+    Pipelines that are not active are skipped, in case the beat scheduler
+    has not picked up that their periodic task was disabled yet.
+    
+    Args:
+        pipeline_id (str): UUID of the pipeline to run
+    
+    Returns:
+        dict: Outcome of the scheduling decision
+    """
+    try:
+        pipeline = Pipeline.objects.get(pk=pipeline_id)
+    except Pipeline.DoesNotExist:
         return {
             'status': 'failed',
-            'error': error_message,
-            'job_id': str(job.id)
+            'error': f'Pipeline with ID {pipeline_id} does not exist'
         }
+    
+    if pipeline.status != 'active':
+        return {
+            'status': 'skipped',
+            'message': f'Pipeline is {pipeline.status}'
+        }
+    
+    overlap_policy = pipeline.execution_config.get('schedule_overlap', settings.PIPELINE_SCHEDULE_OVERLAP_POLICY)
+    defer_countdown = settings.SCHEDULED_RUNS_DEFER_DELAY + random.randint(0, settings.SCHEDULED_RUNS_DEFER_DELAY)
+    
+    with cache_lock(f"pipeline-run:{pipeline.id}") as acquired:
+        in_progress = not acquired or pipeline.jobs.filter(status__in=['pending', 'running']).exists()
+        if in_progress:
+            if overlap_policy == 'queue':
+                raise self.retry(countdown=defer_countdown)
+            return {
+                'status': 'skipped',
+                'message': 'Previous run is still in progress'
+            }
+        
+        scheduled_runs = Job.objects.filter(trigger='scheduled', status__in=['pending', 'running']).count()
+        if scheduled_runs >= settings.SCHEDULED_RUNS_MAX_CONCURRENT:
+            raise self.retry(countdown=defer_countdown)
+        
+        job = Job.objects.create(
+            pipeline=pipeline,
+            status='pending',
+            task_id=str(uuid.uuid4()),
+            trigger='scheduled'
+        )
+        dispatch_job(job)
+    
+    return {
+        'status': 'dispatched',
+        'job_id': str(job.id),
+        'task_id': job.task_id
+    }
+
+@shared_task
+def compact_job_history():
+    """
+    Archive the logs and errors of old jobs and purge stale task results.
+    
+    Returns:
+        dict: Number of jobs archived and task results deleted
+    """
+    return {
+        'archived_jobs': archive_old_jobs(),
+        'deleted_task_results': purge_task_results()
+    }
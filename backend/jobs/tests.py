@@ -0,0 +1,606 @@
+import pstats
+from datetime import timedelta
+
+import pytest
+from celery.exceptions import Retry, SoftTimeLimitExceeded
+from django.urls import reverse
+from django.utils import timezone
+
+from common.records import RecordBatch
+from destinations.adapters.jira_schema import MappingError
+from . import retention, tasks
+from .models import Job
+from .profiling import get_profile_artifacts, profile_job
+from .fingerprints import commit_fingerprints
+from .runner import JobCancelled, PipelineRunner
+from .staging import StagingStore
+from .transformations import compile_transformations
+
+pytestmark = pytest.mark.django_db
+
+# Job endpoints join the pipeline in and load the JSON columns only where they
+# are returned, so the number of queries does not grow with the number of jobs
+
+def test_list_query_count(api_client, pipelines, django_assert_num_queries):
+    # One page of jobs; cursor pagination needs no count query
+    with django_assert_num_queries(1):
+        response = api_client.get(reverse('job-list'))
+    
+    assert response.status_code == 200
+    assert len(response.data['results']) == 10
+    assert response.data['next']
+    assert 'logs' not in response.data['results'][0]
+
+def test_detail_query_count(api_client, pipelines, django_assert_num_queries):
+    job = Job.objects.filter(pipeline=pipelines[0]).first()
+    
+    # Versions of the job and its pipeline, then the job with its pipeline
+    with django_assert_num_queries(2):
+        response = api_client.get(reverse('job-detail', args=[job.id]))
+    
+    assert response.status_code == 200
+    assert response.data['pipeline_name'] == pipelines[0].name
+    assert len(response.data['logs']) == 20
+
+def test_logs_query_count(api_client, pipelines, django_assert_num_queries):
+    job = Job.objects.filter(pipeline=pipelines[0]).first()
+    
+    # Job without its JSON columns, then the logs column alone
+    with django_assert_num_queries(2):
+        response = api_client.get(reverse('job-logs', args=[job.id]), {'offset': -5})
+    
+    assert response.status_code == 200
+    assert response.data['count'] == 20
+    assert [entry['message'] for entry in response.data['results']] == [f"Log {line}" for line in range(15, 20)]
+
+def test_finish_keeps_cancelled_status(pipelines):
+    job = Job.objects.filter(pipeline=pipelines[0]).first()
+    Job.objects.filter(pk=job.pk).update(status='cancelled')
+    
+    # The task of a job cancelled while it was running must not complete it
+    assert not job.finish('completed')
+    assert job.status == 'cancelled'
+    assert Job.objects.get(pk=job.pk).status == 'cancelled'
+
+def test_cancel_pending_job(api_client, pipelines, monkeypatch):
+    monkeypatch.setattr('jobs.views.revoke_job_tasks', lambda job: None)
+    job = Job.objects.filter(pipeline=pipelines[0]).first()
+    Job.objects.filter(pk=job.pk).update(status='pending', completed_at=None)
+    
+    response = api_client.post(reverse('job-cancel', args=[job.id]))
+    
+    job.refresh_from_db()
+    assert response.status_code == 200
+    assert job.status == 'cancelled'
+    assert job.completed_at == job.cancel_requested_at
+
+def test_cancel_job_started_by_a_worker_meanwhile(api_client, pipelines, monkeypatch):
+    job = Job.objects.filter(pipeline=pipelines[0]).first()
+    Job.objects.filter(pk=job.pk).update(status='pending', completed_at=None)
+    
+    # A worker starts the job while the view revokes its task
+    def revoke_job_tasks(loaded_job):
+        Job.objects.filter(pk=job.pk).update(status='running', source_record_count=50)
+    
+    monkeypatch.setattr('jobs.views.revoke_job_tasks', revoke_job_tasks)
+    scheduled = []
+    monkeypatch.setattr(tasks.enforce_job_cancellation, 'apply_async', lambda *args, **kwargs: scheduled.append(args))
+    
+    response = api_client.post(reverse('job-cancel', args=[job.id]))
+    
+    job.refresh_from_db()
+    assert response.status_code == 202
+    assert (job.status, job.source_record_count) == ('running', 50)
+    assert job.cancel_requested_at is not None
+    assert scheduled == [((str(job.id),),)]
+
+def test_archive_old_jobs_skips_failures(pipelines, settings, tmp_path, monkeypatch):
+    settings.STORAGES = {**settings.STORAGES, 'job_archive': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+        'OPTIONS': {'location': str(tmp_path)},
+    }}
+    Job.objects.update(completed_at=timezone.now() - timedelta(days=settings.JOB_LOG_RETENTION_DAYS + 1))
+    broken = Job.objects.filter(pipeline=pipelines[0]).first()
+    
+    def archive_job(job):
+        if job.pk == broken.pk:
+            raise OSError("Archive storage is unavailable")
+        original_archive_job(job)
+    
+    original_archive_job = retention.archive_job
+    monkeypatch.setattr(retention, 'archive_job', archive_job)
+    
+    assert retention.archive_old_jobs(batch_size=5) == Job.objects.count() - 1
+    assert not Job.objects.get(pk=broken.pk).archived_at
+    
+    job = Job.objects.exclude(pk=broken.pk).first()
+    archive_path = job.archive_path
+    retention.restore_job(job)
+    assert len(Job.objects.get(pk=job.pk).logs) == 20
+    assert not (tmp_path / archive_path).exists()
+
+def test_logs_of_an_archived_job_include_later_entries(api_client, pipelines, settings, tmp_path):
+    settings.STORAGES = {**settings.STORAGES, 'job_archive': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+        'OPTIONS': {'location': str(tmp_path)},
+    }}
+    job = Job.objects.filter(pipeline=pipelines[0]).first()
+    retention.archive_job(job)
+    job.refresh_from_db()
+    job.add_log("Logged after archiving")
+    
+    response = api_client.get(reverse('job-logs', args=[job.id]), {'offset': -2})
+    
+    assert response.data['count'] == 21
+    assert [entry['message'] for entry in response.data['results']] == ["Log 19", "Logged after archiving"]
+
+@pytest.mark.parametrize('ordering', ['-started_at', 'completed_at', 'created_at'])
+def test_list_cursor_pages_every_job_once(api_client, pipelines, ordering):
+    # Pending jobs have no start or completion time
+    Job.objects.bulk_create([Job(pipeline=pipelines[1], status='pending') for _ in range(3)])
+    
+    seen = []
+    url = f"{reverse('job-list')}?page_size=4&ordering={ordering}"
+    while url:
+        response = api_client.get(url)
+        assert response.status_code == 200
+        seen += [job['id'] for job in response.data['results']]
+        url = response.data['next']
+    
+    assert sorted(seen) == sorted(str(pk) for pk in Job.objects.values_list('pk', flat=True))
+
+class ListSource:
+    """
+    Source adapter stub serving batches of records, the cursor being the
+    number of batches served.
+    """
+    
+    def __init__(self, batches):
+        self.batches = batches
+    
+    def fetch_batches(self, cursor, batch_size, partition=None):
+        for index in range(cursor or 0, len(self.batches)):
+            yield self.batches[index], index + 1
+
+class RecordingDestination:
+    """
+    Destination adapter stub recording the uploaded IDs, which can request
+    the job's cancellation after a number of uploads.
+    """
+    
+    def __init__(self, job, cancel_after=None):
+        self.job = job
+        self.cancel_after = cancel_after
+        self.uploaded = []
+    
+    def upload_data(self, records):
+        ids = [record['id'] for record in records]
+        self.uploaded += ids
+        if self.cancel_after is not None and len(self.uploaded) >= self.cancel_after:
+            self.job.cancel_requested_at = timezone.now()
+        return {'success_count': len(ids), 'created_issues': [{'source_id': source_id} for source_id in ids]}
+    
+    def get_uploaded_ids(self, results):
+        return [created['source_id'] for created in results['created_issues']]
+    
+    def close(self):
+        pass
+
+def test_checkpoint_keeps_uploaded_ids_of_the_batch_in_flight_only(pipelines, monkeypatch):
+    job = Job.objects.filter(pipeline=pipelines[0]).first()
+    job.checkpoint = {}
+    source = ListSource([[{'id': f"{index}-{row}"} for row in range(3)] for index in range(4)])
+    destination = RecordingDestination(job)
+    monkeypatch.setattr(PipelineRunner, 'get_source_adapter', lambda runner: source)
+    monkeypatch.setattr(PipelineRunner, 'get_destination_adapter', lambda runner: destination)
+    
+    results = PipelineRunner(pipelines[0], job, batch_size=3).run()
+    
+    assert results['destination_count'] == 12
+    assert job.checkpoint['completed_batches'] == 4
+    assert job.checkpoint['uploaded_ids'] == []
+
+def test_resume_skips_ids_uploaded_before_cancellation(pipelines, monkeypatch):
+    job = Job.objects.filter(pipeline=pipelines[0]).first()
+    job.checkpoint = {}
+    source = ListSource([[{'id': f"{index}-{row}"} for row in range(3)] for index in range(3)])
+    monkeypatch.setattr(PipelineRunner, 'get_source_adapter', lambda runner: source)
+    
+    # Cancelled right after the second batch was uploaded, before it was committed
+    destination = RecordingDestination(job, cancel_after=6)
+    monkeypatch.setattr(PipelineRunner, 'get_destination_adapter', lambda runner: destination)
+    with pytest.raises(JobCancelled):
+        PipelineRunner(pipelines[0], job, batch_size=3).run()
+    assert job.checkpoint['completed_batches'] == 1
+    assert job.checkpoint['uploaded_ids'] == ['1-0', '1-1', '1-2']
+    
+    job.cancel_requested_at = None
+    resumed = RecordingDestination(job)
+    monkeypatch.setattr(PipelineRunner, 'get_destination_adapter', lambda runner: resumed)
+    results = PipelineRunner(pipelines[0], job, batch_size=3).run()
+    
+    assert resumed.uploaded == ['2-0', '2-1', '2-2']
+    assert results['destination_count'] == 9
+
+class FailingChangeDetector:
+    """
+    Change detector stub that fails to record the hashes of a batch, after
+    the destination uploaded it.
+    """
+    
+    def __init__(self, fail_on_batch):
+        self.fail_on_batch = fail_on_batch
+        self.recorded_batches = 0
+    
+    def filter(self, records):
+        return records, {}
+    
+    def record(self, source_ids, hashes):
+        self.recorded_batches += 1
+        if self.recorded_batches == self.fail_on_batch:
+            raise OSError("Fingerprint store is unavailable")
+
+def test_resume_skips_ids_uploaded_before_a_failure(pipelines, monkeypatch):
+    job = Job.objects.filter(pipeline=pipelines[0]).first()
+    job.checkpoint = {}
+    source = ListSource([[{'id': f"{index}-{row}"} for row in range(3)] for index in range(3)])
+    monkeypatch.setattr(PipelineRunner, 'get_source_adapter', lambda runner: source)
+    
+    destination = RecordingDestination(job)
+    monkeypatch.setattr(PipelineRunner, 'get_destination_adapter', lambda runner: destination)
+    runner = PipelineRunner(pipelines[0], job, batch_size=3)
+    runner.change_detector = FailingChangeDetector(fail_on_batch=2)
+    with pytest.raises(OSError):
+        runner.run()
+    assert job.checkpoint['completed_batches'] == 1
+    assert job.checkpoint['uploaded_ids'] == ['1-0', '1-1', '1-2']
+    
+    resumed = RecordingDestination(job)
+    monkeypatch.setattr(PipelineRunner, 'get_destination_adapter', lambda runner: resumed)
+    results = PipelineRunner(pipelines[0], job, batch_size=3).run()
+    
+    assert resumed.uploaded == ['2-0', '2-1', '2-2']
+    assert results['destination_count'] == 9
+
+def test_staging_store_scans_partitions_from_a_position(pipelines, settings, tmp_path):
+    settings.JOB_ARTIFACTS_DIR = str(tmp_path)
+    store = StagingStore(Job.objects.filter(pipeline=pipelines[0]).first())
+    store.write([{'id': number, 'name': f"Test {number}"} for number in range(5)], partition='0')
+    store.write([{'id': 9, 'name': 'Other partition'}], partition='1')
+    # Fetched again on resume: replaced in place
+    store.write([{'id': 1, 'name': 'Test 1, refetched'}], partition='0')
+    
+    scanned = list(store.scan(batch_size=2, partition='0'))
+    assert [[record['id'] for record in batch] for batch, _ in scanned] == [[0, 1], [2, 3], [4]]
+    assert scanned[0][0].to_records()[1] == {'id': 1, 'name': 'Test 1, refetched'}
+    
+    resumed = list(store.scan(after=scanned[0][1], batch_size=10, partition='0'))
+    assert [[record['id'] for record in batch] for batch, _ in resumed] == [[2, 3, 4]]
+    assert (store.count(), store.count('1')) == (6, 1)
+    assert store.get(9) == {'id': 9, 'name': 'Other partition'}
+    
+    store.delete()
+    assert not store.exists()
+
+def test_staged_upload_resumes_after_the_last_committed_position(pipelines, settings, tmp_path, monkeypatch):
+    settings.JOB_ARTIFACTS_DIR = str(tmp_path)
+    pipeline = pipelines[0]
+    pipeline.execution_config = {'staging': True}
+    job = Job.objects.filter(pipeline=pipeline).first()
+    job.checkpoint = {}
+    source = ListSource([[{'id': f"{index}-{row}"} for row in range(3)] for index in range(3)])
+    monkeypatch.setattr(PipelineRunner, 'get_source_adapter', lambda runner: source)
+    
+    # Cancelled while uploading the second staged batch
+    destination = RecordingDestination(job, cancel_after=5)
+    monkeypatch.setattr(PipelineRunner, 'get_destination_adapter', lambda runner: destination)
+    with pytest.raises(JobCancelled):
+        PipelineRunner(pipeline, job, batch_size=3).run()
+    assert job.checkpoint['staged'] and job.checkpoint['completed_batches'] == 1
+    
+    job.cancel_requested_at = None
+    resumed = RecordingDestination(job)
+    monkeypatch.setattr(PipelineRunner, 'get_destination_adapter', lambda runner: resumed)
+    monkeypatch.setattr(PipelineRunner, 'get_source_adapter', lambda runner: pytest.fail("The source is fetched again"))
+    results = PipelineRunner(pipeline, job, batch_size=3).run()
+    
+    assert resumed.uploaded == ['2-0', '2-1', '2-2']
+    assert results['destination_count'] == 9
+
+def test_change_detection_skips_records_unchanged_since_the_last_completed_run(pipelines, monkeypatch):
+    pipeline = pipelines[0]
+    pipeline.execution_config = {'change_detection': True}
+    first_job, failed_job, next_job = Job.objects.filter(pipeline=pipeline)[:3]
+    
+    def run(job, records):
+        job.checkpoint = {}
+        destination = RecordingDestination(job)
+        monkeypatch.setattr(PipelineRunner, 'get_source_adapter', lambda runner: ListSource([records]))
+        monkeypatch.setattr(PipelineRunner, 'get_destination_adapter', lambda runner: destination)
+        results = PipelineRunner(pipeline, job).run()
+        return destination.uploaded, results['skipped_count']
+    
+    records = [{'id': number, 'name': f"Test {number}", 'steps': [{'step': 1}]} for number in range(4)]
+    assert run(first_job, records) == ([0, 1, 2, 3], 0)
+    commit_fingerprints(first_job)
+    
+    # Not committed, as the job did not complete
+    assert run(failed_job, [{**records[0], 'name': 'Renamed'}]) == ([0], 0)
+    
+    changed = [dict(record) for record in records]
+    changed[0]['name'] = 'Renamed'
+    changed[1]['name'] = 'Test 1 '
+    changed[2]['steps'] = [{'step': 2}]
+    changed[3]['owner'] = ''
+    assert run(next_job, changed) == ([0, 2], 2)
+
+def test_errors_are_grouped_by_signature(pipelines, settings):
+    settings.JOB_ERROR_FLUSH_INTERVAL = 3600
+    settings.JOB_ERROR_SAMPLE_SIZE = 2
+    job = Job.objects.filter(pipeline=pipelines[0]).first()
+    Job.objects.filter(pk=job.pk).update(errors=[], error_count=0)
+    job.refresh_from_db()
+    
+    for item_id in ['TC-1', 'TC-2', 'TC-3']:
+        job.report_error(f"Failed to create issue for item {item_id[-1]}", {
+            'status_code': 400,
+            'response': f'{{"errors": {{"summary": "Value \'{item_id}\' is too long"}}}}',
+            'item_id': item_id
+        })
+    job.report_error("Failed to create issue for item 4", {'status_code': 500, 'response': 'Server error', 'item_id': 'TC-4'})
+    # Written on flush only
+    assert Job.objects.get(pk=job.pk).errors == []
+    
+    job.flush_errors()
+    job.report_error("Failed to create issue for item 5", {'status_code': 500, 'response': 'Server error', 'item_id': 'TC-5'})
+    job.flush_errors()
+    
+    job.refresh_from_db()
+    assert [(entry['count'], entry['item_ids']) for entry in job.errors] == [(3, ['TC-1', 'TC-2']), (2, ['TC-4', 'TC-5'])]
+    assert 'item_id' not in job.errors[0]['details']
+    assert job.error_count == 5
+
+def test_mapping_errors_are_not_retried(pipelines):
+    job = Job.objects.filter(pipeline=pipelines[0]).first()
+    Job.objects.filter(pk=job.pk).update(status='running')
+    job.refresh_from_db()
+    
+    class Task:
+        max_retries = 3
+        request = type('Request', (), {'retries': 0})
+        
+        def retry(self, **options):
+            raise AssertionError("A mapping error must not be retried")
+    
+    result = tasks._fail_job(Task(), pipelines[0], job, MappingError("Required Jira fields are not mapped: Summary"))
+    
+    assert result['status'] == 'failed'
+    assert Job.objects.get(pk=job.pk).status == 'failed'
+
+def test_soft_time_limit_fails_the_job_without_retrying(pipelines, monkeypatch):
+    job = Job.objects.filter(pipeline=pipelines[0]).first()
+    job.checkpoint = {}
+    source = ListSource([[{'id': f"{index}-{row}"} for row in range(3)] for index in range(3)])
+    destination = RecordingDestination(job)
+    
+    def upload_data(records):
+        if len(destination.uploaded) >= 3:
+            raise SoftTimeLimitExceeded()
+        return RecordingDestination.upload_data(destination, records)
+    
+    destination.upload_data = upload_data
+    monkeypatch.setattr(PipelineRunner, 'get_source_adapter', lambda runner: source)
+    monkeypatch.setattr(PipelineRunner, 'get_destination_adapter', lambda runner: destination)
+    
+    class Task:
+        max_retries = 3
+        request = type('Request', (), {'retries': 0})
+        
+        def retry(self, **options):
+            raise AssertionError("A timed out run must not be retried")
+    
+    result = tasks._run_pipeline(Task(), pipelines[0], job)
+    
+    job.refresh_from_db()
+    assert result['status'] == 'failed'
+    assert job.status == 'failed'
+    assert job.completed_at is not None
+    assert job.checkpoint['completed_batches'] == 1
+    assert job.destination_record_count == 3
+
+@pytest.fixture
+def dispatched(monkeypatch):
+    jobs = []
+    monkeypatch.setattr(tasks, 'dispatch_job', jobs.append)
+    return jobs
+
+def test_scheduled_run_skips_inactive_pipelines(pipelines, dispatched):
+    pipelines[0].status = 'inactive'
+    pipelines[0].save()
+    
+    result = tasks.run_scheduled_pipeline(str(pipelines[0].id))
+    
+    assert result['status'] == 'skipped'
+    assert not dispatched
+
+def test_scheduled_run_dispatches_a_job(pipelines, dispatched):
+    result = tasks.run_scheduled_pipeline(str(pipelines[0].id))
+    
+    assert result['status'] == 'dispatched'
+    assert [job.trigger for job in dispatched] == ['scheduled']
+
+@pytest.mark.parametrize('overlap_policy', ['skip', 'queue'])
+def test_scheduled_run_overlapping_the_previous_run(pipelines, dispatched, overlap_policy):
+    pipelines[0].execution_config = {'schedule_overlap': overlap_policy}
+    pipelines[0].save()
+    Job.objects.filter(pk=pipelines[0].jobs.first().pk).update(status='running')
+    
+    if overlap_policy == 'queue':
+        with pytest.raises(Retry):
+            tasks.run_scheduled_pipeline(str(pipelines[0].id))
+    else:
+        assert tasks.run_scheduled_pipeline(str(pipelines[0].id))['status'] == 'skipped'
+    assert not dispatched
+
+def test_profiles_of_the_tasks_of_a_job_are_merged(pipelines, settings, tmp_path):
+    settings.JOB_ARTIFACTS_DIR = str(tmp_path)
+    job = Job.objects.filter(pipeline=pipelines[0]).first()
+    job.profile_mode = 'deterministic'
+    
+    def partition_work():
+        return sum(range(1000))
+    
+    # Two partitions of the job, each profiled by its own task
+    for _ in range(2):
+        with profile_job(job):
+            partition_work()
+    
+    artifacts = get_profile_artifacts(job)
+    calls = [
+        primitive_calls for (_, _, name), (primitive_calls, *_) in pstats.Stats(artifacts['pstats']).stats.items()
+        if name == 'partition_work'
+    ]
+    assert calls == [2]
+    assert set(artifacts) == {'pstats', 'collapsed'}
+
+def transform(records, *steps, **config):
+    return compile_transformations({'transformations': list(steps), **config}).apply(records)
+
+def test_rename_and_drop_steps():
+    records = [{'id': 1, 'Name': 'Login', 'Owner': 'ana', 'Notes': 'x'}, {'id': 2, 'Owner': 'bo'}]
+    
+    assert transform(
+        records,
+        {'type': 'rename', 'source': 'Owner', 'target': 'assignee'},
+        {'type': 'drop', 'fields': ['Notes', 'Unknown']},
+        field_mapping={'Name': 'summary'}
+    ) == [{'id': 1, 'summary': 'Login', 'assignee': 'ana'}, {'id': 2, 'assignee': 'bo'}]
+    assert records[0]['Name'] == 'Login'
+
+def test_map_step():
+    records = [{'status': 'Ready'}, {'status': 'Draft'}, {'status': ['unhashable']}, {}]
+    
+    assert transform(records, {'type': 'map', 'field': 'status', 'values': {'Ready': 'Open'}}) == [
+        {'status': 'Open'}, {'status': 'Draft'}, {'status': ['unhashable']}, {'status': None}
+    ]
+    assert transform(records[:2], {'type': 'map', 'field': 'status', 'values': {'Ready': 'Open'}, 'default': 'Other'}) == [
+        {'status': 'Open'}, {'status': 'Other'}
+    ]
+
+def test_concat_and_compute_steps():
+    records = [{'first': 'Ana', 'last': 'Lee', 'id': 7}, {'first': 'Bo', 'last': ''}]
+    
+    assert transform(
+        records,
+        {'type': 'concat', 'fields': ['first', 'last'], 'target': 'name', 'separator': ', '},
+        {'type': 'compute', 'template': 'TC-{id}: {first}', 'target': 'key'}
+    ) == [
+        {'first': 'Ana', 'last': 'Lee', 'id': 7, 'name': 'Ana, Lee', 'key': 'TC-7: Ana'},
+        {'first': 'Bo', 'last': '', 'name': 'Bo', 'key': 'TC-: Bo'},
+    ]
+
+@pytest.mark.parametrize('step, expected', [
+    ({'type': 'extract', 'field': 'title', 'pattern': r'\[(\w+)\]', 'target': 'tag'}, ['UI', None, None]),
+    ({'type': 'extract', 'field': 'title', 'pattern': r'\[(?P<tag>\w+)\]', 'group': 'tag', 'target': 'tag'}, ['UI', None, None]),
+    ({'type': 'extract', 'field': 'title', 'pattern': r'\d+', 'target': 'tag'}, [None, '42', None]),
+])
+def test_extract_step(step, expected):
+    records = [{'title': '[UI] Login'}, {'title': 'Issue 42'}, {'title': None}]
+    
+    assert [record['tag'] for record in transform(records, step)] == expected
+
+@pytest.mark.parametrize('to, values, expected', [
+    ('string', [1, None], ['1', None]),
+    ('integer', ['3', '2.5', 'x', None], [3, 2, None, None]),
+    ('float', ['2.5', 'x'], [2.5, None]),
+    ('boolean', ['Yes', 'off', 0, 1], [True, False, False, True]),
+    ('upper', ['abc', None], ['ABC', '']),
+    ('lower', ['ABC'], ['abc']),
+    ('strip', ['  a  '], ['a']),
+])
+def test_convert_step(to, values, expected):
+    records = [{'value': value} for value in values] + [{}]
+    
+    transformed = transform(records, {'type': 'convert', 'field': 'value', 'to': to})
+    
+    assert [record.get('value', 'missing') for record in transformed] == expected + ['missing']
+
+@pytest.mark.parametrize('op, value, expected', [
+    ('eq', 'Ready', [1]),
+    ('ne', 'Ready', [2, 3, 4]),
+    ('in', ['Ready', 'Draft'], [1, 2]),
+    ('not_in', ['Ready', 'Draft'], [3, 4]),
+    ('contains', 'ead', [1]),
+    ('matches', r'^D', [2, 3]),
+    ('exists', None, [1, 2, 3]),
+    ('missing', None, [4]),
+])
+def test_filter_step(op, value, expected):
+    records = [{'id': 1, 'status': 'Ready'}, {'id': 2, 'status': 'Draft'}, {'id': 3, 'status': 'Done'}, {'id': 4, 'status': ''}]
+    
+    transformed = transform(records, {'type': 'filter', 'field': 'status', 'op': op, 'value': value})
+    
+    assert [record['id'] for record in transformed] == expected
+
+@pytest.mark.parametrize('op, expected', [('gt', [3]), ('ge', [2, 3]), ('lt', [1]), ('le', [1, 2])])
+def test_numeric_filter_step(op, expected):
+    records = [{'id': 1, 'estimate': '1'}, {'id': 2, 'estimate': 2}, {'id': 3, 'estimate': 3.5}, {'id': 4, 'estimate': 'n/a'}]
+    
+    transformed = transform(records, {'type': 'filter', 'field': 'estimate', 'op': op, 'value': '2'})
+    
+    assert [record['id'] for record in transformed] == expected
+
+def test_record_batches_keep_their_type():
+    batch = RecordBatch.from_records([{'id': 1, 'Name': 'Login', 'Notes': 'x'}, {'id': 2, 'Name': 'Logout'}])
+    
+    # Leading renames and drops only change the schema
+    renamed = transform(batch, {'type': 'drop', 'fields': ['Notes']}, field_mapping={'Name': 'summary'})
+    assert renamed.schema == ('id', 'summary')
+    
+    filtered = transform(batch, {'type': 'filter', 'field': 'Name', 'op': 'eq', 'value': 'Logout'}, field_mapping={'Name': 'summary'})
+    assert isinstance(filtered, RecordBatch)
+    assert filtered.to_records() == []
+    assert transform(batch, {'type': 'filter', 'field': 'summary', 'op': 'eq', 'value': 'Logout'}, field_mapping={'Name': 'summary'}).to_records() == [
+        {'id': 2, 'summary': 'Logout'}
+    ]
+
+def test_empty_configuration_compiles_to_nothing():
+    assert compile_transformations({}) is None
+    assert compile_transformations({'field_mapping': {}, 'transformations': []}) is None
+
+@pytest.mark.parametrize('config, message', [
+    (['drop'], 'must be an object'),
+    ({'field_mapping': ['Name']}, 'field_mapping must be an object'),
+    ({'transformations': {'type': 'drop'}}, 'transformations must be a list'),
+    ({'transformations': ['drop']}, 'Transformation 0 must be an object'),
+    ({'transformations': [{'type': 'explode'}]}, 'unknown type'),
+    ({'transformations': [{'type': 'map', 'field': 'status'}]}, "missing the 'values' option"),
+    ({'transformations': [{'type': 'concat', 'fields': [], 'target': 'name'}]}, 'fields must not be empty'),
+    ({'transformations': [{'type': 'extract', 'field': 'title', 'pattern': '('}]}, 'invalid'),
+    ({'transformations': [{'type': 'extract', 'field': 'title', 'pattern': '(a)', 'group': 2}]}, 'no group 2'),
+    ({'transformations': [{'type': 'extract', 'field': 'title', 'pattern': '(a)', 'group': 'tag'}]}, "no group named 'tag'"),
+    ({'transformations': [{'type': 'convert', 'field': 'id', 'to': 'date'}]}, 'Unknown conversion'),
+    ({'transformations': [{'type': 'filter', 'field': 'id', 'op': 'like'}]}, 'Unknown filter operator'),
+    ({'transformations': [{'type': 'filter', 'field': 'id', 'op': 'gt', 'value': 'high'}]}, 'invalid'),
+    ({'field_mapping': {'Name': 'summary'}, 'transformations': [{'type': 'explode'}]}, 'Transformation 1'),
+])
+def test_invalid_configurations_are_rejected(config, message):
+    with pytest.raises(ValueError, match=message):
+        compile_transformations(config)
+
+def test_untrusted_names_and_constants_are_data():
+    payload = "x'] = 1; __import__('os').system('exit'); r['"
+    plan = compile_transformations({
+        'field_mapping': {payload: 'summary'},
+        'transformations': [
+            {'type': 'compute', 'template': '{summary} """ {id}', 'target': payload},
+            {'type': 'map', 'field': 'summary', 'values': {'a': payload}},
+            {'type': 'filter', 'field': 'summary', 'op': 'eq', 'value': payload},
+        ]
+    })
+    
+    # Names and constants are bound to variables of the generated function
+    assert payload not in plan.source and '"""' not in plan.source
+    assert plan.apply([{'id': 1, payload: 'a'}, {'id': 2, payload: 'b'}]) == [
+        {'id': 1, 'summary': payload, payload: 'a """ 1'}
+    ]
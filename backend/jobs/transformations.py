@@ -0,0 +1,287 @@
+import operator
+import re
+
+from common.records import RecordBatch
+
+# Conversions of the "convert" step; values that cannot be converted become None
+def _to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        try:
+            return int(float(value))
+        except (TypeError, ValueError):
+            return None
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+def _to_bool(value):
+    if isinstance(value, str):
+        return value.strip().lower() in ('1', 'true', 'yes', 'y', 'on')
+    return bool(value)
+
+def _text(value):
+    return '' if value is None else str(value)
+
+CONVERSIONS = {
+    'string': lambda value: None if value is None else str(value),
+    'integer': _to_int,
+    'float': _to_float,
+    'boolean': _to_bool,
+    'upper': lambda value: _text(value).upper(),
+    'lower': lambda value: _text(value).lower(),
+    'strip': lambda value: _text(value).strip(),
+}
+
+NUMERIC_OPERATORS = {
+    'gt': operator.gt,
+    'ge': operator.ge,
+    'lt': operator.lt,
+    'le': operator.le,
+}
+
+FILTER_OPERATORS = ['eq', 'ne', 'in', 'not_in', 'contains', 'matches', 'exists', 'missing', *NUMERIC_OPERATORS]
+
+TEMPLATE_FIELD = re.compile(r'\{([^{}]+)\}')
+
+def _join(separator, values):
+    return separator.join(str(value) for value in values if value is not None and value != '')
+
+def _compare(value, compare, target):
+    value = _to_float(value)
+    return value is not None and compare(value, target)
+
+class TransformationPlan:
+    """
+    A pipeline's transformation_config compiled into a single function.
+
+    Compilation validates the configuration once and generates Python code
+    in which every step is specialised for its fields and options; the
+    generated function then transforms a whole batch in one loop, without
+    looking at the configuration again for each record.
+
+    Records are copied, so the source batch is left untouched. The "id" field
+    should be kept, since uploaded records are tracked by it.
+
+    For a RecordBatch, leading rename and drop steps only change the batch
+    schema, and the remaining steps run over the batch's record views.
+    """
+
+    def __init__(self, config):
+        """
+        Args:
+            config (dict): The pipeline's transformation_config
+
+        Raises:
+            ValueError: If the configuration is invalid
+        """
+        if not isinstance(config, dict):
+            raise ValueError("Transformation config must be an object")
+
+        field_mapping = config.get('field_mapping') or {}
+        transformations = config.get('transformations') or []
+        if not isinstance(field_mapping, dict):
+            raise ValueError("field_mapping must be an object")
+        if not isinstance(transformations, list):
+            raise ValueError("transformations must be a list")
+
+        # The field mapping is a shorthand for leading rename steps
+        self.steps = [
+            {'type': 'rename', 'source': source, 'target': target}
+            for source, target in field_mapping.items()
+        ] + transformations
+
+        self._constants = {}
+        self._step_lines = []
+        for index, step in enumerate(self.steps):
+            if not isinstance(step, dict):
+                raise ValueError(f"Transformation {index} must be an object")
+            compile_step = getattr(self, f"_compile_{step.get('type')}", None)
+            if compile_step is None:
+                raise ValueError(f"Transformation {index} has an unknown type: {step.get('type')!r}")
+            try:
+                self._step_lines.append(compile_step(step))
+            except KeyError as e:
+                raise ValueError(f"Transformation {index} ({step['type']}) is missing the {e} option")
+            except (TypeError, ValueError, re.error) as e:
+                raise ValueError(f"Transformation {index} ({step['type']}) is invalid: {e}")
+
+        self._functions = {}
+        self._transform = self._get_function(0)
+        self.source = self._functions[0][1]
+
+    def __len__(self):
+        return len(self.steps)
+
+    def apply(self, records):
+        """
+        Transform a batch of records.
+
+        Args:
+            records (list or RecordBatch): Records to transform
+
+        Returns:
+            list or RecordBatch: The transformed records, in the type they
+                                 were given, without those dropped by filters
+        """
+        if not isinstance(records, RecordBatch):
+            return self._transform(records)
+
+        batch = records
+        start = 0
+        for step in self.steps:
+            if step['type'] == 'drop':
+                batch = batch.drop(step['fields'])
+            elif step['type'] == 'rename' and step['target'] not in batch.schema:
+                batch = batch.rename({step['source']: step['target']})
+            else:
+                break
+            start += 1
+
+        if start == len(self.steps):
+            return batch
+        return RecordBatch.from_records(self._get_function(start)(batch))
+
+    def _get_function(self, start):
+        """
+        Return the generated function running the steps from start onwards.
+        """
+        if start not in self._functions:
+            source = '\n'.join([
+                'def transform(records):',
+                '    output = []',
+                '    append = output.append',
+                '    for record in records:',
+                '        r = dict(record)',
+                *(f'        {line}' for lines in self._step_lines[start:] for line in lines),
+                '        append(r)',
+                '    return output',
+            ])
+            namespace = {
+                '_join': _join,
+                '_compare': _compare,
+                '_text': _text,
+                **self._constants,
+            }
+            exec(compile(source, '<transformation plan>', 'exec'), namespace)
+            self._functions[start] = (namespace['transform'], source)
+        return self._functions[start][0]
+
+    def _constant(self, value):
+        # Configuration values only ever reach the generated code by name
+        name = f"_c{len(self._constants)}"
+        self._constants[name] = value
+        return name
+
+    def _compile_rename(self, step):
+        source, target = self._constant(step['source']), self._constant(step['target'])
+        return [f"if {source} in r: r[{target}] = r.pop({source})"]
+
+    def _compile_drop(self, step):
+        return [f"r.pop({self._constant(field)}, None)" for field in step['fields']]
+
+    def _compile_map(self, step):
+        field = self._constant(step['field'])
+        values = self._constant(dict(step['values']))
+        if 'default' in step:
+            default = self._constant(step['default'])
+            lookup = f"r[{field}] = {values}.get(v, {default})"
+        else:
+            lookup = f"r[{field}] = {values}.get(v, v)"
+        return [
+            f"v = r.get({field})",
+            "try:",
+            f"    {lookup}",
+            "except TypeError:",
+            "    pass",
+        ]
+
+    def _compile_concat(self, step):
+        if not step['fields']:
+            raise ValueError("fields must not be empty")
+        values = ', '.join(f"r.get({self._constant(field)})" for field in step['fields'])
+        separator = self._constant(step.get('separator', ' '))
+        return [f"r[{self._constant(step['target'])}] = _join({separator}, ({values},))"]
+
+    def _compile_extract(self, step):
+        pattern = re.compile(step['pattern'])
+        group = step.get('group', 1 if pattern.groups else 0)
+        if isinstance(group, int) and not 0 <= group <= pattern.groups:
+            raise ValueError(f"pattern has no group {group}")
+        if isinstance(group, str) and group not in pattern.groupindex:
+            raise ValueError(f"pattern has no group named {group!r}")
+        field = self._constant(step['field'])
+        target = self._constant(step.get('target', step['field']))
+        return [
+            f"v = r.get({field})",
+            f"m = {self._constant(pattern)}.search(str(v)) if v is not None else None",
+            f"r[{target}] = m.group({self._constant(group)}) if m else None",
+        ]
+
+    def _compile_compute(self, step):
+        template = step['template']
+        parts = []
+        position = 0
+        for match in TEMPLATE_FIELD.finditer(template):
+            if match.start() > position:
+                parts.append(self._constant(template[position:match.start()]))
+            parts.append(f"_text(r.get({self._constant(match.group(1))}))")
+            position = match.end()
+        if position < len(template) or not parts:
+            parts.append(self._constant(template[position:]))
+        return [f"r[{self._constant(step['target'])}] = ''.join(({', '.join(parts)},))"]
+
+    def _compile_convert(self, step):
+        if step['to'] not in CONVERSIONS:
+            raise ValueError(f"Unknown conversion: {step['to']!r}")
+        field = self._constant(step['field'])
+        convert = self._constant(CONVERSIONS[step['to']])
+        return [f"if {field} in r: r[{field}] = {convert}(r[{field}])"]
+
+    def _compile_filter(self, step):
+        op = step.get('op', 'eq')
+        value = f"r.get({self._constant(step['field'])})"
+        if op == 'eq':
+            condition = f"{value} == {self._constant(step['value'])}"
+        elif op == 'ne':
+            condition = f"{value} != {self._constant(step['value'])}"
+        elif op in ('in', 'not_in'):
+            choices = self._constant(tuple(step['value']))
+            condition = f"{value} {'in' if op == 'in' else 'not in'} {choices}"
+        elif op == 'contains':
+            condition = f"{self._constant(str(step['value']))} in _text({value})"
+        elif op == 'matches':
+            condition = f"{self._constant(re.compile(step['value']))}.search(_text({value}))"
+        elif op == 'exists':
+            condition = f"{value} not in (None, '')"
+        elif op == 'missing':
+            condition = f"{value} in (None, '')"
+        elif op in NUMERIC_OPERATORS:
+            target = float(step['value'])
+            condition = f"_compare({value}, {self._constant(NUMERIC_OPERATORS[op])}, {self._constant(target)})"
+        else:
+            raise ValueError(f"Unknown filter operator: {op!r}, expected one of {', '.join(FILTER_OPERATORS)}")
+        return [f"if not ({condition}): continue"]
+
+def compile_transformations(config):
+    """
+    Compile a pipeline's transformation_config.
+
+    Args:
+        config (dict): The transformation configuration
+
+    Returns:
+        TransformationPlan: The compiled plan, or None if there is nothing
+                            to transform
+
+    Raises:
+        ValueError: If the configuration is invalid
+    """
+    if not config:
+        return None
+    plan = TransformationPlan(config)
+    return plan if len(plan) else None
@@ -1,14 +1,27 @@
 # jobs/views.py
+import os
+import uuid
 from rest_framework import viewsets, status, filters
 from rest_framework.decorators import action
+from rest_framework.generics import get_object_or_404
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
+from django.conf import settings
+from django.db.models import Count
+from django.http import FileResponse
+from django.utils import timezone
 from celery.result import AsyncResult
+from common.caching import conditional_response, get_collections_version
 
 from .models import Job
+from .pagination import JobCursorPagination
+from .profiling import get_profile_artifacts
+from .retention import load_archived_entries, restore_job
+from .stats import get_dashboard_stats, record_job_completion
 from .serializers import JobSummarySerializer, JobDetailSerializer
-from .tasks import execute_pipeline
+from .dispatch import dispatch_job, revoke_job_tasks
+from .tasks import enforce_job_cancellation
 
 class JobViewSet(viewsets.ReadOnlyModelViewSet):
     """
@@ -16,6 +29,7 @@ class JobViewSet(viewsets.ReadOnlyModelViewSet):
     """
     queryset = Job.objects.all()
     serializer_class = JobSummarySerializer
+    pagination_class = JobCursorPagination
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['status', 'pipeline']
@@ -23,6 +37,18 @@ class JobViewSet(viewsets.ReadOnlyModelViewSet):
     ordering_fields = ['created_at', 'started_at', 'completed_at']
     ordering = ['-created_at']
     
+    def get_queryset(self):
+        """
+        Load only summary columns for lists, and the logs and errors only
+        for the actions that return them.
+        """
+        queryset = super().get_queryset()
+        if self.action == 'list':
+            return queryset.summaries()
+        if self.action in ['retrieve', 'status']:
+            return queryset.select_related('pipeline')
+        return queryset.without_blobs()
+    
     def get_serializer_class(self):
         """
         Return different serializers based on the action.
@@ -31,10 +57,41 @@ class JobViewSet(viewsets.ReadOnlyModelViewSet):
             return JobDetailSerializer
         return JobSummarySerializer
     
+    def list(self, request, *args, **kwargs):
+        """
+        List jobs, answering 304 while no job has changed.
+        """
+        version, last_modified = get_collections_version('jobs')
+        return conditional_response(
+            request,
+            request.get_full_path(),
+            version,
+            last_modified,
+            lambda: super(JobViewSet, self).list(request, *args, **kwargs).data
+        )
+    
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Get a job, answering 304 while neither it nor its pipeline has changed.
+        """
+        versions = get_object_or_404(
+            Job.objects.values('version', 'updated_at', 'pipeline__version', 'pipeline__updated_at'),
+            pk=kwargs['pk']
+        )
+        return conditional_response(
+            request,
+            request.get_full_path(),
+            f"{versions['version']}:{versions['updated_at'].isoformat()}:{versions['pipeline__version']}",
+            max(versions['updated_at'], versions['pipeline__updated_at']).timestamp(),
+            lambda: super(JobViewSet, self).retrieve(request, *args, **kwargs).data
+        )
+    
     @action(detail=True, methods=['post'])
     def retry(self, request, pk=None):
         """
         Retry a failed job.
+        
+        The job resumes from its last checkpoint unless "restart" is set.
         """
         job = self.get_object()
         
@@ -44,27 +101,34 @@ class JobViewSet(viewsets.ReadOnlyModelViewSet):
                 'message': 'Only failed jobs can be retried'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Update job status
+        if request.data.get('restart'):
+            job.checkpoint = {}
+        
+        # Update job status, with the ID of the task about to be dispatched
         job.status = 'pending'
+        job.completed_at = None
+        job.task_id = str(uuid.uuid4())
+        job.subtask_ids = []
         job.save()
         
         # Execute the pipeline asynchronously
-        task = execute_pipeline.delay(str(job.pipeline.id), str(job.id))
-        
-        # Update the job with the new task ID
-        job.task_id = task.id
-        job.save()
+        dispatch_job(job)
         
         return Response({
             'message': 'Job retry started',
             'job_id': job.id,
-            'task_id': task.id
+            'task_id': job.task_id,
+            'resumed_from_checkpoint': bool(job.checkpoint)
         }, status=status.HTTP_202_ACCEPTED)
     
     @action(detail=True, methods=['post'])
     def cancel(self, request, pk=None):
         """
         Cancel a running or pending job.
+        
+        Pending jobs are cancelled immediately. Running jobs are asked to stop
+        between items and record how far they got; a job still running after
+        JOB_CANCEL_DRAIN_TIMEOUT seconds is terminated.
         """
         job = self.get_object()
         
@@ -74,18 +138,39 @@ class JobViewSet(viewsets.ReadOnlyModelViewSet):
                 'message': 'Only pending or running jobs can be cancelled'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Attempt to revoke the task
-        if job.task_id:
-            AsyncResult(job.task_id).revoke(terminate=True)
+        # Drop the tasks that have not started yet, without killing the workers
+        revoke_job_tasks(job)
         
-        # Update job status
-        job.status = 'cancelled'
-        job.save()
+        job.cancel_requested_at = timezone.now()
+        
+        if job.status == 'pending':
+            # Only if no worker has picked the job up since it was loaded
+            cancelled = Job.objects.filter(pk=job.pk, status='pending').update(
+                status='cancelled',
+                cancel_requested_at=job.cancel_requested_at,
+                completed_at=job.cancel_requested_at
+            )
+            if cancelled:
+                job.status = 'cancelled'
+                job.completed_at = job.cancel_requested_at
+                job.touch_collections()
+                record_job_completion(job)
+                
+                return Response({
+                    'message': 'Job cancelled',
+                    'job_id': job.id
+                }, status=status.HTTP_200_OK)
+        
+        job.save(update_fields=['cancel_requested_at'])
+        enforce_job_cancellation.apply_async(
+            (str(job.id),),
+            countdown=settings.JOB_CANCEL_DRAIN_TIMEOUT
+        )
         
         return Response({
-            'message': 'Job cancelled',
+            'message': 'Job cancellation requested',
             'job_id': job.id
-        }, status=status.HTTP_200_OK)
+        }, status=status.HTTP_202_ACCEPTED)
     
     @action(detail=True, methods=['get'])
     def status(self, request, pk=None):
@@ -109,3 +194,112 @@ class JobViewSet(viewsets.ReadOnlyModelViewSet):
             'job': serializer.data,
             'task': task_status
         })
+    
+    @action(detail=False, methods=['get'])
+    def stats(self, request):
+        """
+        Get dashboard aggregates from the daily job rollups.
+        
+        Supports "days" (default 30) and "pipeline" query parameters.
+        """
+        try:
+            days = int(request.query_params.get('days', 30))
+        except ValueError:
+            days = 0
+        if not 1 <= days <= 366:
+            return Response({
+                'message': 'days must be an integer between 1 and 366'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        stats = get_dashboard_stats(days, request.query_params.get('pipeline'))
+        active = Job.objects.filter(status__in=['pending', 'running'])
+        stats['active'] = dict(active.values_list('status').annotate(count=Count('id')).order_by())
+        return Response(stats)
+    
+    @action(detail=True, methods=['get'])
+    def profile(self, request, pk=None):
+        """
+        Download the profile captured for a job.
+        
+        The "kind" query parameter selects the artifact: "collapsed" (default)
+        for flamegraph-ready collapsed stacks, or "pstats" for the cProfile dump.
+        """
+        job = self.get_object()
+        kind = request.query_params.get('kind', 'collapsed')
+        artifacts = get_profile_artifacts(job)
+        
+        if kind not in artifacts:
+            return Response({
+                'message': f'No {kind} profile available for this job'
+            }, status=status.HTTP_404_NOT_FOUND)
+        
+        path = artifacts[kind]
+        return FileResponse(
+            open(path, 'rb'),
+            as_attachment=True,
+            filename=f"job-{job.id}-{os.path.basename(path)}"
+        )
+    
+    @action(detail=True, methods=['get'])
+    def logs(self, request, pk=None):
+        """
+        Get a slice of the log entries of a job.
+        
+        Supports "offset" and "limit" query parameters; negative offsets
+        count from the end, so offset=-100 returns the latest 100 entries.
+        Entries of archived jobs are read from their archive.
+        """
+        return self._get_entries(request, 'logs')
+    
+    @action(detail=True, methods=['get'])
+    def errors(self, request, pk=None):
+        """
+        Get a slice of the error entries of a job.
+        
+        Supports the same "offset" and "limit" query parameters as logs.
+        """
+        return self._get_entries(request, 'errors')
+    
+    @action(detail=True, methods=['post'], url_path='restore-logs')
+    def restore_logs(self, request, pk=None):
+        """
+        Move the archived logs and errors of a job back into the database.
+        """
+        job = self.get_object()
+        if not job.archived_at:
+            return Response({
+                'message': 'Job logs are not archived'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        restore_job(job)
+        return Response({
+            'message': 'Job logs restored',
+            'job_id': job.id
+        })
+    
+    def _get_entries(self, request, field):
+        """
+        Load a single JSON list column of a job and return a slice of it.
+        
+        For an archived job, the archived entries come first, followed by
+        the entries added to the row since it was archived.
+        """
+        job = self.get_object()
+        try:
+            offset = int(request.query_params.get('offset', 0))
+            limit = int(request.query_params.get('limit', 100))
+        except ValueError:
+            return Response({
+                'message': 'offset and limit must be integers'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        entries = Job.objects.filter(pk=job.pk).values_list(field, flat=True).get()
+        if job.archived_at:
+            entries = load_archived_entries(job)[field] + entries
+        start = max(len(entries) + offset, 0) if offset < 0 else offset
+        
+        return Response({
+            'count': len(entries),
+            'offset': start,
+            'results': entries[start:start + limit]
+        })
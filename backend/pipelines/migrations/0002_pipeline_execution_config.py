@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-19 11:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("pipelines", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="pipeline",
+            name="execution_config",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-19 19:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("pipelines", "0002_pipeline_execution_config"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="pipeline",
+            name="version",
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
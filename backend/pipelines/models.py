@@ -1,7 +1,33 @@
 # pipelines/models.py
 import uuid
 from django.db import models
-from django.db.models import JSONField
+from django.db.models import (
+    Avg, Count, DurationField, ExpressionWrapper, F, JSONField, Max, OuterRef, Q, Subquery
+)
+from common.caching import touch_collections
+
+class PipelineQuerySet(models.QuerySet):
+    def with_stats(self):
+        """
+        Annotate each pipeline with statistics of its jobs, computed in the
+        same query: job_count, success_count, latest_job_status,
+        last_success_at and average_duration.
+        """
+        from jobs.models import Job
+        
+        succeeded = Q(jobs__status='completed')
+        latest_jobs = Job.objects.filter(pipeline=OuterRef('pk')).order_by('-created_at')
+        
+        return self.annotate(
+            job_count=Count('jobs'),
+            success_count=Count('jobs', filter=succeeded),
+            latest_job_status=Subquery(latest_jobs.values('status')[:1]),
+            last_success_at=Max('jobs__completed_at', filter=succeeded),
+            average_duration=Avg(
+                ExpressionWrapper(F('jobs__completed_at') - F('jobs__started_at'), output_field=DurationField()),
+                filter=succeeded
+            )
+        )
 
 class Pipeline(models.Model):
     """
@@ -32,12 +58,16 @@ class Pipeline(models.Model):
     # Pipeline settings
     schedule = models.CharField(max_length=100, blank=True, null=True)  # Cron expression for scheduled runs
     transformation_config = models.JSONField(default=dict, blank=True)
+    execution_config = models.JSONField(default=dict, blank=True)  # Batch size, partitioning, ...
     
     # Status and metadata
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='inactive')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     last_run_at = models.DateTimeField(null=True, blank=True)
+    version = models.PositiveIntegerField(default=1)  # Incremented on every change, drives ETags
+    
+    objects = PipelineQuerySet.as_manager()
     
     class Meta:
         ordering = ['-updated_at']
@@ -45,6 +75,33 @@ class Pipeline(models.Model):
     def __str__(self):
         return f"{self.name} ({self.source_type} → {self.destination_type})"
     
+    # Schedule and status as last loaded from or saved to the database
+    _loaded_schedule = None
+    _loaded_status = None
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """
+        Remember the stored schedule and status, so that saves which change
+        neither skip re-syncing the periodic task.
+        """
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_schedule = instance.__dict__.get('schedule')
+        instance._loaded_status = instance.__dict__.get('status')
+        return instance
+    
+    def save(self, *args, **kwargs):
+        """
+        Bump the version of the pipeline and invalidate the cached pipeline
+        and job responses.
+        """
+        if not self._state.adding:
+            self.version += 1
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'version', 'updated_at'}
+        super().save(*args, **kwargs)
+        touch_collections('pipelines', 'jobs')
+    
     def get_source_adapter(self, job=None):
         """
         Dynamically load and instantiate the source adapter.
@@ -0,0 +1,71 @@
+import json
+
+from celery.schedules import crontab
+
+def parse_cron(expression):
+    """
+    Split a five-field cron expression into crontab keyword arguments.
+    
+    Args:
+        expression (str): Cron expression, e.g. "0 2 * * 1-5"
+        
+    Returns:
+        dict: minute, hour, day_of_month, month_of_year and day_of_week
+        
+    Raises:
+        ValueError: If the expression is not a valid cron expression
+    """
+    fields = expression.split()
+    if len(fields) != 5:
+        raise ValueError("Cron expression must have 5 fields: minute hour day-of-month month day-of-week")
+    
+    minute, hour, day_of_month, month_of_year, day_of_week = fields
+    schedule = {
+        'minute': minute,
+        'hour': hour,
+        'day_of_month': day_of_month,
+        'month_of_year': month_of_year,
+        'day_of_week': day_of_week,
+    }
+    # Let Celery validate every field
+    crontab(**schedule)
+    return schedule
+
+def get_periodic_task_name(pipeline):
+    return f"pipeline:{pipeline.id}"
+
+def sync_pipeline_schedule(pipeline):
+    """
+    Create, update or remove the periodic task running a pipeline on its
+    cron schedule.
+    
+    The periodic task is only enabled while the pipeline is active, so
+    inactive pipelines and pipelines in error are not run on schedule.
+    """
+    from django_celery_beat.models import CrontabSchedule, PeriodicTask
+    
+    name = get_periodic_task_name(pipeline)
+    if not pipeline.schedule:
+        PeriodicTask.objects.filter(name=name).delete()
+        return
+    
+    schedule, _ = CrontabSchedule.objects.get_or_create(**parse_cron(pipeline.schedule))
+    PeriodicTask.objects.update_or_create(
+        name=name,
+        defaults={
+            'task': 'jobs.tasks.run_scheduled_pipeline',
+            'crontab': schedule,
+            'interval': None,
+            'args': json.dumps([str(pipeline.id)]),
+            'queue': 'control',
+            'enabled': pipeline.status == 'active',
+        }
+    )
+
+def remove_pipeline_schedule(pipeline):
+    """
+    Remove the periodic task of a deleted pipeline.
+    """
+    from django_celery_beat.models import PeriodicTask
+    
+    PeriodicTask.objects.filter(name=get_periodic_task_name(pipeline)).delete()
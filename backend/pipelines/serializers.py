@@ -1,35 +1,65 @@
 # pipelines/serializers.py
 from rest_framework import serializers
 from .models import Pipeline
+from .schedules import parse_cron
 from jobs.models import Job
+from jobs.transformations import compile_transformations
 
 class PipelineSerializer(serializers.ModelSerializer):
     """
-    Serializer for Pipeline model with job count and latest job status.
+    Serializer for Pipeline model with job statistics.
+    
+    The statistics are read from the annotations of
+    Pipeline.objects.with_stats() and only queried per pipeline as a fallback.
     """
     job_count = serializers.SerializerMethodField()
+    success_count = serializers.SerializerMethodField()
     latest_job_status = serializers.SerializerMethodField()
+    last_success_at = serializers.SerializerMethodField()
+    average_duration = serializers.SerializerMethodField()
     
     class Meta:
         model = Pipeline
         fields = [
             'id', 'name', 'description', 'source_type', 'source_config',
             'destination_type', 'destination_config', 'schedule',
-            'transformation_config', 'status', 'created_at', 'updated_at', 
-            'last_run_at', 'job_count', 'latest_job_status'
+            'transformation_config', 'execution_config', 'status', 'created_at', 'updated_at', 
+            'last_run_at', 'job_count', 'success_count', 'latest_job_status',
+            'last_success_at', 'average_duration'
         ]
         read_only_fields = ['id', 'created_at', 'updated_at', 'last_run_at']
     
+    def _get_stats(self, obj):
+        """Get the job statistics of a pipeline that was not annotated."""
+        if not hasattr(obj, 'job_count'):
+            stats = Pipeline.objects.with_stats().filter(pk=obj.pk).values(
+                'job_count', 'success_count', 'latest_job_status', 'last_success_at', 'average_duration'
+            ).first() or {}
+            for name, value in stats.items():
+                setattr(obj, name, value)
+        return obj
+    
     def get_job_count(self, obj):
         """Get the total number of jobs for this pipeline."""
-        return obj.jobs.count()
+        return self._get_stats(obj).job_count
+    
+    def get_success_count(self, obj):
+        """Get the number of completed jobs for this pipeline."""
+        return self._get_stats(obj).success_count
     
     def get_latest_job_status(self, obj):
         """Get the status of the most recent job."""
-        latest_job = obj.jobs.order_by('-created_at').first()
-        if latest_job:
-            return latest_job.status
-        return None
+        return self._get_stats(obj).latest_job_status
+    
+    def get_last_success_at(self, obj):
+        """Get the completion time of the most recent completed job."""
+        last_success_at = self._get_stats(obj).last_success_at
+        return serializers.DateTimeField().to_representation(last_success_at) if last_success_at else None
+    
+    def get_average_duration(self, obj):
+        """Get the average duration of completed jobs in seconds."""
+        average_duration = self._get_stats(obj).average_duration
+        return average_duration.total_seconds() if average_duration is not None else None
     
     def validate(self, data):
         """
@@ -49,6 +79,44 @@ class PipelineSerializer(serializers.ModelSerializer):
         if not destination_type:
             raise serializers.ValidationError("Destination type is required")
         
+        # Validate the cron schedule
+        schedule = data.get('schedule')
+        if schedule:
+            try:
+                parse_cron(schedule)
+            except ValueError as e:
+                raise serializers.ValidationError(f"Invalid schedule: {str(e)}")
+        
+        # Validate execution settings
+        execution_config = data.get('execution_config', {})
+        if not isinstance(execution_config, dict):
+            raise serializers.ValidationError("Execution config must be an object")
+        
+        for option in ['batch_size', 'max_partitions']:
+            value = execution_config.get(option)
+            if value is not None and (not isinstance(value, int) or isinstance(value, bool) or value < 1):
+                raise serializers.ValidationError(f"Execution option {option} must be a positive integer")
+        
+        if execution_config.get('mode', 'single') not in ('single', 'partitioned'):
+            raise serializers.ValidationError("Execution mode must be 'single' or 'partitioned'")
+        
+        priority = execution_config.get('priority')
+        if priority is not None and (not isinstance(priority, int) or not 0 <= priority <= 9):
+            raise serializers.ValidationError("Execution priority must be an integer between 0 and 9")
+        
+        if execution_config.get('schedule_overlap', 'skip') not in ('skip', 'queue'):
+            raise serializers.ValidationError("Schedule overlap policy must be 'skip' or 'queue'")
+        
+        for option in ['staging', 'change_detection']:
+            if not isinstance(execution_config.get(option, False), bool):
+                raise serializers.ValidationError(f"Execution option {option} must be true or false")
+        
+        # Validate the transformations by compiling them
+        try:
+            compile_transformations(data.get('transformation_config'))
+        except ValueError as e:
+            raise serializers.ValidationError(f"Invalid transformation config: {str(e)}")
+        
         # Additional validation could be added here, such as trying to load
         # the adapters to validate configuration before saving
         
@@ -65,6 +133,13 @@ class PipelineDetailSerializer(PipelineSerializer):
     
     def get_recent_jobs(self, obj):
         """Get the 5 most recent jobs for this pipeline."""
-        recent_jobs = obj.jobs.order_by('-created_at')[:5]
+        # Jobs of the related manager reuse obj as their pipeline
+        recent_jobs = obj.jobs.without_blobs().order_by('-created_at')[:5]
         from jobs.serializers import JobSummarySerializer
         return JobSummarySerializer(recent_jobs, many=True).data
+
+class PipelineExecuteManySerializer(serializers.Serializer):
+    """
+    Request body of the endpoint executing several pipelines at once.
+    """
+    pipeline_ids = serializers.ListField(child=serializers.UUIDField(), allow_empty=False)
@@ -0,0 +1,24 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from common.caching import touch_collections
+
+from .models import Pipeline
+from .schedules import remove_pipeline_schedule, sync_pipeline_schedule
+
+@receiver(post_save, sender=Pipeline)
+def sync_schedule_on_save(sender, instance, **kwargs):
+    """
+    Keep the pipeline's periodic task in sync with its cron schedule and status.
+    """
+    unchanged = instance.schedule == instance._loaded_schedule and instance.status == instance._loaded_status
+    if not kwargs.get('created') and unchanged:
+        return
+    sync_pipeline_schedule(instance)
+    instance._loaded_schedule = instance.schedule
+    instance._loaded_status = instance.status
+
+@receiver(post_delete, sender=Pipeline)
+def remove_schedule_on_delete(sender, instance, **kwargs):
+    remove_pipeline_schedule(instance)
+    touch_collections('pipelines', 'jobs')
@@ -0,0 +1,129 @@
+import json
+
+import pytest
+from django.urls import reverse
+from django_celery_beat.models import PeriodicTask
+
+from .models import Pipeline
+from .schedules import get_periodic_task_name
+
+pytestmark = pytest.mark.django_db
+
+# Job statistics are annotated and recent jobs fetched in one query, so the
+# number of queries does not grow with the number of pipelines or jobs
+
+def test_list_query_count(api_client, pipelines, django_assert_num_queries):
+    # Count of the page, then the page with its job statistics
+    with django_assert_num_queries(2):
+        response = api_client.get(reverse('pipeline-list'))
+    
+    assert response.status_code == 200
+    assert response.data['count'] == len(pipelines)
+    assert all(pipeline['job_count'] == 4 for pipeline in response.data['results'])
+
+def test_detail_query_count(api_client, pipelines, django_assert_num_queries):
+    # Version, pipeline with its job statistics, recent jobs
+    with django_assert_num_queries(3):
+        response = api_client.get(reverse('pipeline-detail', args=[pipelines[0].id]))
+    
+    assert response.status_code == 200
+    assert len(response.data['recent_jobs']) == 4
+    assert response.data['recent_jobs'][0]['pipeline_name'] == pipelines[0].name
+
+def test_jobs_query_count(api_client, pipelines, django_assert_num_queries):
+    # Pipeline, then one page of its jobs with the pipeline name joined in
+    with django_assert_num_queries(2):
+        response = api_client.get(reverse('pipeline-jobs', args=[pipelines[0].id]))
+    
+    assert response.status_code == 200
+    assert len(response.data['results']) == 4
+
+def test_cached_list_query_count(api_client, pipelines, django_assert_num_queries):
+    api_client.get(reverse('pipeline-list'))
+    
+    # Served from the response cache until a pipeline or job changes
+    with django_assert_num_queries(0):
+        response = api_client.get(reverse('pipeline-list'))
+    
+    assert response.status_code == 200
+
+def test_matching_etag_is_not_modified_until_a_write(api_client, pipelines):
+    url = reverse('pipeline-detail', args=[pipelines[0].id])
+    etag = api_client.get(url)['ETag']
+    
+    assert api_client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+    
+    pipelines[0].name = 'Renamed'
+    pipelines[0].save()
+    response = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response['ETag'] != etag
+    assert response.data['name'] == 'Renamed'
+
+def test_execute_many_rejects_invalid_ids(api_client, pipelines):
+    response = api_client.post(
+        reverse('pipeline-execute-many'),
+        {'pipeline_ids': [str(pipelines[0].id), 'not-a-uuid']},
+        format='json'
+    )
+    
+    assert response.status_code == 400
+    assert 'pipeline_ids' in response.data['errors']
+
+def test_execute_idempotency_key_is_per_pipeline(api_client, pipelines, monkeypatch):
+    monkeypatch.setattr('pipelines.views.dispatch_job', lambda job: None)
+    headers = {'HTTP_IDEMPOTENCY_KEY': 'nightly-run'}
+    
+    first = api_client.post(reverse('pipeline-execute', args=[pipelines[0].id]), **headers)
+    repeated = api_client.post(reverse('pipeline-execute', args=[pipelines[0].id]), **headers)
+    other = api_client.post(reverse('pipeline-execute', args=[pipelines[1].id]), **headers)
+    
+    assert first.status_code == 202
+    assert repeated.status_code == 200
+    assert repeated.data['job_id'] == first.data['job_id']
+    assert other.status_code == 202
+    assert other.data['job_id'] != first.data['job_id']
+
+@pytest.mark.parametrize('execution_config', [
+    ['batch_size', 100],
+    {'batch_size': 0},
+    {'batch_size': '100'},
+    {'max_partitions': -2},
+    {'max_partitions': True},
+])
+def test_create_rejects_invalid_execution_config(api_client, execution_config):
+    response = api_client.post(reverse('pipeline-list'), {
+        'name': 'Invalid',
+        'source_type': 'alm',
+        'destination_type': 'jira',
+        'execution_config': execution_config
+    }, format='json')
+    
+    assert response.status_code == 400
+
+def test_schedule_is_enabled_only_while_the_pipeline_is_active():
+    pipeline = Pipeline.objects.create(
+        name='Nightly',
+        source_type='alm',
+        destination_type='jira',
+        schedule='0 2 * * 1-5',
+        status='inactive'
+    )
+    periodic_task = PeriodicTask.objects.get(name=get_periodic_task_name(pipeline))
+    assert json.loads(periodic_task.args) == [str(pipeline.id)]
+    assert not periodic_task.enabled
+    
+    pipeline.status = 'active'
+    pipeline.save()
+    periodic_task.refresh_from_db()
+    assert periodic_task.enabled
+    assert periodic_task.crontab.hour == '2'
+    
+    pipeline.status = 'error'
+    pipeline.save()
+    periodic_task.refresh_from_db()
+    assert not periodic_task.enabled
+    
+    pipeline.schedule = None
+    pipeline.save()
+    assert not PeriodicTask.objects.filter(name=get_periodic_task_name(pipeline)).exists()
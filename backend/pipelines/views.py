@@ -1,4 +1,9 @@
 # pipelines/views.py
+import uuid
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db.models import F
 from django.utils import timezone
 from rest_framework import viewsets, status, filters
 
@@ -7,14 +12,20 @@ from django_filters.rest_framework import DjangoFilterBackend
 
 
 from rest_framework.decorators import action
+from rest_framework.generics import get_object_or_404
 from rest_framework.response import Response
-from common.adapter_loader import load_source_adapter, load_destination_adapter
+from common.adapter_loader import (
+    destination_adapters, load_destination_adapter, load_source_adapter, source_adapters
+)
+from common.caching import conditional_response, get_collections_version, touch_collections
+from common.locks import cache_lock
 
 
 from .models import Pipeline
-from .serializers import PipelineSerializer, PipelineDetailSerializer
+from .serializers import PipelineSerializer, PipelineDetailSerializer, PipelineExecuteManySerializer
 from jobs.models import Job
-from jobs.tasks import execute_pipeline
+from jobs.pagination import JobCursorPagination
+from jobs.dispatch import dispatch_job, dispatch_jobs
 from jobs.serializers import JobSummarySerializer
 
 class PipelineViewSet(viewsets.ModelViewSet):
@@ -30,6 +41,16 @@ class PipelineViewSet(viewsets.ModelViewSet):
     ordering_fields = ['name', 'created_at', 'updated_at', 'last_run_at']
     ordering = ['-updated_at']
     
+    def get_queryset(self):
+        """
+        Annotate job statistics in the same query for the actions that
+        serialize pipelines.
+        """
+        queryset = super().get_queryset()
+        if self.action in ['list', 'retrieve', 'update', 'partial_update']:
+            queryset = queryset.with_stats()
+        return queryset
+    
     def get_serializer_class(self):
         """
         Return different serializers based on the action.
@@ -38,34 +59,167 @@ class PipelineViewSet(viewsets.ModelViewSet):
             return PipelineDetailSerializer
         return PipelineSerializer
     
+    def list(self, request, *args, **kwargs):
+        """
+        List pipelines, answering 304 while no pipeline or job has changed.
+        """
+        version, last_modified = get_collections_version('pipelines')
+        return conditional_response(
+            request,
+            request.get_full_path(),
+            version,
+            last_modified,
+            lambda: super(PipelineViewSet, self).list(request, *args, **kwargs).data
+        )
+    
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Get a pipeline, answering 304 while neither it nor its jobs have changed.
+        """
+        versions = get_object_or_404(Pipeline.objects.values('version', 'updated_at'), pk=kwargs['pk'])
+        jobs_version, jobs_modified = get_collections_version(f"pipeline-jobs:{kwargs['pk']}")
+        return conditional_response(
+            request,
+            request.get_full_path(),
+            f"{versions['version']}:{versions['updated_at'].isoformat()}:{jobs_version}",
+            max(versions['updated_at'].timestamp(), jobs_modified),
+            lambda: super(PipelineViewSet, self).retrieve(request, *args, **kwargs).data
+        )
+    
     @action(detail=True, methods=['post'])
     def execute(self, request, pk=None):
         """
         Execute a pipeline by creating a new job.
+        
+        An optional "profile" value ("sampling" or "deterministic") runs the
+        job under a profiler and stores the result as a job artifact.
         """
         pipeline = self.get_object()
         
-        # Create a new job
-        job = Job.objects.create(
-            pipeline=pipeline,
-            status='pending'
-        )
-        
-        # Execute the pipeline asynchronously
-        task = execute_pipeline.delay(str(pipeline.id), str(job.id))
+        profile_mode = request.data.get('profile') or None
+        if profile_mode:
+            if profile_mode not in dict(Job.PROFILE_MODE_CHOICES):
+                return Response({
+                    'message': f'Unsupported profile mode: {profile_mode}'
+                }, status=status.HTTP_400_BAD_REQUEST)
+            
+            # Limit the profiling overhead to a few jobs at a time
+            profiled_jobs = Job.objects.filter(
+                profile_mode__isnull=False,
+                status__in=['pending', 'running']
+            ).count()
+            if profiled_jobs >= settings.JOB_PROFILING_MAX_CONCURRENT:
+                return Response({
+                    'message': 'Too many profiled jobs are already in progress'
+                }, status=status.HTTP_409_CONFLICT)
         
-        # Update the job with the task ID
-        job.task_id = task.id
-        job.save()
+        idempotency_key = request.headers.get('Idempotency-Key') or request.data.get('idempotency_key')
         
-        # Update the pipeline's last run time
-        pipeline.last_run_at = timezone.now()
-        pipeline.save()
+        with cache_lock(f"pipeline-run:{pipeline.id}") as acquired:
+            # A repeated request returns the job created by the first one
+            if idempotency_key:
+                existing_job = pipeline.jobs.filter(idempotency_key=idempotency_key).only('id', 'task_id').first()
+                if existing_job:
+                    return Response({
+                        'message': 'Pipeline execution already started',
+                        'job_id': existing_job.id,
+                        'task_id': existing_job.task_id
+                    }, status=status.HTTP_200_OK)
+            
+            active_job_id = pipeline.jobs.filter(status__in=['pending', 'running']).values_list('id', flat=True).first()
+            if not acquired or active_job_id:
+                return Response({
+                    'message': 'Pipeline is already running',
+                    'job_id': active_job_id
+                }, status=status.HTTP_409_CONFLICT)
+            
+            # Create the job with its task ID up front, so it is written once
+            job = Job.objects.create(
+                pipeline=pipeline,
+                status='pending',
+                task_id=str(uuid.uuid4()),
+                profile_mode=profile_mode,
+                idempotency_key=idempotency_key
+            )
+            
+            # Update the pipeline's last run time
+            now = timezone.now()
+            Pipeline.objects.filter(pk=pipeline.pk).update(last_run_at=now, updated_at=now, version=F('version') + 1)
+            touch_collections('pipelines', 'jobs')
+            
+            # Execute the pipeline asynchronously
+            dispatch_job(job)
         
         return Response({
             'message': 'Pipeline execution started',
             'job_id': job.id,
-            'task_id': task.id
+            'task_id': job.task_id
+        }, status=status.HTTP_202_ACCEPTED)
+    
+    @action(detail=False, methods=['post'], url_path='execute', url_name='execute-many')
+    def execute_many(self, request):
+        """
+        Execute several pipelines at once.
+        
+        Expects {"pipeline_ids": [...]}. Jobs are created with a single bulk
+        insert and dispatched in one round-trip; pipelines that are unknown or
+        already running are reported as skipped.
+        """
+        serializer = PipelineExecuteManySerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response({
+                'message': 'pipeline_ids must be a non-empty list of pipeline IDs',
+                'errors': serializer.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+        pipeline_ids = list(dict.fromkeys(str(pipeline_id) for pipeline_id in serializer.validated_data['pipeline_ids']))
+        
+        pipelines = {str(pipeline.id): pipeline for pipeline in self.get_queryset().filter(pk__in=pipeline_ids)}
+        skipped = [
+            {'pipeline_id': pipeline_id, 'reason': 'not_found'}
+            for pipeline_id in pipeline_ids if str(pipeline_id) not in pipelines
+        ]
+        
+        with ExitStack() as locks:
+            startable = []
+            for pipeline_id, pipeline in pipelines.items():
+                if locks.enter_context(cache_lock(f"pipeline-run:{pipeline_id}")):
+                    startable.append(pipeline)
+                else:
+                    skipped.append({'pipeline_id': pipeline_id, 'reason': 'already_running'})
+            
+            running = {
+                str(pipeline_id) for pipeline_id in Job.objects.filter(
+                    pipeline__in=startable,
+                    status__in=['pending', 'running']
+                ).values_list('pipeline_id', flat=True)
+            }
+            skipped.extend({'pipeline_id': pipeline_id, 'reason': 'already_running'} for pipeline_id in running)
+            startable = [pipeline for pipeline in startable if str(pipeline.id) not in running]
+            
+            jobs = Job.objects.bulk_create([
+                Job(pipeline=pipeline, status='pending', task_id=str(uuid.uuid4()))
+                for pipeline in startable
+            ])
+            
+            now = timezone.now()
+            Pipeline.objects.filter(pk__in=[pipeline.pk for pipeline in startable]).update(
+                last_run_at=now,
+                updated_at=now,
+                version=F('version') + 1
+            )
+            
+            if jobs:
+                # Bulk inserts bypass Job.save()
+                touch_collections('pipelines', 'jobs', *(f'pipeline-jobs:{job.pipeline_id}' for job in jobs))
+                dispatch_jobs(jobs)
+        
+        return Response({
+            'message': f'{len(jobs)} pipeline executions started',
+            'jobs': [
+                {'pipeline_id': job.pipeline_id, 'job_id': job.id, 'task_id': job.task_id}
+                for job in jobs
+            ],
+            'skipped': skipped
         }, status=status.HTTP_202_ACCEPTED)
     
     @action(detail=True, methods=['get'])
@@ -74,36 +228,25 @@ class PipelineViewSet(viewsets.ModelViewSet):
         Get all jobs for a specific pipeline.
         """
         pipeline = self.get_object()
-        jobs = pipeline.jobs.all().order_by('-created_at')
+        jobs = Job.objects.summaries().filter(pipeline=pipeline).order_by('-created_at')
         
-        # Support pagination
-        page = self.paginate_queryset(jobs)
-        if page is not None:
-            serializer = JobSummarySerializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
-        
-        serializer = JobSummarySerializer(jobs, many=True)
-        return Response(serializer.data)
+        # Paginate by job creation time rather than the pipeline ordering
+        paginator = JobCursorPagination()
+        page = paginator.paginate_queryset(jobs, request)
+        serializer = JobSummarySerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
     
     @action(detail=False, methods=['get'])
     def types(self, request):
         """
         Get lists of available source and destination types.
-        """
-        # In a real implementation, this would dynamically discover
-        # available adapters by inspecting the adapter directories
-        
-        source_types = [
-            {'id': 'alm', 'name': 'ALM', 'description': 'HP ALM Defect Tracking'}
-        ]
-        
-        destination_types = [
-            {'id': 'jira', 'name': 'Jira', 'description': 'Atlassian Jira Issue Tracking'}
-        ]
         
+        Adapters are discovered from the adapter packages, with the metadata
+        and capabilities they declare.
+        """
         return Response({
-            'source_types': source_types,
-            'destination_types': destination_types
+            'source_types': source_adapters.describe(),
+            'destination_types': destination_adapters.describe()
         })
     
     @action(detail=False, methods=['post'], url_path='test-source-connection')
@@ -1,46 +1,83 @@
+import hashlib
 import os
 import requests
 import logging
 from datetime import datetime
 import json
 import csv
-from bs4 import BeautifulSoup
 import unicodedata
 import urllib3
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from celery.exceptions import SoftTimeLimitExceeded
+from common.records import RecordBatch
+from common.sessions import AuthenticatedSession, AuthenticationError, session_pool
+from .base import SourceAdapterBase
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
+def login_alm(alm_url, client_id, secret):
+    """
+    Log in to ALM with an API key and return the session cookies.
+
+    Raises:
+        AuthenticationError: If ALM rejects the login
+    """
+    auth_endpoint = f"{alm_url}/rest/oauth2/login"
+    payload = {"clientId": client_id, "secret": secret}
+    headers = {'Content-Type': 'application/json'}
+
+    response = requests.post(auth_endpoint, json=payload, headers=headers, verify=False)
+    if response.status_code != 200:
+        raise AuthenticationError(
+            f'Failed to log in ALM. Status code: {response.status_code}',
+            {"status_code": response.status_code}
+        )
+    logging.info('Logged in ALM successfully')
+    return {
+        'LWSSO_COOKIE_KEY': response.cookies.get('LWSSO_COOKIE_KEY'),
+        'QCSession': response.cookies.get('QCSession'),
+        'XSRF-TOKEN': next((c.value for c in response.cookies if c.name == 'XSRF-TOKEN'), None)
+    }
+
+def open_alm_session(alm_url, client_id, secret):
+    """
+    Open a session logged in to ALM, which logs in again once its LWSSO
+    cookie has expired.
+
+    Raises:
+        AuthenticationError: If ALM rejects the login
+    """
+    def login(session):
+        cookies = login_alm(alm_url, client_id, secret)
+        session.cookies.update({name: value for name, value in cookies.items() if value})
+
+    session = AuthenticatedSession(login)
+    session.verify = False
+    session.authenticate()
+    return session
+
 class ALMClient:
-    def __init__(self, alm_url, client_id, secret, domain, project):
+    def __init__(self, alm_url, client_id, secret, domain, project, download_dir='./Download', session=None):
         self.alm_url = alm_url
         self.domain = domain
         self.project = project
-        self.cookies = self.authenticate(client_id, secret)
-        self.session = requests.Session()
-        self.session.cookies.update(self.cookies)
-        self.session.verify = False
+        self.download_dir = download_dir
+        if session is None:
+            self.cookies = self.authenticate(client_id, secret)
+            session = requests.Session()
+            if self.cookies:
+                session.cookies.update(self.cookies)
+            session.verify = False
+        else:
+            # Already logged in, e.g. taken from the worker's session pool
+            self.cookies = session.cookies.get_dict()
+        self.session = session
 
     def authenticate(self, client_id, secret):
-        auth_endpoint = f"{self.alm_url}/rest/oauth2/login"
-        payload = {"clientId": client_id, "secret": secret}
-        headers = {'Content-Type': 'application/json'}
-
         try:
-            response = requests.post(auth_endpoint, json=payload, headers=headers, verify=False)
-            if response.status_code == 200:
-                cookies = {
-                    'LWSSO_COOKIE_KEY': response.cookies.get('LWSSO_COOKIE_KEY'),
-                    'QCSession': response.cookies.get('QCSession'),
-                    'XSRF-TOKEN': next((c.value for c in response.cookies if c.name == 'XSRF-TOKEN'), None)
-                }
-                logging.info('Logged in ALM successfully')
-                return cookies
-            else:
-                logging.error(f'Failed to log in ALM. Status code: {response.status_code}')
-                return None
+            return login_alm(self.alm_url, client_id, secret)
         except Exception as e:
             logging.error(f'Error during authentication: {str(e)}')
             return None
@@ -95,6 +132,13 @@ class ALMClient:
         return None
 
     def download_attachment(self, attachment, save_path):
+        """
+        Download an attachment into save_path.
+
+        Returns:
+            tuple: File name and SHA-256 checksum of the content, or None if
+                   the attachment could not be downloaded
+        """
         attachment_id = next((field['values'][0]['value'] for field in attachment['Fields'] if field['Name'] == 'id'), None)
         if not attachment_id:
             logging.error(f"Attachment ID not found in: {attachment}")
@@ -113,10 +157,16 @@ class ALMClient:
             attachment_name = next((field['values'][0]['value'] for field in attachment['Fields'] if field['Name'] == 'name'), None)
             if attachment_name:
                 clean_attachment_name = attachment_name.replace(':', '_').replace(' ', '_')
-                with open(os.path.join(save_path, clean_attachment_name), 'wb') as f:
+                file_path = os.path.join(save_path, clean_attachment_name)
+                # Write to a temporary file first so an interrupted download never leaves a partial attachment
+                checksum = hashlib.sha256()
+                with open(f"{file_path}.part", 'wb') as f:
                     for chunk in response.iter_content(chunk_size=8192):
                         f.write(chunk)
+                        checksum.update(chunk)
+                os.replace(f"{file_path}.part", file_path)
                 logging.info(f"Downloaded attachment: {clean_attachment_name}")
+                return clean_attachment_name, checksum.hexdigest()
             else:
                 logging.error(f"Attachment name not found in: {attachment}")
         except requests.exceptions.RequestException as e:
@@ -180,7 +230,7 @@ class ALMClient:
             logging.error(f"No tests found in folder: {folder_path}")
             return
 
-        csv_file_path = f"./Download/Issue Report.csv"
+        csv_file_path = os.path.join(self.download_dir, "Issue Report.csv")
         
         all_test_data = []
         design_steps_to_process = []
@@ -195,13 +245,13 @@ class ALMClient:
                     all_test_data.append(row_data)
 
                     if audit_data:
-                        audit_html_dir = f'./Download/Attachments/{test_id}'
+                        audit_html_dir = os.path.join(self.download_dir, 'Attachments', str(test_id))
                         os.makedirs(audit_html_dir, exist_ok=True)
                         html_content = generate_html_table(audit_data)
                         save_html_to_file(html_content, os.path.join(audit_html_dir, f"History {test_id}.html"))
 
                     if attachments_data and 'entities' in attachments_data:
-                        attachments_dir = f'./Download/Attachments/{test_id}'
+                        attachments_dir = os.path.join(self.download_dir, 'Attachments', str(test_id))
                         os.makedirs(attachments_dir, exist_ok=True)
                         for attachment in attachments_data['entities']:
                             self.download_attachment(attachment, attachments_dir)
@@ -242,14 +292,20 @@ class ALMClient:
                         if step_id and step_number:
                             step_attachments_data = self.retrieve_attachments('design-steps', step_id)
                             if step_attachments_data and 'entities' in step_attachments_data:
-                                step_attachments_dir = f'./Download/Attachments/{test_id}/Step {step_number}'
+                                step_attachments_dir = os.path.join(self.download_dir, 'Attachments', str(test_id), f'Step {step_number}')
                                 if step_attachments_data['entities']:
                                     os.makedirs(step_attachments_dir, exist_ok=True)
                                     for attachment in step_attachments_data['entities']:
-                                        self.download_attachment(attachment, step_attachments_dir)
+                                        downloaded = self.download_attachment(attachment, step_attachments_dir)
+                                        # Records prepared for change detection track their checksums
+                                        if downloaded and 'Attachment Checksums' in test_data:
+                                            name, checksum = downloaded
+                                            test_data['Attachment Checksums'][f"Step {step_number}/{name}"] = checksum
 
 def clean_html(html_content):
     if html_content:
+        # Imported on first use, so loading the adapter does not pull in bs4
+        from bs4 import BeautifulSoup
         soup = BeautifulSoup(html_content, 'html.parser')
         cleaned_text = soup.get_text(separator=' ', strip=True)
         return normalize_text(cleaned_text)
@@ -389,6 +445,275 @@ def write_consolidated_test_data_to_csv(all_test_data, field_mapping, csv_file_p
         logging.error(f"Error writing test data to CSV: {str(e)}")
 
 
+def id_sort_key(test_id):
+    """
+    Sort key ordering numeric ALM test IDs by value, whether given as int or str.
+    """
+    return len(str(test_id)), str(test_id)
+
+
+class ALMSourceAdapter(SourceAdapterBase):
+    """
+    Adapter for extracting tests from an HP ALM test folder.
+    """
+
+    display_name = 'ALM'
+    description = 'HP ALM Defect Tracking'
+    capabilities = {
+        'streaming': True,
+        'partitioned': True,
+        'max_concurrency': 5,  # Default of the max_workers option
+    }
+
+    def validate_config(self):
+        """
+        Validate ALM adapter configuration.
+        """
+        required_fields = ['base_url', 'client_id', 'client_secret', 'domain', 'project', 'folder_path']
+
+        for field in required_fields:
+            if field not in self.config:
+                raise ValueError(f"Missing required configuration field: {field}")
+
+        if not self.config['base_url'].startswith(('http://', 'https://')):
+            raise ValueError("base_url must start with http:// or https://")
+
+    def authenticate(self):
+        """
+        Log in to ALM with the configured API key.
+
+        Returns:
+            bool: True if authentication was successful
+        """
+        self.log("Authenticating with ALM...")
+
+        download_dir = './Download'
+        if self.job:
+            from jobs.artifacts import get_job_artifact_dir
+            download_dir = get_job_artifact_dir(self.job)
+
+        connection = {
+            'base_url': self.config['base_url'],
+            'client_id': self.config['client_id'],
+            'client_secret': self.config['client_secret'],
+        }
+        try:
+            session = session_pool.get('alm', connection, lambda: open_alm_session(
+                self.config['base_url'],
+                self.config['client_id'],
+                self.config['client_secret']
+            ))
+        except SoftTimeLimitExceeded:
+            raise
+        except Exception as e:
+            self.report_error("ALM authentication failed", getattr(e, 'details', {"exception": str(e)}))
+            return False
+
+        self.client = ALMClient(
+            self.config['base_url'],
+            self.config['client_id'],
+            self.config['client_secret'],
+            self.config['domain'],
+            self.config['project'],
+            download_dir=download_dir,
+            session=session
+        )
+        self.log("ALM authentication successful")
+        return True
+
+    def test_connection(self):
+        """
+        Test connection to ALM by logging in and resolving the test folder.
+
+        Returns:
+            dict: Connection test results with status and message
+        """
+        try:
+            if not self.authenticate():
+                return {
+                    "status": "error",
+                    "message": "Authentication failed. Check credentials."
+                }
+
+            if self.client.get_folder_id_by_path(self.config['folder_path']):
+                return {
+                    "status": "success",
+                    "message": f"Successfully connected to ALM project {self.config['project']}"
+                }
+            return {
+                "status": "warning",
+                "message": f"Authentication successful, but folder {self.config['folder_path']} not found."
+            }
+        except Exception as e:
+            return {
+                "status": "error",
+                "message": f"Connection test failed: {str(e)}"
+            }
+
+    def fetch_data(self):
+        """
+        Retrieve every test of the configured folder.
+
+        Returns:
+            list: One record per test
+        """
+        records = []
+        for batch, _ in self.fetch_batches():
+            records.extend(batch.to_records())
+        return records
+
+    def fetch_batches(self, cursor=None, batch_size=100, partition=None):
+        """
+        Retrieve the tests of the configured folder in batches.
+
+        The cursor is the number of tests already extracted, in ascending
+        test ID order. A partition restricts the extraction to the tests
+        whose IDs fall within its range, so tests added or removed after
+        planning do not move the other partitions.
+        """
+        self.ensure_authenticated()
+
+        field_mapping = self.get_field_mapping()
+        test_ids = self.list_test_ids()
+        if partition is not None:
+            test_ids = self.select_partition(test_ids, partition)
+
+        offset = cursor or 0
+        self.log(f"Found {len(test_ids)} tests in {self.config['folder_path']}, starting at {offset}")
+
+        for start in range(offset, len(test_ids), batch_size):
+            batch_ids = test_ids[start:start + batch_size]
+            yield RecordBatch.from_records(self.fetch_tests(batch_ids, field_mapping)), start + len(batch_ids)
+
+    def get_partitions(self, max_partitions):
+        """
+        Split the folder's tests into up to max_partitions ranges of test IDs.
+
+        Each range starts at the first test ID it held at planning time and
+        ends before the start of the next one. The first and last ranges are
+        open-ended, so tests created later still belong to exactly one
+        partition.
+        """
+        self.ensure_authenticated()
+
+        test_ids = self.list_test_ids()
+        if not test_ids:
+            return []
+
+        size = -(-len(test_ids) // max_partitions)
+        bounds = [None] + test_ids[size::size] + [None]
+        return [{'first_id': first_id, 'end_id': end_id} for first_id, end_id in zip(bounds, bounds[1:])]
+
+    @staticmethod
+    def select_partition(test_ids, partition):
+        """
+        Keep the test IDs that fall within a partition returned by get_partitions().
+        """
+        if 'offset' in partition:
+            # Plans saved before partitions were keyed by test ID
+            return test_ids[partition['offset']:partition['offset'] + partition['limit']]
+
+        first_id, end_id = partition.get('first_id'), partition.get('end_id')
+        return [
+            test_id for test_id in test_ids
+            if (first_id is None or id_sort_key(test_id) >= id_sort_key(first_id))
+            and (end_id is None or id_sort_key(test_id) < id_sort_key(end_id))
+        ]
+
+    def ensure_authenticated(self):
+        """
+        Authenticate on first use.
+        """
+        if not hasattr(self, 'client'):
+            if not self.authenticate():
+                raise Exception("Could not authenticate with ALM")
+
+    def get_field_mapping(self):
+        """
+        Map ALM field names to their display labels.
+        """
+        fields_data = self.client.retrieve_test_fields()
+        if not fields_data:
+            return {}
+        return {
+            field.get('name', ''): field.get('label', '')
+            for field in fields_data.get('Fields', {}).get('Field', [])
+            if isinstance(field, dict)
+        }
+
+    def list_test_ids(self):
+        """
+        List the IDs of the tests in the configured folder, in a stable order.
+        """
+        folder_id = self.client.get_folder_id_by_path(self.config['folder_path'])
+        if not folder_id:
+            raise ValueError(f"Couldn't find folder: {self.config['folder_path']}")
+
+        test_ids = [test_id for test_id in self.client.get_tests_in_folder(folder_id) if test_id]
+        return sorted(test_ids, key=id_sort_key)
+
+    def fetch_tests(self, test_ids, field_mapping):
+        """
+        Retrieve the tests with the given IDs, including their design steps.
+        """
+        records = []
+
+        with ThreadPoolExecutor(max_workers=self.config.get('max_workers', 5)) as executor:
+            future_to_test_id = {executor.submit(self.client.process_test, test_id, field_mapping): test_id for test_id in test_ids}
+
+            for future in as_completed(future_to_test_id):
+                if self.should_stop():
+                    # Drop queued tests; requests already in flight finish on exit
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    self.log("Cancellation requested, stopping extraction", level='warning')
+                    return records
+
+                test_id = future_to_test_id[future]
+                try:
+                    row_data, audit_data, attachments_data, test_id = future.result()
+                except SoftTimeLimitExceeded:
+                    raise
+                except Exception as exc:
+                    self.report_error(f"Error processing test {test_id}", {"exception": str(exc), "item_id": test_id})
+                    continue
+
+                row_data['id'] = test_id
+                row_data.setdefault('Test ID', test_id)
+                records.append(row_data)
+
+                if self.config.get('download_attachments', True):
+                    row_data['Attachment Checksums'] = self.save_test_artifacts(test_id, audit_data, attachments_data)
+
+        self.client.process_design_steps([record['id'] for record in records], records)
+        return records
+
+    def save_test_artifacts(self, test_id, audit_data, attachments_data):
+        """
+        Store the audit history and attachments of a test on disk.
+
+        Returns:
+            dict: SHA-256 checksums of the downloaded attachments by file
+                  name, so that a changed attachment changes the record
+        """
+        checksums = {}
+        test_dir = os.path.join(self.client.download_dir, 'Attachments', str(test_id))
+
+        if audit_data:
+            os.makedirs(test_dir, exist_ok=True)
+            html_content = generate_html_table(audit_data)
+            save_html_to_file(html_content, os.path.join(test_dir, f"History {test_id}.html"))
+
+        if attachments_data and 'entities' in attachments_data:
+            os.makedirs(test_dir, exist_ok=True)
+            for attachment in attachments_data['entities']:
+                downloaded = self.client.download_attachment(attachment, test_dir)
+                if downloaded:
+                    name, checksum = downloaded
+                    checksums[name] = checksum
+
+        return checksums
+
+
 def main():
     alm_url = "https://quality-center.ent.cginet/qcbin"
     client_id = "apikey-jknboroghtdheeqmljls"
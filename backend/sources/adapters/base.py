@@ -1,14 +1,48 @@
 # sources/adapters/base.py
 from abc import ABC, abstractmethod
 
+from common.records import RecordBatch
+
 class SourceAdapterBase(ABC):
     """
     Abstract base class for all source adapters.
     
     Source adapters are responsible for connecting to a source system,
     authenticating, and retrieving data.
+    
+    Subclasses describe themselves to the pipeline types endpoint through
+    display_name, description and capabilities.
     """
     
+    display_name = None
+    description = ''
+    # streaming: fetch_batches() pages the source instead of loading it whole
+    # partitioned: get_partitions() can shard the source
+    # max_concurrency: number of concurrent requests made to the source
+    capabilities = {
+        'streaming': False,
+        'partitioned': False,
+        'max_concurrency': 1,
+    }
+    
+    @classmethod
+    def describe(cls, adapter_type):
+        """
+        Return the metadata of this adapter.
+        
+        Args:
+            adapter_type (str): Type under which the adapter is registered
+            
+        Returns:
+            dict: ID, name, description and capabilities of the adapter
+        """
+        return {
+            'id': adapter_type,
+            'name': cls.display_name or adapter_type,
+            'description': cls.description,
+            'capabilities': {**SourceAdapterBase.capabilities, **cls.capabilities},
+        }
+    
     def __init__(self, config, job=None):
         """
         Initialize the adapter with configuration.
@@ -49,6 +83,48 @@ class SourceAdapterBase(ABC):
         """
         pass
     
+    def fetch_batches(self, cursor=None, batch_size=100, partition=None):
+        """
+        Retrieve data from the source system in batches.
+        
+        The cursor is an opaque, JSON-serializable position returned alongside
+        each batch; passing it back resumes the extraction after that batch.
+        Adapters that can page through the source system should override this.
+        The default implementation slices the result of fetch_data() and uses
+        the record offset as cursor.
+        
+        Args:
+            cursor (optional): Position to resume from, or None to start over
+            batch_size (int): Maximum number of records per batch
+            partition (dict, optional): Shard returned by get_partitions() to
+                                        restrict the extraction to
+            
+        Yields:
+            tuple: (batch, cursor) where batch is a RecordBatch (or a list of
+                   records) and cursor the position following the batch
+        """
+        if partition is not None:
+            raise NotImplementedError(f"{type(self).__name__} does not support partitioned extraction")
+        
+        data = self.fetch_data() or []
+        for start in range(cursor or 0, len(data), batch_size):
+            batch = data[start:start + batch_size]
+            yield RecordBatch.from_records(batch), start + len(batch)
+    
+    def get_partitions(self, max_partitions):
+        """
+        Split the source data into independent shards that can be extracted
+        in parallel, e.g. by folder, ID range or page.
+        
+        Args:
+            max_partitions (int): Maximum number of shards to return
+            
+        Returns:
+            list: JSON-serializable shard descriptors accepted by fetch_batches(),
+                  or None if the adapter does not support partitioning
+        """
+        return None
+    
     @abstractmethod
     def test_connection(self):
         """
@@ -60,6 +136,15 @@ class SourceAdapterBase(ABC):
         """
         pass
     
+    def should_stop(self):
+        """
+        Check whether the job has been asked to stop.
+        
+        Adapters should call this between items and return early, letting
+        in-flight requests finish, so cancellation never interrupts a write.
+        """
+        return bool(self.job and self.job.is_cancel_requested())
+    
     def log(self, message, level='info'):
         """
         Log a message to the job if available.
@@ -71,7 +156,10 @@ class SourceAdapterBase(ABC):
     def report_error(self, message, details=None):
         """
         Report an error to the job if available.
+        
+        Errors are grouped by status code and message, so adapters can report
+        each failed item without writing an entry per item.
         """
         if self.job:
-            self.job.add_error(message, details)
+            self.job.report_error(message, details)
         # Could also add standard error logging here
@@ -0,0 +1,53 @@
+import pytest
+
+from sources.adapters.alm_download import ALMSourceAdapter
+
+CONFIG = {
+    'base_url': 'https://alm.example.com',
+    'client_id': 'client',
+    'client_secret': 'secret',
+    'domain': 'DEFAULT',
+    'project': 'Project',
+    'folder_path': 'Subject/Regression',
+}
+
+class FolderClient:
+    """
+    Stands in for ALMClient, listing a folder whose tests can change.
+    """
+    
+    def __init__(self, test_ids):
+        self.test_ids = test_ids
+    
+    def get_folder_id_by_path(self, folder_path):
+        return 1
+    
+    def get_tests_in_folder(self, folder_id):
+        return list(self.test_ids)
+
+@pytest.fixture
+def adapter():
+    adapter = ALMSourceAdapter(CONFIG)
+    adapter.client = FolderClient(['9', '10', '2', '11', '1', '25', '3'])
+    return adapter
+
+def test_partitions_cover_every_test_once(adapter):
+    plan = adapter.get_partitions(3)
+    
+    assert len(plan) == 3
+    shards = [adapter.select_partition(adapter.list_test_ids(), partition) for partition in plan]
+    assert shards == [['1', '2', '3'], ['9', '10', '11'], ['25']]
+
+def test_partitions_are_stable_when_the_folder_changes(adapter):
+    plan = adapter.get_partitions(3)
+    
+    # Tests created or deleted between planning and a retry
+    adapter.client.test_ids = ['9', '10', '11', '25', '3', '4', '30', '0']
+    shards = [adapter.select_partition(adapter.list_test_ids(), partition) for partition in plan]
+    
+    assert shards == [['0', '3', '4'], ['9', '10', '11'], ['25', '30']]
+
+def test_offset_partitions_of_older_plans_are_honoured(adapter):
+    partition = {'offset': 3, 'limit': 3}
+    
+    assert adapter.select_partition(adapter.list_test_ids(), partition) == ['9', '10', '11']